@@ -10,7 +10,7 @@
 from __future__ import annotations
 # some of these types are deprecated: https://www.python.org/dev/peps/pep-0585/
 from typing import Protocol, Dict, List, Iterator, Tuple, TypeVar, Optional
-import collections, heapq, itertools, math
+import array, collections, heapq, itertools, math, time
 
 # ===========================================================================
 
@@ -105,6 +105,10 @@ class SquareGrid:
         results = filter(self.passable, results)
         return results
 
+    def overlay(self, blocked=(), weights=None) -> GridOverlay:
+        """A temporary layer of extra walls/weights over this grid; see GridOverlay"""
+        return GridOverlay(self, blocked, weights)
+
 class WeightedGraph(Graph):
     def cost(self, from_id: Location, to_id: Location) -> float: pass
 
@@ -116,6 +120,51 @@ class GridWithWeights(SquareGrid):
     def cost(self, from_node: GridLocation, to_node: GridLocation) -> float:
         return self.weights.get(to_node, 1)
 
+class _OverlayWalls:
+    """Read-only view of an overlay's walls, so `id in graph.walls` keeps working"""
+    def __init__(self, overlay):
+        self.overlay = overlay
+
+    def __contains__(self, id) -> bool:
+        return not self.overlay.passable(id)
+
+class GridOverlay:
+    """Per-query layer of temporary walls and weight overrides in front of a base grid.
+    neighbors() and cost() consult the overlay first and fall back to the base, which is
+    never modified, so one base grid can be shared by any number of overlays (and threads).
+    Overlays compose (the base can itself be an overlay) and are discarded by dropping
+    the reference."""
+    def __init__(self, base, blocked=(), weights: Optional[Dict[GridLocation, float]] = None):
+        self.base = base
+        self.width = base.width
+        self.height = base.height
+        self.blocked = frozenset(blocked)
+        self.weights: Dict[GridLocation, float] = dict(weights) if weights else {}
+        self.walls = _OverlayWalls(self)
+
+    def in_bounds(self, id: GridLocation) -> bool:
+        return self.base.in_bounds(id)
+
+    def passable(self, id: GridLocation) -> bool:
+        return id not in self.blocked and self.base.passable(id)
+
+    def neighbors(self, id: GridLocation) -> Iterator[GridLocation]:
+        results = self.base.neighbors(id)
+        if self.blocked:
+            blocked = self.blocked
+            results = [next for next in results if next not in blocked]
+        return results
+
+    def cost(self, from_node: GridLocation, to_node: GridLocation) -> float:
+        weight = self.weights.get(to_node)
+        if weight is not None:
+            return weight
+        base_cost = getattr(self.base, 'cost', None)
+        return 1 if base_cost is None else base_cost(from_node, to_node)
+
+    def overlay(self, blocked=(), weights=None) -> GridOverlay:
+        return GridOverlay(self, blocked, weights)
+
 class SquareGridNeighborOrder(SquareGrid):
     def neighbors(self, id):
         (x, y) = id
@@ -234,6 +283,73 @@ def dijkstra_search(graph: WeightedGraph, start: Location, goal: Location):
     
     return came_from, cost_so_far
 
+# ===========================================================================
+# Cost-bounded Dijkstra: which cells can be reached within a budget?
+
+def _grid_cell_id(graph):
+    width = graph.width
+    return (lambda id: id[0] + id[1] * width), graph.width * graph.height
+
+def _bounded_dijkstra(graph: WeightedGraph, start: Location, budget: float, cell_id, dist):
+    """Dijkstra from start that never settles a cell costing more than budget. dist is a
+    caller-owned array of +inf indexed by cell id; it is restored to +inf before returning,
+    so one buffer can serve many calls. Returns the settled cell ids (in order of cost)
+    and their costs as arrays."""
+    ids = array.array('l')
+    costs = array.array('d')
+    start_index = cell_id(start)
+    dist[start_index] = 0
+    touched = [start_index]
+    frontier = [(0, start_index, start)]
+    while frontier:
+        (cost, index, current) = heapq.heappop(frontier)
+        if cost > dist[index]:
+            continue
+        dist[index] = -cost - 1   # mark settled, keeping cost recoverable
+        ids.append(index)
+        costs.append(cost)
+        for next in graph.neighbors(current):
+            new_cost = cost + graph.cost(current, next)
+            if new_cost > budget:
+                continue
+            next_index = cell_id(next)
+            if new_cost < dist[next_index]:
+                if dist[next_index] == math.inf:
+                    touched.append(next_index)
+                dist[next_index] = new_cost
+                heapq.heappush(frontier, (new_cost, next_index, next))
+    for index in touched:
+        dist[index] = math.inf
+    return ids, costs
+
+def dijkstra_within_budget(graph: WeightedGraph, start: Location, budget: float,
+                           as_mask: bool = False, cell_id=None, num_cells: Optional[int] = None):
+    """Every cell reachable from start with total cost <= budget, and its cost.
+    By default returns (ids, costs): array('l') of cell ids (x + y * width on grids) in
+    order of increasing cost, and the matching array('d') of costs. With as_mask=True
+    returns (mask, costs) instead: a bytearray with 1 for reachable cells and an
+    array('d') of costs indexed by cell id (+inf where unreachable)."""
+    if cell_id is None:
+        cell_id, num_cells = _grid_cell_id(graph)
+    dist = array.array('d', [math.inf]) * num_cells
+    ids, costs = _bounded_dijkstra(graph, start, budget, cell_id, dist)
+    if not as_mask:
+        return ids, costs
+    mask = bytearray(num_cells)
+    for (index, cost) in zip(ids, costs):
+        mask[index] = 1
+        dist[index] = cost
+    return mask, dist
+
+def dijkstra_within_budget_many(graph: WeightedGraph, sources: List[Location], budget: float,
+                                cell_id=None, num_cells: Optional[int] = None):
+    """Batched dijkstra_within_budget: one (ids, costs) pair per source, all sharing a
+    single distance buffer so nothing proportional to the map is allocated per source."""
+    if cell_id is None:
+        cell_id, num_cells = _grid_cell_id(graph)
+    dist = array.array('d', [math.inf]) * num_cells
+    return [_bounded_dijkstra(graph, source, budget, cell_id, dist) for source in sources]
+
 # ===========================================================================
 # Heuristic Functions
 def heuristic_manhattan(a: GridLocation, b: GridLocation) -> float:
@@ -296,4 +412,278 @@ def a_star_search(graph: WeightedGraph, start: Location, goal: Location):
                 frontier.put(next, priority)
                 came_from[next] = current
     
-    return came_from, cost_so_far
\ No newline at end of file
+    return came_from, cost_so_far
+
+# ===========================================================================
+# Moving-Target A*: keeps the search tree and learned heuristic between calls
+
+class MovingTargetAStar:
+    """A* for a goal that moves a little between calls (MT-Adaptive A* / GAA* style).
+
+    While the start stays the same, the closed set of the previous call already holds
+    exact costs from the start, so a moved goal only needs the open list re-prioritized
+    and the search resumed; a goal that is already inside the tree costs no search at all.
+    When the start changes the tree is dropped and a fresh A* runs. After every fresh
+    search that reaches the goal, all nodes it expanded learn h(s) = g(goal) - g(s)
+    (Generalized Adaptive A*); these values are corrected for later goal moves, so the
+    next fresh search is better informed than a plain a_star_search. Resumed searches do
+    not learn: their tree mixes nodes closed under earlier goals, and learning from those
+    could make the heuristic inconsistent. Needs a consistent heuristic."""
+
+    def __init__(self, graph: WeightedGraph, heuristic=heuristic_manhattan):
+        self.graph = graph
+        self.heuristic = heuristic
+        self.search_id = 0
+        # GAA* bookkeeping: learned h values tagged with the search they belong to,
+        # and the running correction for every goal move since then
+        self.learned_h: Dict[Location, Tuple[float, int]] = {}
+        self.delta_h: List[float] = [0.0]
+        self._reset_tree(None)
+        self.goal: Optional[Location] = None
+        self.expanded = 0
+
+    def _reset_tree(self, start):
+        self.start = start
+        self.came_from: Dict[Location, Optional[Location]] = {}
+        self.cost_so_far: Dict[Location, float] = {}
+        self.closed = set()
+        self.open_f: Dict[Location, float] = {}
+        self.frontier: List[Tuple[float, Location]] = []
+        if start is not None:
+            self.came_from[start] = None
+            self.cost_so_far[start] = 0
+            self.open_f[start] = 0
+            self.frontier.append((0, start))
+
+    def h(self, id: Location) -> float:
+        """Heuristic for the current goal: the better of the static heuristic and the
+        learned value, corrected for how far the goal moved since it was learned"""
+        value = self.heuristic(id, self.goal)
+        learned = self.learned_h.get(id)
+        if learned is not None:
+            (h_value, search_id) = learned
+            h_value -= self.delta_h[self.search_id] - self.delta_h[search_id]
+            if h_value > value:
+                value = h_value
+        return value
+
+    def search(self, start: Location, goal: Location):
+        """Finds a path from start to goal, reusing whatever the previous calls left.
+        Returns came_from, cost_so_far like a_star_search; self.expanded holds the
+        number of nodes expanded by this call alone."""
+        if self.goal is not None and goal != self.goal:
+            # correction term of GAA*: h(new goal) under the old goal
+            goal_shift = self.h(goal)
+        else:
+            goal_shift = 0
+        self.search_id += 1
+        self.delta_h.append(self.delta_h[-1] + goal_shift)
+        self.goal = goal
+        self.expanded = 0
+
+        fresh = start != self.start
+        if fresh:
+            self._reset_tree(start)
+        elif goal_shift:
+            # re-key the open list for the new goal
+            self.frontier = [(self.cost_so_far[id] + self.h(id), id) for id in self.open_f]
+            for (f, id) in self.frontier:
+                self.open_f[id] = f
+            heapq.heapify(self.frontier)
+
+        expanded_nodes: List[Location] = []
+        while goal not in self.closed and self.frontier:
+            (f, current) = heapq.heappop(self.frontier)
+            if self.open_f.get(current) != f:
+                continue   # stale entry
+            del self.open_f[current]
+            self.closed.add(current)
+            expanded_nodes.append(current)
+            self.expanded += 1
+            for next in self.graph.neighbors(current):
+                if next in self.closed:
+                    continue
+                new_cost = self.cost_so_far[current] + self.graph.cost(current, next)
+                if next not in self.cost_so_far or new_cost < self.cost_so_far[next]:
+                    self.cost_so_far[next] = new_cost
+                    priority = new_cost + self.h(next)
+                    self.open_f[next] = priority
+                    heapq.heappush(self.frontier, (priority, next))
+                    self.came_from[next] = current
+
+        if fresh and goal in self.closed:
+            # GAA* update of everything this search expanded
+            goal_cost = self.cost_so_far[goal]
+            for id in expanded_nodes:
+                self.learned_h[id] = (goal_cost - self.cost_so_far[id], self.search_id)
+        return self.came_from, self.cost_so_far
+
+    @property
+    def goal_cost(self) -> Optional[float]:
+        """Cost of the path to the current goal, if the tree reaches it"""
+        if self.goal in self.closed:
+            return self.cost_so_far[self.goal]
+        return None
+
+
+# ===========================================================================
+# Real-time search (LSS-LRTA*): bounded lookahead per move, learned heuristic
+
+class RealTimeSearch:
+    """LSS-LRTA* over a Graph/WeightedGraph towards a fixed goal.
+
+    Each call to plan_move runs an A* lookahead of at most `lookahead` expansions from the
+    agent's cell, raises the heuristic of the expanded cells with a Dijkstra pass from the
+    lookahead frontier, and returns the cells to walk to the most promising frontier cell.
+    `max_expansions` caps lookahead + learning expansions per move (at least one, for the
+    lookahead) and `time_budget_us` caps its time. The lookahead gets at most half of either
+    and the learning pass the rest. If learning runs out of expansions or time, the closed
+    cells it has not settled keep their old h-values: those it did settle are exact for the
+    lookahead space, so every learned value stays admissible.
+
+    Learned values live in an array('d') indexed by cell id (x + y * width on grids, or
+    the given cell_id function), so they can be saved and reloaded between episodes."""
+
+    UNSET = -1.0
+
+    def __init__(self, graph: WeightedGraph, goal: Location, lookahead: int = 16,
+                 max_expansions: Optional[int] = None, time_budget_us: Optional[float] = None,
+                 heuristic=heuristic_manhattan, cell_id=None, num_cells: Optional[int] = None):
+        self.graph = graph
+        self.goal = goal
+        self.lookahead = lookahead
+        self.max_expansions = max_expansions
+        self.time_budget_us = time_budget_us
+        self.heuristic = heuristic
+        if max_expansions is not None and max_expansions < 1:
+            raise ValueError("RealTimeSearch: max_expansions must be at least 1")
+        if (cell_id is None) != (num_cells is None):
+            raise ValueError("RealTimeSearch: give both cell_id and num_cells, or neither")
+        if cell_id is None:
+            width = graph.width
+            cell_id = lambda id: id[0] + id[1] * width
+            num_cells = graph.width * graph.height
+        self.cell_id = cell_id
+        self.h_values = array.array('d', [self.UNSET]) * num_cells
+        self.expanded = 0
+
+    def h(self, id: Location) -> float:
+        value = self.h_values[self.cell_id(id)]
+        if value == self.UNSET:
+            return self.heuristic(id, self.goal)
+        return value
+
+    def _cost(self, from_id: Location, to_id: Location) -> float:
+        cost = getattr(self.graph, 'cost', None)
+        return 1 if cost is None else cost(from_id, to_id)
+
+    def plan_move(self, current: Location) -> List[Location]:
+        """Returns the cells (excluding current) the agent should walk next. Empty if the
+        agent is at the goal or no move exists."""
+        if current == self.goal:
+            return []
+        # the lookahead may use half of the expansion cap and of the time budget,
+        # leaving the rest for learning
+        deadline = None
+        learn_deadline = None
+        if self.time_budget_us is not None:
+            now = time.perf_counter()
+            deadline = now + self.time_budget_us / 2e6
+            learn_deadline = now + self.time_budget_us / 1e6
+        lookahead = self.lookahead
+        if self.max_expansions is not None:
+            lookahead = max(1, min(lookahead, self.max_expansions // 2))
+        self.expanded = 0
+
+        # Lookahead: bounded A* from the current cell
+        frontier = PriorityQueue()
+        frontier.put(current, self.h(current))
+        came_from: Dict[Location, Optional[Location]] = {current: None}
+        cost_so_far: Dict[Location, float] = {current: 0}
+        closed: List[Location] = []
+        closed_set = set()
+        while not frontier.empty():
+            if len(closed) >= lookahead or \
+                    (deadline is not None and closed and time.perf_counter() > deadline):
+                break
+            (_, current_lss) = frontier.elements[0]
+            if current_lss == self.goal:
+                break
+            frontier.get()
+            if current_lss in closed_set:
+                continue
+            closed.append(current_lss)
+            closed_set.add(current_lss)
+            self.expanded += 1
+            for next in self.graph.neighbors(current_lss):
+                new_cost = cost_so_far[current_lss] + self._cost(current_lss, next)
+                if next not in closed_set and (next not in cost_so_far or new_cost < cost_so_far[next]):
+                    cost_so_far[next] = new_cost
+                    frontier.put(next, new_cost + self.h(next))
+                    came_from[next] = current_lss
+
+        open_cells = [id for id in cost_so_far if id not in closed_set]
+        if not open_cells:
+            return []
+        target = min(open_cells, key=lambda id: cost_so_far[id] + self.h(id))
+
+        # Learning: Dijkstra from the lookahead frontier back into the closed cells
+        learn_budget = None
+        if self.max_expansions is not None:
+            learn_budget = self.max_expansions - self.expanded
+        self._learn(closed_set, open_cells, learn_budget, learn_deadline)
+
+        path = reconstruct_path(came_from, start=current, goal=target)
+        return path[1:]
+
+    def _learn(self, closed_set, open_cells, budget: Optional[int] = None, deadline: Optional[float] = None):
+        new_h: Dict[Location, float] = {}
+        heap = [(self.h(id), id) for id in open_cells]
+        heapq.heapify(heap)
+        remaining = len(closed_set)
+        if budget is not None:
+            remaining = min(remaining, budget)
+        while heap and remaining:
+            (h_value, id) = heapq.heappop(heap)
+            if id in closed_set:
+                if id in new_h:
+                    continue
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                # final value for a closed cell
+                new_h[id] = h_value
+                remaining -= 1
+                self.expanded += 1
+            for prev in self.graph.neighbors(id):
+                if prev in closed_set and prev not in new_h:
+                    heapq.heappush(heap, (self._cost(prev, id) + h_value, prev))
+        for (id, h_value) in new_h.items():
+            index = self.cell_id(id)
+            self.h_values[index] = max(h_value, self.h(id))
+
+    def run_episode(self, start: Location, max_moves: int = 10000) -> List[Location]:
+        """Moves an agent from start until it reaches the goal (or max_moves planning
+        steps pass), learning as it goes. Returns the trajectory walked."""
+        trajectory = [start]
+        current = start
+        for _ in range(max_moves):
+            if current == self.goal:
+                break
+            steps = self.plan_move(current)
+            if not steps:
+                break
+            trajectory.extend(steps)
+            current = steps[-1]
+        return trajectory
+
+    def save_heuristic(self, filename: str):
+        """Writes the learned heuristic array so a later episode can pick it up"""
+        with open(filename, 'wb') as f:
+            self.h_values.tofile(f)
+
+    def load_heuristic(self, filename: str):
+        """Reads a learned heuristic array written by save_heuristic"""
+        values = array.array('d')
+        with open(filename, 'rb') as f:
+            values.fromfile(f, len(self.h_values))
+        self.h_values = values
@@ -0,0 +1,176 @@
+# Randomized checks of the search routines in implementation.py against dijkstra_search
+# run with: python -m pytest test_implementation.py
+
+import math
+import random
+from implementation import GridOverlay, GridWithWeights, MovingTargetAStar, RealTimeSearch, dijkstra_search, \
+    dijkstra_within_budget, dijkstra_within_budget_many, reconstruct_path
+
+
+def random_grid(rng, width, height, wall_count):
+    grid = GridWithWeights(width, height)
+    grid.walls = set((rng.randrange(width), rng.randrange(height)) for _ in range(wall_count))
+    grid.weights = {(x, y): rng.randint(1, 5) for x in range(width) for y in range(height)}
+    return grid
+
+
+def random_step(rng, grid, id):
+    options = list(grid.neighbors(id))
+    return rng.choice(options) if options else id
+
+
+def check_moving_target(move_start, move_goal, seeds=range(60), ticks=15):
+    for seed in seeds:
+        rng = random.Random(seed)
+        grid = random_grid(rng, 25, 25, 120)
+        start, goal = (0, 0), (24, 24)
+        grid.walls -= {start, goal}
+        searcher = MovingTargetAStar(grid)
+        for tick in range(ticks):
+            if move_start:
+                start = random_step(rng, grid, start)
+            if move_goal:
+                goal = random_step(rng, grid, goal)
+            came_from, cost_so_far = searcher.search(start, goal)
+            expected = dijkstra_search(grid, start, goal)[1].get(goal)
+            assert searcher.goal_cost == expected, (seed, tick, searcher.goal_cost, expected)
+            if expected is not None:
+                path = reconstruct_path(came_from, start=start, goal=goal)
+                assert sum(grid.cost(a, b) for a, b in zip(path, path[1:])) == expected
+
+
+def test_moving_target_goal_moves():
+    check_moving_target(move_start=False, move_goal=True)
+
+
+def test_moving_target_start_moves():
+    check_moving_target(move_start=True, move_goal=False)
+
+
+def test_moving_target_both_move():
+    check_moving_target(move_start=True, move_goal=True)
+
+
+def test_real_time_search_learns_under_a_tight_cap():
+    reached = 0
+    for seed in range(20):
+        rng = random.Random(seed)
+        grid = random_grid(rng, 30, 30, 150)
+        grid.walls -= {(0, 0), (29, 29)}
+        if dijkstra_search(grid, (0, 0), (29, 29))[1].get((29, 29)) is None:
+            continue
+        searcher = RealTimeSearch(grid, (29, 29), lookahead=16, max_expansions=16)
+        for episode in range(3):
+            trajectory = searcher.run_episode((0, 0), max_moves=3000)
+            reached += trajectory[-1] == (29, 29)
+        assert any(value != RealTimeSearch.UNSET for value in searcher.h_values)
+    assert reached > 0
+
+
+def test_real_time_search_needs_num_cells_with_cell_id():
+    grid = GridWithWeights(5, 5)
+    try:
+        RealTimeSearch(grid, (4, 4), cell_id=lambda id: id[0] + 5 * id[1])
+    except ValueError:
+        pass
+    else:
+        assert False, "expected ValueError"
+
+
+def check_learned_values_admissible(grid, searcher, goal, rng, samples=30):
+    learned = [(x, y) for x in range(grid.width) for y in range(grid.height)
+               if searcher.h_values[x + y * grid.width] != RealTimeSearch.UNSET]
+    for id in rng.sample(learned, min(samples, len(learned))):
+        true_cost = dijkstra_search(grid, id, goal)[1].get(goal)
+        if true_cost is not None:
+            assert searcher.h(id) <= true_cost, (id, searcher.h(id), true_cost)
+
+
+def test_real_time_search_never_exceeds_the_expansion_cap():
+    for cap in (1, 2, 5):
+        rng = random.Random(cap)
+        grid = random_grid(rng, 20, 20, 60)
+        grid.walls -= {(0, 0), (19, 19)}
+        searcher = RealTimeSearch(grid, (19, 19), lookahead=16, max_expansions=cap)
+        current = (0, 0)
+        for move in range(200):
+            steps = searcher.plan_move(current)
+            assert searcher.expanded <= cap, (cap, move, searcher.expanded)
+            if not steps:
+                break
+            current = steps[-1]
+        check_learned_values_admissible(grid, searcher, (19, 19), rng)
+
+
+def test_real_time_search_keeps_learning_admissible_under_a_tiny_time_budget():
+    rng = random.Random(7)
+    grid = random_grid(rng, 25, 25, 100)
+    grid.walls -= {(0, 0), (24, 24)}
+    searcher = RealTimeSearch(grid, (24, 24), lookahead=32, time_budget_us=1)
+    current = (0, 0)
+    for move in range(300):
+        steps = searcher.plan_move(current)
+        if not steps:
+            break
+        current = steps[-1]
+    check_learned_values_admissible(grid, searcher, (24, 24), rng)
+
+
+def test_real_time_search_rejects_a_zero_cap():
+    try:
+        RealTimeSearch(GridWithWeights(5, 5), (4, 4), max_expansions=0)
+    except ValueError:
+        pass
+    else:
+        assert False, "expected ValueError"
+
+
+def check_budget_matches_dijkstra(grid, start, budget):
+    all_costs = dijkstra_search(grid, start, None)[1]
+    ids, costs = dijkstra_within_budget(grid, start, budget)
+    expected = {x + y * grid.width: cost for ((x, y), cost) in all_costs.items() if cost <= budget}
+    assert dict(zip(ids, costs)) == expected
+    assert list(costs) == sorted(costs)
+    return ids, costs
+
+
+def test_dijkstra_within_budget_matches_a_full_search():
+    for seed in range(30):
+        rng = random.Random(seed)
+        grid = random_grid(rng, 20, 20, 80)
+        start = (rng.randrange(20), rng.randrange(20))
+        grid.walls.discard(start)
+        ids, costs = check_budget_matches_dijkstra(grid, start, rng.randint(0, 40))
+        assert ids[0] == start[0] + start[1] * 20 and costs[0] == 0
+
+
+def test_dijkstra_within_budget_mask_and_batch_agree():
+    rng = random.Random(3)
+    grid = random_grid(rng, 15, 15, 40)
+    sources = [(x, y) for (x, y) in [(0, 0), (7, 7), (14, 3)] if (x, y) not in grid.walls]
+    batch = dijkstra_within_budget_many(grid, sources, 12)
+    for (source, (ids, costs)) in zip(sources, batch):
+        assert (ids, costs) == dijkstra_within_budget(grid, source, 12)
+        mask, dist = dijkstra_within_budget(grid, source, 12, as_mask=True)
+        assert [index for index in range(len(mask)) if mask[index]] == sorted(ids)
+        assert all(dist[index] == cost for (index, cost) in zip(ids, costs))
+        assert all(dist[index] == math.inf for index in range(len(mask)) if not mask[index])
+
+
+def test_grid_overlay_searches_like_an_edited_copy():
+    for seed in range(20):
+        rng = random.Random(seed)
+        grid = random_grid(rng, 15, 15, 30)
+        grid.walls.discard((0, 0))
+        walls, weights = set(grid.walls), dict(grid.weights)
+        blocked = {(rng.randrange(15), rng.randrange(15)) for _ in range(20)} - {(0, 0)}
+        overrides = {(rng.randrange(15), rng.randrange(15)): rng.randint(1, 9) for _ in range(20)}
+        overlay = GridOverlay(grid, blocked, overrides).overlay(blocked=[(14, 14)], weights={(1, 0): 20})
+        edited = GridWithWeights(15, 15)
+        edited.walls = walls | blocked | {(14, 14)}
+        edited.weights = dict(weights)
+        edited.weights.update(overrides)
+        edited.weights[(1, 0)] = 20
+        assert dijkstra_search(overlay, (0, 0), None)[1] == dijkstra_search(edited, (0, 0), None)[1]
+        assert (14, 14) in overlay.walls and all(id in overlay.walls for id in blocked)
+        assert grid.walls == walls and grid.weights == weights
@@ -0,0 +1,254 @@
+"""  =================================================================
+File: DStarLite.py
+
+This file contains an incremental solver for mazes, D* Lite. Unlike the other
+solvers, it keeps its work from one search to the next: when the maze is edited,
+or the start moves as an agent walks the path, the next search only repairs the
+part of the old solution that the change affected.
+ ==================================================================="""
+
+from Queue import PriorityQueue
+from SearchSolver import AbstractSearchSolver
+from MazeStateAdvisors import MazeState
+
+INFINITY = float('inf')
+
+# The moves in the order of the neighbor table entries
+MOVES = (('N', -1, 0), ('E', 0, 1), ('S', 1, 0), ('W', 0, -1))
+
+
+class DStarLiteSolver(AbstractSearchSolver):
+    """This class implements D* Lite (Koenig and Likhachev), the LPA* search run backward from the goal so
+    that the start can move. For each cell it keeps g, the cost of the best path found from the cell to the
+    goal, and rhs, the one-step lookahead: the weight of the cell plus the lowest g of its neighbors (a path
+    pays the weight of each cell it leaves, as in MazeGUI.wrapUpSearch). A cell whose g and rhs differ is on
+    the fringe, ordered by the key (min(g, rhs) + h + km, min(g, rhs)), where h is the city-block distance
+    from the start times the lowest weight, and km adds up how far the start has moved since the keys were
+    made. The search is done when the start is consistent and no fringe cell has a lower key.
+    It takes any MazeTaskAdvisor, and uses only its maze, start and goal. It registers with the maze as a
+    change listener, so edits made between searches are passed on as they happen; the next call to initSearch
+    and the steps after it repair the solution, and the node counts are those of the repair alone. Call
+    detach when the solver is no longer wanted, so the maze stops telling it about edits."""
+
+    def __init__(self, taskAdvisor):
+        """Creates a D* Lite solver for the task advisor's maze, and starts listening for edits to it"""
+        AbstractSearchSolver.__init__(self, taskAdvisor)
+        self.maze = taskAdvisor.maze
+        self.numCols = self.maze.getNumCols()
+        self.minWeight = max(self.maze.getMinWeight(), 0)
+        self.startCell = None
+        self.goalCell = None
+        self.keyModifier = 0
+        self.g = None
+        self.rhs = None
+        self.maze.addChangeListener(self.cellChanged)
+
+
+    def detach(self):
+        """Stops listening for edits to the maze. The solver can not repair its solution after this."""
+        self.maze.removeChangeListener(self.cellChanged)
+
+
+    def initSearch(self):
+        """Gets the search ready to run. The first time, or when the goal has moved, it starts from scratch
+        with only the goal on the fringe. Otherwise the costs of the last search are kept: edits have
+        already been passed on by cellChanged, and if the start has moved, km grows by the heuristic
+        distance from where the start was. Returns the empty path if the start is the goal."""
+        self._initializeCounts()
+        advisor = self.taskAdvisor
+        startCell = advisor.startRow * self.numCols + advisor.startCol
+        goalCell = advisor.goalRow * self.numCols + advisor.goalCol
+        if goalCell != self.goalCell:
+            self.goalCell = goalCell
+            self.keyModifier = 0
+            self.g = {}
+            self.rhs = {goalCell: 0}
+            self.fringe = PriorityQueue()
+            self.startCell = startCell
+            self.fringe.insert(goalCell, self._key(goalCell))
+            self.nodesCreated += 1
+        elif startCell != self.startCell:
+            self.keyModifier += self._heuristic(self.startCell, startCell)
+            self.startCell = startCell
+        if startCell == goalCell:
+            return []
+
+
+    def moveStart(self, row, col):
+        """Moves the start to (row, col). The next initSearch accounts for the move."""
+        self.taskAdvisor.setStart(row, col)
+
+
+    def advance(self):
+        """Moves the start one step along the path found by the last search, as an agent following it
+        would, and returns the move taken, or None if the start is at the goal or has no path."""
+        step = self._bestStep(self.startCell)
+        if step is None:
+            return None
+        (move, cell) = step
+        self.moveStart(cell // self.numCols, cell % self.numCols)
+        return move
+
+
+    def cellChanged(self, row, col):
+        """The listener the maze calls after (row, col) is edited. A new weight changes only the cell's own
+        lookahead, but blocking or unblocking it also changes those of its neighbors, so all are updated."""
+        if self.g is None:
+            return
+        cell = row * self.numCols + col
+        self._updateCell(cell)
+        for neighbor in self._adjacentCells(cell):
+            self._updateCell(neighbor[1])
+
+
+    def searchStep(self):
+        """This method performs one step of D* Lite: it takes the fringe cell with the lowest key and
+        either lowers its g to its rhs, or, if its cost went up, raises its g to infinity so it is redone;
+        then it updates the lookahead of its neighbors. It returns the state for the cell, the states of
+        the neighbors now on the fringe, and "Not Done". Once the start is consistent it returns the goal
+        state with the whole path, or fails if the start can not reach the goal."""
+        fringe = self.fringe
+        while not fringe.isEmpty():
+            (cell, oldKey) = fringe.firstElement()
+            startCell = self.startCell
+            if not (oldKey < self._key(startCell) or self._getRhs(startCell) != self.g.get(startCell, INFINITY)):
+                break
+            newKey = self._key(cell)
+            if oldKey < newKey:
+                # the key was made with a smaller km, so the cell is just put back in its place
+                fringe.update(cell, newKey)
+                continue
+            fringe.delete()
+            self.nodesVisited += 1
+            neighbors = self._adjacentCells(cell)
+            rhsValue = self._getRhs(cell)
+            if self.g.get(cell, INFINITY) > rhsValue:
+                self.g[cell] = rhsValue
+            else:
+                self.g[cell] = INFINITY
+                self._updateCell(cell)
+            newFringe = []
+            for (move, neighbor) in neighbors:
+                self._updateCell(neighbor)
+                if neighbor in fringe.positions:
+                    newFringe.append(self._makeState(neighbor))
+            self.nodesCreated += len(newFringe)
+            return (self._makeState(cell), newFringe, "Not Done")
+        return self._finishSearch()
+
+
+    def getVisitedSize(self):
+        """Returns the number of cells with a g value"""
+        if self.g is None:
+            return 0
+        return len(self.g)
+
+
+    def _measuredMethods(self):
+        """Times the neighbor lookups as neighbor generation, as well as the fringe operations"""
+        return AbstractSearchSolver._measuredMethods(self) + [(self, '_adjacentCells', 'neighbors')]
+
+
+    def _finishSearch(self):
+        """Follows the lowest g from the start to the goal to build the goal state with the whole path"""
+        cost = self.g.get(self.startCell, INFINITY)
+        if cost == INFINITY:
+            return (False, False, "Fail")
+        moves = []
+        cell = self.startCell
+        seen = {cell}
+        while cell != self.goalCell:
+            (move, cell) = self._bestStep(cell)
+            if cell in seen:
+                # only possible with zero weights, where neighbors can tie
+                return (False, False, "Fail")
+            seen.add(cell)
+            moves.append(move)
+        goalCell = self.goalCell
+        return (MazeState(goalCell // self.numCols, goalCell % self.numCols, moves, cost, None, None, goalCell),
+                [], "Done")
+
+
+    def _bestStep(self, cell):
+        """Returns the (move, neighbor) from the cell to the neighbor with the lowest g, or None if the
+        cell is the goal or no neighbor has a path"""
+        if cell == self.goalCell:
+            return None
+        best = None
+        bestCost = INFINITY
+        for (move, neighbor) in self._adjacentCells(cell):
+            cost = self.g.get(neighbor, INFINITY)
+            if cost < bestCost:
+                best = (move, neighbor)
+                bestCost = cost
+        return best
+
+
+    def _updateCell(self, cell):
+        """Recomputes the lookahead of a cell, and puts it on the fringe if its g differs from it, or takes
+        it off if they agree"""
+        if cell != self.goalCell:
+            self.rhs[cell] = self._lookahead(cell)
+        fringe = self.fringe
+        onFringe = cell in fringe.positions
+        if self.g.get(cell, INFINITY) != self.rhs.get(cell, INFINITY):
+            if onFringe:
+                fringe.update(cell, self._key(cell))
+            else:
+                fringe.insert(cell, self._key(cell))
+        elif onFringe:
+            fringe.removeValue(cell)
+
+
+    def _lookahead(self, cell):
+        """The weight of the cell plus the lowest g of its neighbors; infinity for a blocked cell"""
+        numCols = self.numCols
+        (row, col) = (cell // numCols, cell % numCols)
+        if not self.maze.isAccessible(row, col):
+            return INFINITY
+        g = self.g
+        best = INFINITY
+        for (move, neighbor) in self._adjacentCells(cell):
+            cost = g.get(neighbor, INFINITY)
+            if cost < best:
+                best = cost
+        if best == INFINITY:
+            return INFINITY
+        return self.maze.getWeight(row, col) + best
+
+
+    def _adjacentCells(self, cell):
+        """Returns a list of (move, cell) for the accessible N, E, S, W neighbors of a cell, from the maze's
+        neighbor table when it has one"""
+        table = self.maze.getNeighborTable()
+        if table is not None:
+            base = 4 * cell
+            return [(MOVES[entry][0], table[base + entry]) for entry in range(4) if table[base + entry] >= 0]
+        numCols = self.numCols
+        (row, col) = (cell // numCols, cell % numCols)
+        return [(move, (row + dRow) * numCols + col + dCol) for (move, dRow, dCol) in MOVES
+                if self.maze.isAccessible(row + dRow, col + dCol)]
+
+
+    def _getRhs(self, cell):
+        """Returns the lookahead of a cell, infinity if it has none yet"""
+        return self.rhs.get(cell, INFINITY)
+
+
+    def _key(self, cell):
+        """The fringe priority of a cell, compared first on the estimated total cost and then on the cost
+        to the goal"""
+        cost = min(self.g.get(cell, INFINITY), self.rhs.get(cell, INFINITY))
+        return (cost + self._heuristic(self.startCell, cell) + self.keyModifier, cost)
+
+
+    def _heuristic(self, cell1, cell2):
+        """The city-block distance between two cells, times the lowest weight, which never overestimates
+        the cost of a path between them"""
+        numCols = self.numCols
+        return self.minWeight * (abs(cell1 // numCols - cell2 // numCols) + abs(cell1 % numCols - cell2 % numCols))
+
+
+    def _makeState(self, cell):
+        """Builds a maze state for a cell, for the GUI to color; its cost is the cell's g"""
+        return MazeState(cell // self.numCols, cell % self.numCols, [], self.g.get(cell), None, None, cell)
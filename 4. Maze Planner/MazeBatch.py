@@ -0,0 +1,223 @@
+"""  =================================================================
+File: MazeBatch.py
+
+This file runs the Maze Planner solvers without the GUI, for regression and capacity tests.
+It loads one or more maze files, runs any of BFS, DFS, UCS, Greedy, A*, bidirectional UCS and A*, D* Lite,
+IDA*, A* on the corridor-compressed graph and A* with ALT landmarks on each, and reports for every run the path cost and length, the nodes created and visited, the wall
+time and the peak memory used by the search. The mazes are solved in parallel, one maze file per worker process.
+
+From the command line:
+    python MazeBatch.py mazes/*.txt -a ucs astar -w 4 -f csv -o results.csv
+writes one CSV row per (maze, algorithm); the default is JSON on standard output. With --stats FILE, each
+search is also run once with SearchStats, and its phase timings, peak fringe and visited sizes and re-opened
+count are written to FILE, as CSV if it ends in .csv and as JSON lines otherwise. The 'alt' algorithm uses the
+landmark table saved next to each maze file, building and saving it first if there is none.
+ ==================================================================="""
+
+import argparse
+import csv
+import json
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from SearchSolver import BestFirstSearchSolver, NoCostSearchSolver, BidirectionalSearchSolver, IDAStarSearchSolver
+from MazeStateAdvisors import MazeTaskAdvisor, UCSMazeAdvisor, GreedyMazeAdvisor, AStarMazeAdvisor
+from MazeInfo import ArrayMazeInfo
+from DStarLite import DStarLiteSolver
+from MazeCorridors import CorridorAStarAdvisor
+from MazeLandmarks import ALTMazeAdvisor, landmarksForMazeFile
+from SearchStats import SearchStats, JsonLinesSink, CsvSink
+
+
+# 'corridor' is A* on the reduced graph of MazeCorridors; the graph is built with the solver, so, like the
+# other advisors' setup, building it is not part of the timed search
+ALGORITHMS = ('bfs', 'dfs', 'ucs', 'greedy', 'astar', 'biucs', 'biastar', 'dstar', 'idastar', 'corridor', 'alt')
+
+# IDA* can take very many passes on weighted mazes, and ALT writes landmark files next to the mazes, so they
+# are only run when asked for
+DEFAULT_ALGORITHMS = tuple(algorithm for algorithm in ALGORITHMS if algorithm not in ('idastar', 'alt'))
+
+# The columns of a result, in the order they are written to CSV
+FIELDS = ('maze', 'algorithm', 'found', 'cost', 'length', 'nodesCreated', 'nodesVisited', 'seconds', 'peakBytes')
+
+MOVES = {'N': (-1, 0), 'E': (0, 1), 'S': (1, 0), 'W': (0, -1)}
+
+
+def makeSolver(algorithm, maze, startPos, goalPos, landmarks=None):
+    """Builds the task advisor and solver for the named algorithm, the same pairs the GUI uses. 'alt' uses
+    the given LandmarkTable, or builds one."""
+    (sRow, sCol) = startPos
+    (gRow, gCol) = goalPos
+    if algorithm == 'bfs':
+        return NoCostSearchSolver(MazeTaskAdvisor(maze, sRow, sCol, gRow, gCol), 'BFS')
+    elif algorithm == 'dfs':
+        return NoCostSearchSolver(MazeTaskAdvisor(maze, sRow, sCol, gRow, gCol), 'DFS')
+    elif algorithm == 'ucs':
+        return BestFirstSearchSolver(UCSMazeAdvisor(maze, sRow, sCol, gRow, gCol))
+    elif algorithm == 'greedy':
+        return BestFirstSearchSolver(GreedyMazeAdvisor(maze, sRow, sCol, gRow, gCol))
+    elif algorithm == 'astar':
+        return BestFirstSearchSolver(AStarMazeAdvisor(maze, sRow, sCol, gRow, gCol))
+    elif algorithm == 'biucs':
+        return BidirectionalSearchSolver(UCSMazeAdvisor(maze, sRow, sCol, gRow, gCol))
+    elif algorithm == 'biastar':
+        return BidirectionalSearchSolver(AStarMazeAdvisor(maze, sRow, sCol, gRow, gCol))
+    elif algorithm == 'dstar':
+        return DStarLiteSolver(MazeTaskAdvisor(maze, sRow, sCol, gRow, gCol))
+    elif algorithm == 'idastar':
+        return IDAStarSearchSolver(AStarMazeAdvisor(maze, sRow, sCol, gRow, gCol))
+    elif algorithm == 'corridor':
+        return BestFirstSearchSolver(CorridorAStarAdvisor(maze, sRow, sCol, gRow, gCol))
+    elif algorithm == 'alt':
+        return BestFirstSearchSolver(ALTMazeAdvisor(maze, sRow, sCol, gRow, gCol, landmarks))
+    raise ValueError("Unknown algorithm: " + str(algorithm) + ", expected one of " + ", ".join(ALGORITHMS))
+
+
+def pathCost(maze, startPos, path):
+    """Adds up the cost of a path the way MazeGUI.wrapUpSearch does: the weight of every cell the path
+    leaves, starting with the start cell"""
+    (row, col) = startPos
+    total = 0
+    for move in path:
+        total += maze.getWeight(row, col)
+        (dRow, dCol) = MOVES[move]
+        row += dRow
+        col += dCol
+    return total
+
+
+def _runSearch(solver):
+    """Runs a whole search, returning the goal state, or None if there is no path"""
+    startState = solver.taskAdvisor.getStartState()
+    if solver.initSearch() is not None:
+        return startState       # the start is the goal
+    result = solver.searchLoop()
+    return result or None
+
+
+def solveMaze(maze, algorithm, startPos=None, goalPos=None, measureMemory=True, measureStats=False,
+              landmarks=None, withPath=False):
+    """Runs one algorithm on a MazeInfo and returns a dictionary of results with the keys in FIELDS
+    (except 'maze'). The search is timed without tracemalloc, which slows Python code down a lot; if
+    measureMemory is True it is then run once more under tracemalloc to find its peak memory. If
+    measureStats is True it is run once more with SearchStats, whose dictionary is added as 'stats'.
+    landmarks is the LandmarkTable for 'alt'; if it is None, each run builds its own. If withPath is True,
+    the list of moves (or None) is added as 'path'."""
+    if startPos is None:
+        startPos = maze.getStartPos()
+    if goalPos is None:
+        goalPos = maze.getGoalPos()
+    solver = makeSolver(algorithm, maze, startPos, goalPos, landmarks)
+    startTime = time.perf_counter()
+    goalState = _runSearch(solver)
+    seconds = time.perf_counter() - startTime
+
+    peakBytes = None
+    if measureMemory:
+        tracemalloc.start()
+        try:
+            _runSearch(makeSolver(algorithm, maze, startPos, goalPos, landmarks))
+            peakBytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    result = {'algorithm': algorithm, 'found': goalState is not None, 'cost': None, 'length': None,
+              'nodesCreated': solver.getNodesCreated(), 'nodesVisited': solver.getNodesVisited(),
+              'seconds': round(seconds, 6), 'peakBytes': peakBytes}
+    if measureStats:
+        statsSolver = makeSolver(algorithm, maze, startPos, goalPos, landmarks)
+        stats = SearchStats(algorithm)
+        statsSolver.setStats(stats)
+        _runSearch(statsSolver)
+        stats.peakBytes = peakBytes
+        result['stats'] = stats.asDict()
+    if withPath:
+        result['path'] = None
+    if goalState is not None:
+        path = goalState.getPath()
+        result['cost'] = pathCost(maze, startPos, path)
+        result['length'] = len(path)
+        if withPath:
+            result['path'] = path
+    return result
+
+
+def solveFile(fileName, algorithms=DEFAULT_ALGORITHMS, measureMemory=True, measureStats=False):
+    """Loads one maze file and runs each of the algorithms on it, returning a list of result dictionaries.
+    This is the job each worker process runs."""
+    maze = ArrayMazeInfo('file', fileName)
+    landmarks = landmarksForMazeFile(fileName, maze) if 'alt' in algorithms else None
+    results = []
+    for algorithm in algorithms:
+        result = solveMaze(maze, algorithm, measureMemory=measureMemory, measureStats=measureStats,
+                           landmarks=landmarks)
+        result['maze'] = fileName
+        if measureStats:
+            result['stats']['label'] = fileName + ':' + algorithm
+        results.append(result)
+    return results
+
+
+def runBatch(fileNames, algorithms=DEFAULT_ALGORITHMS, workers=None, measureMemory=True, measureStats=False):
+    """Solves every maze file with every algorithm, spreading the files over a pool of worker processes
+    (workers=None uses one per CPU, workers=1 runs everything in this process). Returns the list of
+    result dictionaries, in the order of fileNames and then algorithms."""
+    for algorithm in algorithms:
+        if algorithm not in ALGORITHMS:
+            raise ValueError("Unknown algorithm: " + str(algorithm) + ", expected one of " + ", ".join(ALGORITHMS))
+    results = []
+    if workers == 1 or len(fileNames) <= 1:
+        for fileName in fileNames:
+            results.extend(solveFile(fileName, algorithms, measureMemory, measureStats))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            jobs = [pool.submit(solveFile, fileName, algorithms, measureMemory, measureStats)
+                    for fileName in fileNames]
+            for job in jobs:
+                results.extend(job.result())
+    return results
+
+
+def writeJson(results, outFile):
+    """Writes the results to an open file as a JSON list"""
+    json.dump([{field: result[field] for field in FIELDS} for result in results], outFile, indent=2)
+    outFile.write('\n')
+
+
+def writeCsv(results, outFile):
+    """Writes the results to an open file as CSV, one row per result, with a header row"""
+    writer = csv.DictWriter(outFile, fieldnames=FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(results)
+
+
+def main(argv=None):
+    """Reads the command line, runs the batch, and writes the results"""
+    parser = argparse.ArgumentParser(description="Run the Maze Planner solvers on maze files, without the GUI")
+    parser.add_argument('mazes', nargs='+', help="maze files, text or binary")
+    parser.add_argument('-a', '--algorithms', nargs='+', choices=ALGORITHMS, default=list(DEFAULT_ALGORITHMS))
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('-f', '--format', choices=('json', 'csv'), default='json')
+    parser.add_argument('-o', '--output', help="output file (default: standard output)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc run that measures peak memory")
+    parser.add_argument('--stats', help="file for detailed search stats, CSV if it ends in .csv, else JSON lines")
+    args = parser.parse_args(argv)
+
+    results = runBatch(args.mazes, args.algorithms, args.workers, not args.no_memory, args.stats is not None)
+    if args.stats is not None:
+        sink = CsvSink(args.stats) if args.stats.endswith('.csv') else JsonLinesSink(args.stats)
+        for result in results:
+            sink.write(result['stats'])
+        sink.close()
+    writer = writeCsv if args.format == 'csv' else writeJson
+    if args.output is None:
+        writer(results, sys.stdout)
+    else:
+        with open(args.output, 'w', newline='') as outFile:
+            writer(results, outFile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""  =================================================================
+File: MazeCorpus.py
+
+This file generates a whole corpus of perfect and braided mazes for benchmarks and
+regression tests, and writes a manifest that lists, for every maze, how it was made
+and a set of start and goal pairs to solve it with. Each maze is made from its own
+seed, drawn from the corpus seed, so the same command always makes the same corpus,
+and any single maze can be made again from its manifest entry. The mazes are made in
+parallel, one maze per job, over a pool of worker processes.
+
+From the command line:
+    python MazeCorpus.py corpus --sizes 101 501 1001 --kinds perfect braided --count 5 --pairs 10 --seed 1
+writes corpus/perfect-backtracker-101-0.txt and so on, and corpus/manifest.json. With --format binary the
+mazes are written in the binary maze format instead, which is much faster to write and read for big mazes,
+and with --format both in both formats.
+ ==================================================================="""
+
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from MazeInfo import ArrayMazeInfo, BINARY_EXTENSION
+
+
+KINDS = ('perfect', 'braided')
+MAZE_ALGORITHMS = ('backtracker', 'kruskal')
+FORMATS = ('text', 'binary', 'both')
+MANIFEST_NAME = 'manifest.json'
+
+
+def makeMaze(kind, numRows, numCols=None, seed=None, braid=0.5, algorithm='backtracker'):
+    """Makes one perfect or braided maze as an ArrayMazeInfo, with no start or goal set"""
+    if kind not in KINDS:
+        raise ValueError("Unknown maze kind: " + str(kind) + ", expected one of " + ", ".join(KINDS))
+    return ArrayMazeInfo('gen-' + kind, numRows, numCols, seed=seed, braid=braid, algorithm=algorithm)
+
+
+def choosePairs(maze, count, rng):
+    """Returns a list of count [startRow, startCol, goalRow, goalCol] pairs of distinct open cells. The first
+    pair joins the open cells nearest two opposite corners, which are far apart in most mazes; the rest are
+    chosen at random. Open cells are found by sampling, so big mazes are never scanned."""
+    numRows = maze.getNumRows()
+    numCols = maze.getNumCols()
+    pairs = []
+    first = _openCellNear(maze, 0, 0)
+    last = _openCellNear(maze, numRows - 1, numCols - 1)
+    if first is not None and last is not None and first != last:
+        pairs.append(list(first + last))
+    tries = 0
+    while len(pairs) < count and tries < 100 * count:
+        tries += 1
+        start = _randomOpenCell(maze, rng)
+        goal = _randomOpenCell(maze, rng)
+        if start is not None and goal is not None and start != goal:
+            pairs.append(list(start + goal))
+    return pairs[:count]
+
+
+def _openCellNear(maze, row, col):
+    """Private: the first open cell along the diagonals moving in from the corner (row, col), or None"""
+    numRows = maze.getNumRows()
+    numCols = maze.getNumCols()
+    rowStep = 1 if row == 0 else -1
+    colStep = 1 if col == 0 else -1
+    for distance in range(numRows + numCols - 1):
+        for rowOffset in range(min(distance, numRows - 1) + 1):
+            colOffset = distance - rowOffset
+            if colOffset < numCols:
+                (cellRow, cellCol) = (row + rowStep * rowOffset, col + colStep * colOffset)
+                if not maze.isBlocked(cellRow, cellCol):
+                    return (cellRow, cellCol)
+    return None
+
+
+def _randomOpenCell(maze, rng, tries=1000):
+    """Private: a random open cell, or None if none was found in the given number of tries"""
+    numRows = maze.getNumRows()
+    numCols = maze.getNumCols()
+    for i in range(tries):
+        (row, col) = (rng.randrange(numRows), rng.randrange(numCols))
+        if not maze.isBlocked(row, col):
+            return (row, col)
+    return None
+
+
+def buildMaze(outDir, kind, algorithm, size, index, seed, numPairs, fileFormat='text', braid=0.5):
+    """The job each worker runs: makes one maze, chooses its start and goal pairs, sets the first pair as
+    the maze's own start and goal, writes it to outDir, and returns its manifest entry"""
+    startTime = time.perf_counter()
+    maze = makeMaze(kind, size, size, seed, braid, algorithm)
+    pairs = choosePairs(maze, numPairs, random.Random(seed))
+    if pairs:
+        maze.setStartPos(tuple(pairs[0][:2]))
+        maze.setGoalPos(tuple(pairs[0][2:]))
+    baseName = '%s-%s-%d-%d' % (kind, algorithm, size, index)
+    files = []
+    if fileFormat in ('text', 'both'):
+        files.append(baseName + '.txt')
+        maze.writeGridToFile(os.path.join(outDir, files[-1]))
+    if fileFormat in ('binary', 'both'):
+        files.append(baseName + BINARY_EXTENSION)
+        maze.writeGridToBinaryFile(os.path.join(outDir, files[-1]))
+    entry = {'files': files, 'kind': kind, 'algorithm': algorithm, 'rows': size, 'cols': size, 'seed': seed,
+             'pairs': pairs, 'seconds': round(time.perf_counter() - startTime, 3)}
+    if kind == 'braided':
+        entry['braid'] = braid
+    return entry
+
+
+def buildCorpus(outDir, sizes, kinds=KINDS, algorithms=('backtracker',), count=1, numPairs=10, seed=None,
+                fileFormat='text', braid=0.5, workers=None):
+    """Makes count mazes of every size, kind and algorithm in outDir, spread over a pool of worker
+    processes (workers=None uses one per CPU, workers=1 makes everything in this process), and writes the
+    manifest. Returns the manifest as a dictionary."""
+    for algorithm in algorithms:
+        if algorithm not in MAZE_ALGORITHMS:
+            raise ValueError("Unknown maze algorithm: " + str(algorithm) + ", expected one of " +
+                             ", ".join(MAZE_ALGORITHMS))
+    os.makedirs(outDir, exist_ok=True)
+    rng = random.Random(seed)
+    jobs = [(outDir, kind, algorithm, size, index, rng.randrange(2 ** 31), numPairs, fileFormat, braid)
+            for size in sizes for kind in kinds for algorithm in algorithms for index in range(count)]
+    if workers == 1 or len(jobs) <= 1:
+        mazes = [buildMaze(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            mazes = [future.result() for future in [pool.submit(buildMaze, *job) for job in jobs]]
+    manifest = {'seed': seed, 'format': fileFormat, 'mazes': mazes}
+    with open(os.path.join(outDir, MANIFEST_NAME), 'w') as outFile:
+        json.dump(manifest, outFile, indent=1)
+        outFile.write('\n')
+    return manifest
+
+
+def main(argv=None):
+    """Reads the command line and builds the corpus"""
+    parser = argparse.ArgumentParser(description="Generate a corpus of perfect and braided mazes with a manifest")
+    parser.add_argument('outDir', help="directory for the mazes and manifest.json")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[101], help="the number of rows and columns")
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+    parser.add_argument('-a', '--algorithms', nargs='+', choices=MAZE_ALGORITHMS, default=['backtracker'])
+    parser.add_argument('-n', '--count', type=int, default=1, help="mazes of each size, kind and algorithm")
+    parser.add_argument('-p', '--pairs', type=int, default=10, help="start and goal pairs per maze")
+    parser.add_argument('-s', '--seed', type=int, default=None, help="seed for the whole corpus")
+    parser.add_argument('-b', '--braid', type=float, default=0.5, help="share of dead ends opened in braided mazes")
+    parser.add_argument('-f', '--format', choices=FORMATS, default='text')
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    manifest = buildCorpus(args.outDir, args.sizes, args.kinds, args.algorithms, args.count, args.pairs, args.seed,
+                           args.format, args.braid, args.workers)
+    print("Wrote", len(manifest['mazes']), "mazes to", args.outDir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""  =================================================================
+File: MazeCorridors.py
+
+This file contains a preprocessing pass that shrinks a maze to the graph a search
+really needs, and task advisors that search that graph. Dead ends that hold neither
+the start nor the goal can never be on a shortest path, so they are pruned away; what
+is left is junctions joined by one-cell-wide corridors, and each corridor becomes one
+weighted edge. The solvers run unchanged on the reduced graph, and the path of the
+goal state is expanded back into the full list of N, E, S, W moves, so the GUI and
+MazeBatch handle it like any other path.
+ ==================================================================="""
+
+from MazeInfo import ArrayMazeInfo
+from MazeStateAdvisors import AStarMazeState, MazeTaskAdvisor
+
+# The moves of the four neighbor table entries of a cell
+MOVES = 'NESW'
+
+# Turns a blocked mask into a mask of open cells
+OPEN_CELLS = bytes([1]) + bytes(255)
+
+
+class CorridorGraph:
+    """The reduced graph of a maze. A node is a cell that survives pruning and is not simply a corridor
+    cell: a junction, a dead end that is kept, or a kept cell (the start and goal). The edges of a node are
+    (node, cost, moves) triples, one per corridor leaving it, where moves is the string of moves along the
+    corridor and cost counts the weights of the cells entered on the way, as UCSMazeAdvisor does.
+    The graph is a snapshot: edits made to the maze afterward are not seen, so build a new graph after them."""
+
+    def __init__(self, maze, keepCells = ()):
+        """Takes a MazeInfo and the (row, col) cells that must stay in the graph, normally the start and the
+        goal. Dead ends are pruned first, then the corridors between the remaining junctions are walked."""
+        if not isinstance(maze, ArrayMazeInfo):
+            maze = ArrayMazeInfo('copy', maze)
+        self.numRows = maze.getNumRows()
+        self.numCols = maze.getNumCols()
+        self.weights = maze.getWeightArray()
+        self.table = maze.getNeighborTable()
+        self.keepCells = {row * self.numCols + col for (row, col) in keepCells}
+        self.numPruned = 0
+        self.live = self._pruneDeadEnds(maze.blocked)
+        self.edges = self._collapseCorridors()
+
+
+    def hasNode(self, row, col):
+        """Returns True if (row, col) is a node of the graph"""
+        return row * self.numCols + col in self.edges
+
+
+    def getEdges(self, cell):
+        """Returns the list of (node, cost, moves) edges of the node with the given cell index"""
+        return self.edges[cell]
+
+
+    def getNumNodes(self):
+        """Returns the number of nodes"""
+        return len(self.edges)
+
+
+    def getNumPruned(self):
+        """Returns the number of open cells pruned as dead ends"""
+        return self.numPruned
+
+
+    def _pruneDeadEnds(self, blocked):
+        """Counts the open neighbors of every open cell, then repeatedly removes open cells with at most one,
+        unless they are kept, lowering the count of the neighbor as it goes, so whole dead-end branches are
+        removed. Returns a bytearray with 1 for each cell left."""
+        table = self.table
+        numCells = self.numRows * self.numCols
+        live = bytearray(blocked).translate(OPEN_CELLS)
+        degree = bytearray(numCells)
+        for cell in range(numCells):
+            if live[cell]:
+                base = 4 * cell
+                degree[cell] = (table[base] >= 0) + (table[base + 1] >= 0) + (table[base + 2] >= 0) + \
+                               (table[base + 3] >= 0)
+        keepCells = self.keepCells
+        stack = [cell for cell in range(numCells) if live[cell] and degree[cell] <= 1 and cell not in keepCells]
+        while stack:
+            cell = stack.pop()
+            if not live[cell]:
+                continue
+            live[cell] = 0
+            self.numPruned += 1
+            base = 4 * cell
+            for neighbor in table[base:base + 4]:
+                if neighbor >= 0 and live[neighbor]:
+                    degree[neighbor] -= 1
+                    if degree[neighbor] <= 1 and neighbor not in keepCells:
+                        stack.append(neighbor)
+        self.degree = degree
+        return live
+
+
+    def _collapseCorridors(self):
+        """Makes every live cell that is kept, or does not have exactly two live neighbors, a node, and walks
+        each corridor out of each node to the node at its other end. Corridors that loop back to the node
+        they left are dropped, as are loops with no node on them, which no search from a kept cell reaches.
+        Returns the dictionary from node cell to its list of edges."""
+        live = self.live
+        degree = self.degree
+        keepCells = self.keepCells
+        nodes = [cell for cell in range(len(live)) if live[cell] and (degree[cell] != 2 or cell in keepCells)]
+        edges = {node: [] for node in nodes}
+        for node in nodes:
+            for entry in range(4):
+                edge = self._walkCorridor(node, entry, edges)
+                if edge is not None and edge[0] != node:
+                    edges[node].append(edge)
+        return edges
+
+
+    def _walkCorridor(self, node, entry, edges):
+        """Follows the corridor that leaves the node by the given neighbor table entry until it reaches a node,
+        and returns the edge (node, cost, moves), or None if there is no live cell that way"""
+        table = self.table
+        weights = self.weights
+        live = self.live
+        cell = table[4 * node + entry]
+        if cell < 0 or not live[cell]:
+            return None
+        previous = node
+        cost = weights[cell]
+        moves = [MOVES[entry]]
+        while cell not in edges:
+            base = 4 * cell
+            for nextEntry in range(4):
+                neighbor = table[base + nextEntry]
+                if neighbor >= 0 and neighbor != previous and live[neighbor]:
+                    break
+            (previous, cell) = (cell, neighbor)
+            cost += weights[cell]
+            moves.append(MOVES[nextEntry])
+        return (cell, cost, ''.join(moves))
+
+
+
+class CorridorMazeState(AStarMazeState):
+    """A state of a search of the reduced graph. Its move is the whole string of moves along the corridor
+    from its parent, so getPath joins those strings into the full list of single moves."""
+
+    __slots__ = ()
+
+    def getPath(self):
+        """Access the path to this state as a list of N, E, S, W moves, expanding the corridors on the way
+        back to an ancestor that has a path, and keeping the result"""
+        if self.pathToMe is None:
+            corridors = []
+            state = self
+            while state.pathToMe is None:
+                corridors.append(state.move)
+                state = state.parent
+            moves = list(state.pathToMe)
+            for corridor in reversed(corridors):
+                moves.extend(corridor)
+            self.pathToMe = moves
+        return self.pathToMe
+
+
+
+class CorridorUCSAdvisor(MazeTaskAdvisor):
+    """This task advisor searches the reduced graph of the maze with uniform-cost costs, for a
+    BestFirstSearchSolver. It takes the same inputs as the other maze advisors, plus an optional
+    CorridorGraph to reuse; if none is given, or the one given lacks the start or the goal, a graph keeping
+    the start and goal is built. States are interned by cell, like the other maze states, and their costs
+    match those of UCSMazeAdvisor, but only the nodes of the graph are ever visited. It searches forward
+    only, so it is not for the bidirectional solver."""
+
+    def __init__(self, mazeMap, startRow, startCol, goalRow, goalCol, graph = None):
+        """Builds the reduced graph if needed, then sets up like the other maze advisors"""
+        if graph is None or not (graph.hasNode(startRow, startCol) and graph.hasNode(goalRow, goalCol)):
+            graph = CorridorGraph(mazeMap, [(startRow, startCol), (goalRow, goalCol)])
+        self.graph = graph
+        MazeTaskAdvisor.__init__(self, mazeMap, startRow, startCol, goalRow, goalCol)
+
+
+    def getGraph(self):
+        """Returns the reduced graph, to reuse for another search of the same maze"""
+        return self.graph
+
+
+    def _setupInitialState(self, startRow, startCol):
+        """The start state's g is the weight of the start cell, as for UCS, and h is the heuristic"""
+        return CorridorMazeState(startRow, startCol, [], self._cellWeight(startRow, startCol),
+                                 self._calcDistToGoal(startRow, startCol), None, None,
+                                 startRow * self.numCols + startCol)
+
+
+    def generateNeighbors(self, state):
+        """Builds a state at the far end of each corridor out of the state's node"""
+        numCols = self.numCols
+        costToHere = state.getCostToHere()
+        neighs = []
+        for (cell, cost, moves) in self.graph.getEdges(state.stateId):
+            (row, col) = (cell // numCols, cell % numCols)
+            neighs.append(CorridorMazeState(row, col, None, costToHere + cost, self._calcDistToGoal(row, col),
+                                            state, moves, cell))
+        return neighs
+
+
+    def getPathCost(self, state):
+        """The path cost is g"""
+        return state.getCostToHere()
+
+
+    def _calcDistToGoal(self, row, col):
+        """Uniform-cost search has no heuristic"""
+        return 0
+
+
+
+class CorridorAStarAdvisor(CorridorUCSAdvisor):
+    """The reduced-graph advisor for A*: the same as CorridorUCSAdvisor, with the city-block distance to
+    the goal as the heuristic, as AStarMazeAdvisor uses"""
+
+    def _calcDistToGoal(self, row, col):
+        """Compute the distance to the goal using the city block metric"""
+        return abs(row - self.goalRow) + abs(col - self.goalCol)
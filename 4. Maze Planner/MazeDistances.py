@@ -0,0 +1,204 @@
+"""  =================================================================
+File: MazeDistances.py
+
+This file computes the shortest path costs between many points of one maze, such
+as a distance matrix between waypoints, without building a task advisor and solver
+for every pair. For each source point it runs one Dijkstra search that stops once
+every target has been reached. The sources are spread over worker processes, which
+all read the maze's weight array and neighbor table from shared memory, so the maze
+is neither copied into nor pickled for each worker.
+
+Costs are counted the way MazeGUI.wrapUpSearch counts them: a path pays the weight
+of every cell it leaves, so the cost from a to b includes the weight of a but not
+that of b, and the matrix need not be symmetric.
+
+From the command line:
+    python MazeDistances.py mazes/bigmaze1.txt --random 200 --seed 1 -w 4 -o matrix.csv
+writes the matrix between 200 random open cells as CSV (blank where there is no path).
+ ==================================================================="""
+
+import argparse
+import csv
+import heapq
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from MazeInfo import ArrayMazeInfo
+
+MOVES = 'NESW'    # the moves of the four neighbor table entries of a cell
+
+# The shared maze of a worker process, set by _attachSharedMaze
+_sharedMaze = None
+
+
+def distanceMatrix(maze, sources, targets=None, workers=None, withPaths=False):
+    """Given a MazeInfo, a list of source (row, col) points and a list of target points (the sources if
+    None), returns a pair (costs, paths). costs[i][j] is the cost of the cheapest path from sources[i] to
+    targets[j], or None if there is none. If withPaths is True, paths[i][j] is the list of moves of that
+    path (None if there is none), otherwise paths is None. Raises ValueError if a point is blocked or off the
+    maze. workers=None uses one process per CPU; workers=1, or a single source, runs everything in this process."""
+    if targets is None:
+        targets = sources
+    if not isinstance(maze, ArrayMazeInfo):
+        maze = ArrayMazeInfo('copy', maze)
+    for (row, col) in list(sources) + list(targets):
+        if maze.isOutOfBounds(row, col) or maze.isBlocked(row, col):
+            raise ValueError("(%d, %d) is not an open cell of the maze" % (row, col))
+    numCols = maze.getNumCols()
+    sourceCells = [row * numCols + col for (row, col) in sources]
+    targetCells = [row * numCols + col for (row, col) in targets]
+    weights = maze.getWeightArray()
+    table = maze.getNeighborTable()
+    if workers == 1 or len(sources) <= 1:
+        rows = [_distancesFrom(weights, table, source, targetCells, withPaths) for source in sourceCells]
+    else:
+        rows = _distancesInPool(weights, table, sourceCells, targetCells, workers, withPaths)
+    costs = [row[0] for row in rows]
+    paths = [row[1] for row in rows] if withPaths else None
+    return (costs, paths)
+
+
+def _distancesInPool(weights, table, sourceCells, targetCells, workers, withPaths):
+    """Copies the weights and neighbor table into shared memory once, and has a pool of workers compute the
+    rows for chunks of the sources. Returns the rows in the order of sourceCells."""
+    blocks = []
+    try:
+        names = []
+        for data in (weights, table):
+            view = memoryview(data).cast('B')
+            block = shared_memory.SharedMemory(create=True, size=max(len(view), 1))
+            blocks.append(block)
+            block.buf[:len(view)] = view
+            names.append(block.name)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        # a few chunks per worker, so that workers that finish early can take more
+        chunkSize = max(1, -(-len(sourceCells) // (4 * workers)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attachSharedMaze,
+                                 initargs=(names[0], names[1], len(weights))) as pool:
+            jobs = [pool.submit(_distancesForChunk, sourceCells[i:i + chunkSize], targetCells, withPaths)
+                    for i in range(0, len(sourceCells), chunkSize)]
+            rows = []
+            for job in jobs:
+                rows.extend(job.result())
+        return rows
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _attachSharedMaze(weightsName, tableName, numCells):
+    """Runs in each worker as it starts: attaches to the shared weight array and neighbor table"""
+    global _sharedMaze
+    weightsBlock = shared_memory.SharedMemory(name=weightsName)
+    tableBlock = shared_memory.SharedMemory(name=tableName)
+    weights = weightsBlock.buf[:4 * numCells].cast('i')
+    table = tableBlock.buf[:16 * numCells].cast('i')
+    # the blocks are kept with the views, so they stay open as long as the worker
+    _sharedMaze = (weights, table, weightsBlock, tableBlock)
+
+
+def _distancesForChunk(sourceCells, targetCells, withPaths):
+    """The job each worker runs: the rows of the matrix for some of the sources"""
+    (weights, table) = _sharedMaze[:2]
+    return [_distancesFrom(weights, table, source, targetCells, withPaths) for source in sourceCells]
+
+
+def _distancesFrom(weights, table, source, targetCells, withPaths):
+    """Runs Dijkstra's algorithm from the source cell until every target cell is settled or nothing more
+    can be reached, and returns the row of costs to the targets, and the row of paths if withPaths is True.
+    Stepping from a cell costs that cell's weight. Only the cells reached are stored, in dictionaries."""
+    remaining = set(targetCells)
+    best = {source: 0}
+    parents = {source: -1} if withPaths else None
+    settled = set()
+    heap = [(0, source)]
+    while heap and remaining:
+        (cost, cell) = heapq.heappop(heap)
+        if cell in settled:
+            continue
+        settled.add(cell)
+        remaining.discard(cell)
+        newCost = cost + weights[cell]
+        base = 4 * cell
+        for neighbor in table[base:base + 4]:
+            if neighbor >= 0 and neighbor not in settled:
+                oldCost = best.get(neighbor)
+                if oldCost is None or newCost < oldCost:
+                    best[neighbor] = newCost
+                    if withPaths:
+                        parents[neighbor] = cell
+                    heapq.heappush(heap, (newCost, neighbor))
+
+    costs = [best[target] if target in settled else None for target in targetCells]
+    if not withPaths:
+        return (costs, None)
+    paths = [_pathTo(table, parents, target) if target in settled else None for target in targetCells]
+    return (costs, paths)
+
+
+def _pathTo(table, parents, target):
+    """Follows the parent links back from the target, and returns the moves from the source to it"""
+    moves = []
+    cell = target
+    parent = parents[cell]
+    while parent >= 0:
+        base = 4 * parent
+        for entry in range(4):
+            if table[base + entry] == cell:
+                moves.append(MOVES[entry])
+        cell = parent
+        parent = parents[cell]
+    moves.reverse()
+    return moves
+
+
+def randomOpenCells(maze, count, seed=None):
+    """Returns a list of count distinct open (row, col) cells of the maze, chosen at random"""
+    rng = random.Random(seed)
+    numCols = maze.getNumCols()
+    openCells = [cell for cell in range(maze.getNumRows() * numCols)
+                 if not maze.isBlocked(cell // numCols, cell % numCols)]
+    return [(cell // numCols, cell % numCols) for cell in rng.sample(openCells, min(count, len(openCells)))]
+
+
+def main(argv=None):
+    """Reads the command line, computes the matrix, and writes it as CSV"""
+    parser = argparse.ArgumentParser(description="Compute shortest path costs between points of a maze")
+    parser.add_argument('maze', help="maze file, text or binary")
+    parser.add_argument('-p', '--points', nargs='+', metavar='ROW,COL', help="the points, as row,col")
+    parser.add_argument('-r', '--random', type=int, help="use this many random open cells as the points")
+    parser.add_argument('-s', '--seed', type=int, default=None, help="seed for the random points")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('-o', '--output', help="output file (default: standard output)")
+    args = parser.parse_args(argv)
+
+    maze = ArrayMazeInfo('file', args.maze)
+    if args.points:
+        points = [tuple(int(value) for value in point.split(',')) for point in args.points]
+    elif args.random:
+        points = randomOpenCells(maze, args.random, args.seed)
+    else:
+        parser.error("give the points with --points or --random")
+    try:
+        (costs, paths) = distanceMatrix(maze, points, workers=args.workers)
+    except ValueError as error:
+        parser.error(str(error))
+
+    outFile = sys.stdout if args.output is None else open(args.output, 'w', newline='')
+    try:
+        writer = csv.writer(outFile)
+        writer.writerow([''] + ['%d,%d' % point for point in points])
+        for (point, row) in zip(points, costs):
+            writer.writerow(['%d,%d' % point] + ['' if cost is None else cost for cost in row])
+    finally:
+        if outFile is not sys.stdout:
+            outFile.close()
+
+
+if __name__ == '__main__':
+    main()
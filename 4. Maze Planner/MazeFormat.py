@@ -0,0 +1,50 @@
+"""  =================================================================
+File: MazeFormat.py
+
+This file converts mazes between the text format written by MazeInfo.writeGridToFile (the
+mazes/*.txt files) and the binary format written by ArrayMazeInfo.writeGridToBinaryFile. Binary
+files are opened by ArrayMazeInfo through mmap, so large mazes load without parsing.
+
+From the command line:
+    python MazeFormat.py mazes/bigmaze1.txt mazes/bigmaze1.bmaze
+converts in whichever direction the input file calls for.
+ ==================================================================="""
+
+import sys
+from MazeInfo import ArrayMazeInfo, isBinaryMazeFile, BINARY_EXTENSION
+
+
+def textToBinary(textFile, binaryFile):
+    """Reads a maze in the text format and writes it in the binary format"""
+    maze = ArrayMazeInfo('file', textFile)
+    maze.writeGridToBinaryFile(binaryFile)
+    return maze
+
+
+def binaryToText(binaryFile, textFile):
+    """Reads a maze in the binary format and writes it in the text format"""
+    maze = ArrayMazeInfo('file', binaryFile)
+    maze.writeGridToFile(textFile)
+    return maze
+
+
+def convertMaze(inFile, outFile=None):
+    """Converts inFile to the other format, choosing the direction from the contents of inFile. If
+    no outFile is given, it is inFile with its extension replaced by .bmaze or .txt. Returns the
+    name of the file written."""
+    toText = isBinaryMazeFile(inFile)
+    if outFile is None:
+        stem = inFile.rsplit('.', 1)[0] if '.' in inFile else inFile
+        outFile = stem + ('.txt' if toText else BINARY_EXTENSION)
+    if toText:
+        binaryToText(inFile, outFile)
+    else:
+        textToBinary(inFile, outFile)
+    return outFile
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in {2, 3}:
+        print("Usage: python MazeFormat.py inFile [outFile]")
+        sys.exit(1)
+    print("Wrote", convertMaze(*sys.argv[1:]))
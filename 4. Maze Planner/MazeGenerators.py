@@ -0,0 +1,254 @@
+"""  =================================================================
+File: MazeGenerators.py
+
+This file contains fast generators for the terrain of large mazes. They make the same kinds of
+landscape as MazeInfo's generateFlatLandscape and generateHillyLandscape, but work on whole NumPy
+arrays at once instead of one cell at a time, and take an explicit seed so that a maze can be made
+again exactly. They return the flat arrays that ArrayMazeInfo keeps: an array('i') of weights and
+a bytearray with 1 for each blocked cell, both indexed by row * numCols + col.
+
+NumPy is needed for these generators only; the rest of the Maze Planner does not use it.
+
+It also contains generators for mazes with walls and corridors: perfect mazes, which have exactly one
+path between any two open cells, made by the randomized backtracker or randomized Kruskal's algorithm, and
+braided mazes, perfect mazes with some of their dead ends opened up into loops. These work one cell at a
+time, but iteratively and on flat arrays, and do not need NumPy.
+ ==================================================================="""
+
+import random
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+RING_BATCHES = 8     # how many batches each ring of the hilly flood fill is filled in
+
+
+def haveNumpy():
+    """Returns True if NumPy can be imported, so the generators in this file can be used"""
+    return numpy is not None
+
+
+def generateFlatArrays(numRows, numCols, percBlocked=0.0, seed=None, minCost=1):
+    """Makes a flat landscape, where every cell has weight minCost, and blocks percBlocked of the cells,
+    chosen at random. Returns the weights and the blocked mask."""
+    rng = _makeRandom(seed)
+    numCells = numRows * numCols
+    weights = numpy.full(numCells, minCost, dtype=numpy.int32)
+    return _toArrays(weights, _chooseBlocked(rng, numCells, percBlocked))
+
+
+def generateHillyArrays(numRows, numCols, percBlocked=0.0, seed=None, minCost=1, maxCost=50, percPeaks=0.05):
+    """Makes a hilly landscape, and blocks percBlocked of the cells, chosen at random. Returns the weights
+    and the blocked mask.
+    As in MazeInfo.generateHillyLandscape, percPeaks of the cells are peaks, with weights in the top 20% of
+    the range, and the rest are filled in by a flood fill outward from the peaks through all 8 neighbors:
+    each cell gets the average of its filled-in neighbors plus a random change between -40% of maxCost
+    and +1. The flood fill goes one ring at a time. Each ring is shuffled and filled in RING_BATCHES
+    batches, so that, as in the one-cell-at-a-time version, later cells of a ring also average in the
+    ring's earlier cells."""
+    rng = _makeRandom(seed)
+    numCells = numRows * numCols
+    blocked = _chooseBlocked(rng, numCells, percBlocked)
+    numPeaks = int(numCells * percPeaks)
+    if numPeaks == 0:
+        return _toArrays(numpy.full(numCells, minCost, dtype=numpy.int32), blocked)
+
+    # The grid gets a border of never-filled cells, so that the 8 neighbors of any real cell are
+    # at fixed offsets in the flat arrays.
+    width = numCols + 2
+    inside = numpy.zeros((numRows + 2, width), dtype=bool)
+    inside[1:-1, 1:-1] = True
+    inside = inside.ravel()
+    weights = numpy.zeros(inside.size, dtype=numpy.int32)
+    filled = numpy.zeros(inside.size, dtype=bool)
+    offsets = numpy.array([-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1])
+
+    peaks = rng.choice(numCells, numPeaks, replace=False)
+    peaks = (peaks // numCols + 1) * width + peaks % numCols + 1
+    weights[peaks] = rng.integers(4 * maxCost // 5, maxCost + 1, numPeaks)
+    filled[peaks] = True
+
+    minDelta = -2 * maxCost // 5
+    ring = peaks
+    while True:
+        neighs = (ring[:, None] + offsets).ravel()
+        neighs = neighs[inside[neighs] & ~filled[neighs]]
+        if len(neighs) == 0:
+            break
+        nextRing = numpy.zeros(inside.size, dtype=bool)
+        nextRing[neighs] = True
+        ring = rng.permutation(numpy.flatnonzero(nextRing))
+        for batch in numpy.array_split(ring, min(RING_BATCHES, len(ring))):
+            around = batch[:, None] + offsets
+            average = weights[around].sum(axis=1) / filled[around].sum(axis=1)
+            values = (average + rng.integers(minDelta, 2, len(batch))).astype(numpy.int32)
+            weights[batch] = numpy.clip(values, minCost, maxCost)
+            filled[batch] = True
+    return _toArrays(weights.reshape(numRows + 2, width)[1:-1, 1:-1], blocked)
+
+
+def _makeRandom(seed):
+    """Private: makes the NumPy random generator for the given seed, or reports that NumPy is missing"""
+    if numpy is None:
+        raise ImportError("MazeGenerators needs NumPy; install it or use MazeInfo's generators")
+    return numpy.random.default_rng(seed)
+
+
+def _chooseBlocked(rng, numCells, percBlocked):
+    """Private: picks int(numCells * percBlocked) distinct cells to block, sampling without replacement,
+    and returns a 0/1 mask of the cells"""
+    blocked = numpy.zeros(numCells, dtype=numpy.uint8)
+    numBlocked = int(numCells * percBlocked)
+    blocked[rng.choice(numCells, numBlocked, replace=False)] = 1
+    return blocked
+
+
+def _toArrays(weights, blocked):
+    """Private: converts NumPy weights and blocked mask to the array('i') and bytearray of ArrayMazeInfo"""
+    weightArray = array('i')
+    weightArray.frombytes(numpy.ascontiguousarray(weights, dtype=numpy.intc).tobytes())
+    return (weightArray, bytearray(blocked.tobytes()))
+
+
+def generatePerfectArrays(numRows, numCols, seed=None, algorithm='backtracker', minCost=1):
+    """Makes a perfect maze, with every open cell of weight minCost. The rooms of the maze are the cells
+    with odd row and column; a corridor is opened between two neighboring rooms by unblocking the cell
+    between them, so the outer edge is always wall (as is the last row or column if that dimension is
+    even). The algorithm is 'backtracker', a depth-first search with an explicit stack, which makes long
+    winding corridors, or 'kruskal', which joins rooms across walls taken in random order whenever they
+    are not yet connected, and makes many short dead ends. Returns the weights and the blocked mask."""
+    rng = random.Random(seed)
+    numCells = numRows * numCols
+    blocked = bytearray(b'\x01') * numCells
+    roomRows = max((numRows - 1) // 2, 0)
+    roomCols = max((numCols - 1) // 2, 0)
+    if roomRows > 0 and roomCols > 0:
+        for roomRow in range(roomRows):
+            start = (2 * roomRow + 1) * numCols + 1
+            blocked[start:start + 2 * roomCols:2] = bytes(roomCols)
+        if algorithm == 'backtracker':
+            _carveBacktracker(blocked, numCols, roomRows, roomCols, rng)
+        elif algorithm == 'kruskal':
+            _carveKruskal(blocked, numCols, roomRows, roomCols, rng)
+        else:
+            raise ValueError("Unknown maze algorithm: " + str(algorithm) + ", expected 'backtracker' or 'kruskal'")
+    return (array('i', [minCost]) * numCells, blocked)
+
+
+def generateBraidedArrays(numRows, numCols, seed=None, braid=0.5, algorithm='backtracker', minCost=1):
+    """Makes a braided maze: a perfect maze (see generatePerfectArrays) in which each dead end is opened,
+    with probability braid, by unblocking one of its walls, preferring a wall that leads to another dead
+    end. A braid of 1 leaves no dead ends. Returns the weights and the blocked mask."""
+    (weights, blocked) = generatePerfectArrays(numRows, numCols, seed, algorithm, minCost)
+    rng = random.Random(None if seed is None else seed + 1)
+    roomRows = max((numRows - 1) // 2, 0)
+    roomCols = max((numCols - 1) // 2, 0)
+    for roomRow in range(roomRows):
+        for roomCol in range(roomCols):
+            cell = (2 * roomRow + 1) * numCols + 2 * roomCol + 1
+            walls = _closedWalls(blocked, numCols, roomRows, roomCols, roomRow, roomCol)
+            if not walls or len(walls) != _numNeighbors(roomRows, roomCols, roomRow, roomCol) - 1 \
+                    or rng.random() >= braid:
+                continue
+            # a dead end: every wall to a neighboring room but one is closed (a room with only one
+            # neighboring room has no wall left to open)
+            deadEnds = [wall for wall in walls
+                        if _isDeadEnd(blocked, numCols, roomRows, roomCols, 2 * wall - cell)]
+            wall = rng.choice(deadEnds or walls)
+            blocked[wall] = 0
+    return (weights, blocked)
+
+
+def _carveBacktracker(blocked, numCols, roomRows, roomCols, rng):
+    """Private: opens the corridors of a randomized depth-first search from a random room. The stack
+    holds room numbers (roomRow * roomCols + roomCol) in an array, instead of recursing."""
+    numRooms = roomRows * roomCols
+    visited = bytearray(numRooms)
+    room = rng.randrange(numRooms)
+    visited[room] = 1
+    stack = array('i', [room])
+    rand = rng.random
+    while stack:
+        room = stack[-1]
+        (roomRow, roomCol) = divmod(room, roomCols)
+        choices = []
+        if roomRow > 0 and not visited[room - roomCols]:
+            choices.append(room - roomCols)
+        if roomCol < roomCols - 1 and not visited[room + 1]:
+            choices.append(room + 1)
+        if roomRow < roomRows - 1 and not visited[room + roomCols]:
+            choices.append(room + roomCols)
+        if roomCol > 0 and not visited[room - 1]:
+            choices.append(room - 1)
+        if not choices:
+            stack.pop()
+            continue
+        nextRoom = choices[int(rand() * len(choices))]
+        visited[nextRoom] = 1
+        (nextRow, nextCol) = divmod(nextRoom, roomCols)
+        blocked[(roomRow + nextRow + 1) * numCols + roomCol + nextCol + 1] = 0
+        stack.append(nextRoom)
+
+
+def _carveKruskal(blocked, numCols, roomRows, roomCols, rng):
+    """Private: randomized Kruskal's algorithm. Each wall between two rooms is numbered 2 * room (to the
+    east) or 2 * room + 1 (to the south); the walls are shuffled, and each is opened if the rooms on its two
+    sides are not yet connected, which is checked with a union-find forest (with path halving) in an array."""
+    numRooms = roomRows * roomCols
+    walls = [2 * room for room in range(numRooms) if room % roomCols != roomCols - 1]
+    walls.extend(2 * room + 1 for room in range(numRooms - roomCols))
+    rng.shuffle(walls)
+    parent = array('i', range(numRooms))
+    joined = 0
+    for wall in walls:
+        room = wall >> 1
+        other = room + roomCols if wall & 1 else room + 1
+        while parent[room] != room:
+            parent[room] = parent[parent[room]]
+            room = parent[room]
+        while parent[other] != other:
+            parent[other] = parent[parent[other]]
+            other = parent[other]
+        if room == other:
+            continue
+        parent[room] = other
+        room = wall >> 1
+        (roomRow, roomCol) = divmod(room, roomCols)
+        if wall & 1:
+            blocked[(2 * roomRow + 2) * numCols + 2 * roomCol + 1] = 0
+        else:
+            blocked[(2 * roomRow + 1) * numCols + 2 * roomCol + 2] = 0
+        joined += 1
+        if joined == numRooms - 1:
+            break
+
+
+def _numNeighbors(roomRows, roomCols, roomRow, roomCol):
+    """Private: the number of rooms next to a room"""
+    return (roomRow > 0) + (roomRow < roomRows - 1) + (roomCol > 0) + (roomCol < roomCols - 1)
+
+
+def _closedWalls(blocked, numCols, roomRows, roomCols, roomRow, roomCol):
+    """Private: the cells of the blocked walls between a room and its neighboring rooms"""
+    cell = (2 * roomRow + 1) * numCols + 2 * roomCol + 1
+    walls = []
+    if roomRow > 0 and blocked[cell - numCols]:
+        walls.append(cell - numCols)
+    if roomCol < roomCols - 1 and blocked[cell + 1]:
+        walls.append(cell + 1)
+    if roomRow < roomRows - 1 and blocked[cell + numCols]:
+        walls.append(cell + numCols)
+    if roomCol > 0 and blocked[cell - 1]:
+        walls.append(cell - 1)
+    return walls
+
+
+def _isDeadEnd(blocked, numCols, roomRows, roomCols, cell):
+    """Private: True if the room at the given cell has exactly one open wall"""
+    (row, col) = divmod(cell, numCols)
+    (roomRow, roomCol) = (row // 2, col // 2)
+    walls = _closedWalls(blocked, numCols, roomRows, roomCols, roomRow, roomCol)
+    return len(walls) == _numNeighbors(roomRows, roomCols, roomRow, roomCol) - 1
@@ -6,13 +6,61 @@ It really just keeps track of the maze information, and checks if a given
 cell is clear or filled.
  ==================================================================="""
 
+import mmap
 import random
+import struct
+import sys
+from array import array
+from itertools import compress
 from Queue import Queue
+import MazeGenerators
+
+
+# The binary maze format: a header, then the weights as little-endian 32-bit integers in row-major order, then
+# a bitmap of blocked cells, one bit per cell (cell i is bit i % 8 of byte i // 8). It is opened with
+# ArrayMazeInfo, which maps the file into memory rather than reading and parsing it.
+BINARY_MAGIC = b'MAZEBIN1'
+BINARY_HEADER = struct.Struct('<8s8i')    # magic, numRows, numCols, minCost, maxCost, start row/col, goal row/col
+BINARY_EXTENSION = '.bmaze'
+
+
+def isBinaryMazeFile(mapFile):
+    """Returns True if the given file starts with the binary maze header, and False otherwise"""
+    try:
+        with open(mapFile, 'rb') as filObj:
+            return filObj.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    except OSError:
+        return False
+
+
+def _packBits(mask):
+    """Packs a sequence of 0/1 bytes into a bitmap, eight cells per byte. Each bit position is done for all
+    bytes at once, with translate and big-integer operations, rather than one cell at a time."""
+    numBytes = (len(mask) + 7) // 8
+    padded = bytes(mask) + bytes(8 * numBytes - len(mask))
+    packed = 0
+    for bit in range(8):
+        table = bytes((b != 0) << bit for b in range(256))
+        packed |= int.from_bytes(padded[bit::8].translate(table), 'little')
+    return packed.to_bytes(numBytes, 'little')
+
+
+def _unpackBits(bits, numCells):
+    """Unpacks a bitmap made by _packBits into a bytearray with one 0/1 byte per cell"""
+    mask = bytearray(8 * len(bits))
+    for bit in range(8):
+        table = bytes((b >> bit) & 1 for b in range(256))
+        mask[bit::8] = bits.translate(table)
+    del mask[numCells:]
+    return mask
 
 
 class MazeInfo:
     """Represents a square grid maze.  You can set it up and then ask about
-    which cells are open or filled"""
+    which cells are open or filled. Other objects, such as an incremental solver, can register with
+    addChangeListener to be told whenever a cell's weight or blocked status changes."""
+
+    changeListeners = None
 
 
     def __init__(self, mode, reqInput, numCols = None, startPos = (-1, -1), goalPos = (-1, -1), percBlocked = 0.0):
@@ -230,6 +278,26 @@ class MazeInfo:
         return self.minCost
 
 
+    def hasIntegerWeights(self):
+        """Returns True if every cell weight is a non-negative integer"""
+        for w in self.weightMatrix.values():
+            if type(w) is not int or w < 0:
+                return False
+        return True
+
+
+    def getWeightArray(self):
+        """Returns a flat array of weights indexed by row * numCols + col, if the maze keeps one. The
+        dictionary-based MazeInfo does not, so this returns None; see ArrayMazeInfo."""
+        return None
+
+
+    def getNeighborTable(self):
+        """Returns a table of the accessible N, E, S, W neighbors of each cell, if the maze keeps one.
+        The dictionary-based MazeInfo does not, so this returns None; see ArrayMazeInfo."""
+        return None
+
+
     def getStartPos(self):
         """Returns the current starting position"""
         return self.startPos
@@ -270,13 +338,15 @@ class MazeInfo:
         if self.isOutOfBounds(row, col) or self.isBlocked(row, col):
             return
         else:
-
+            oldVal = self.weightMatrix[row, col]
             if newVal > self.maxCost:
                 self.weightMatrix[row, col] = self.maxCost
             elif newVal < self.minCost:
                 self.weightMatrix[row, col] = self.minCost
             else:
                 self.weightMatrix[row, col] = newVal
+            if self.weightMatrix[row, col] != oldVal:
+                self._cellChanged(row, col)
 
 
     def increaseWeight(self, row, col):
@@ -299,7 +369,9 @@ class MazeInfo:
 
     def addBlocked(self, row, col):
         """Adds (row, col) to the blocked set"""
-        self.blockedLocs.add( (row, col) )
+        if (row, col) not in self.blockedLocs:
+            self.blockedLocs.add( (row, col) )
+            self._cellChanged(row, col)
 
 
     def delBlocked(self, row, col):
@@ -308,6 +380,29 @@ class MazeInfo:
             self.blockedLocs.remove( (row, col) )
         except:
             pass
+        else:
+            self._cellChanged(row, col)
+
+
+    def addChangeListener(self, listener):
+        """Registers a function to be called as listener(row, col) after the weight or blocked status of
+        that cell changes. Moving the start or goal is not a cell change."""
+        if self.changeListeners is None:
+            self.changeListeners = []
+        self.changeListeners.append(listener)
+
+
+    def removeChangeListener(self, listener):
+        """Stops calling a listener registered with addChangeListener"""
+        if self.changeListeners is not None and listener in self.changeListeners:
+            self.changeListeners.remove(listener)
+
+
+    def _cellChanged(self, row, col):
+        """Tells each registered listener that (row, col) changed"""
+        if self.changeListeners:
+            for listener in list(self.changeListeners):
+                listener(row, col)
 
 
     def writeGridToFile(self, gridFile):
@@ -411,3 +506,339 @@ class MazeInfo:
                 else:
                     rowStr += "    "
             print(rowStr)
+
+
+
+class ArrayMazeInfo(MazeInfo):
+    """A MazeInfo that stores the maze in flat arrays rather than a dictionary and a set, so looking up a
+    cell is an index operation instead of building and hashing a (row, col) tuple. Cell (row, col) is at
+    index row * numCols + col of:
+    * self.weights, an array('i') of cell weights
+    * self.blocked, a bytearray with 1 for blocked cells
+    * the neighbor table from getNeighborTable, an array('i') with four entries per cell, the indices of the
+      N, E, S, and W neighbors, or -1 where that move is blocked or off the grid. It is built on first use
+      and kept up to date when cells are blocked or unblocked.
+    All of the MazeInfo accessors work the same. The modes are those of MazeInfo, and 'copy' takes any
+    MazeInfo object as the second input. In 'file' mode the file may also be in the binary maze format (see
+    writeGridToBinaryFile); it is then memory-mapped copy-on-write, so the weights are paged in as they are
+    used and edits never change the file. If NumPy is available, the 'gen-flat' and 'gen-hilly' modes use
+    the vectorized generators in MazeGenerators, and an optional seed makes the maze reproducible. Two more
+    modes make mazes of walls and corridors with MazeGenerators: 'gen-perfect', with exactly one path between
+    any two open cells, and 'gen-braided', where each dead end is opened into a loop with probability braid.
+    The algorithm, 'backtracker' or 'kruskal', picks the style of the corridors; percBlocked is not used."""
+
+    NO_NEIGHBOR = -1
+
+    def __init__(self, mode, reqInput, numCols = None, startPos = (-1, -1), goalPos = (-1, -1), percBlocked = 0.0,
+                 seed = None, braid = 0.5, algorithm = 'backtracker'):
+        """Takes the same inputs as MazeInfo, plus a seed for the generators, and the braid and algorithm of
+        the maze modes. The maze is read or generated straight into the arrays where possible, and otherwise
+        made the usual way and moved into them."""
+        self.neighborTable = None
+        self.mapData = None
+        self.numNegativeWeights = None
+        if mode == 'copy':
+            self._copyFrom(reqInput)
+        elif mode == 'file' and isBinaryMazeFile(reqInput):
+            self._readBinaryMaze(reqInput)
+        elif mode == 'file':
+            self._readTextMaze(reqInput)
+        elif mode in {'gen-hilly', 'gen-flat'} and MazeGenerators.haveNumpy():
+            self._generateArrays(mode, reqInput, numCols, startPos, goalPos, percBlocked, seed)
+        elif mode in {'gen-perfect', 'gen-braided'}:
+            self._generateArrays(mode, reqInput, numCols, startPos, goalPos, 0.0, seed, braid, algorithm)
+        else:
+            MazeInfo.__init__(self, mode, reqInput, numCols, startPos, goalPos, percBlocked)
+            self._moveToArrays(self.weightMatrix, self.blockedLocs)
+            self.weightMatrix = None
+            self.blockedLocs = None
+
+
+    def _moveToArrays(self, weightMatrix, blockedLocs):
+        """Builds the weight array and blocked mask from a (row, col) -> weight dictionary and a set of
+        blocked (row, col) locations."""
+        numCols = self.numCols
+        self.weights = array('i', bytes(4 * self.numRows * numCols))
+        self.blocked = bytearray(self.numRows * numCols)
+        for ((row, col), weight) in weightMatrix.items():
+            self.weights[row * numCols + col] = weight
+        for (row, col) in blockedLocs:
+            if not self.isOutOfBounds(row, col):
+                self.blocked[row * numCols + col] = 1
+
+
+    def _generateArrays(self, mode, numRows, numCols, startPos, goalPos, percBlocked, seed, braid = 0.5,
+                        algorithm = 'backtracker'):
+        """Generates a flat, hilly, perfect or braided maze with the generators in MazeGenerators"""
+        self.numRows = numRows
+        self.numCols = numRows if numCols is None else numCols
+        self.startPos = startPos
+        self.goalPos = goalPos
+        self.percBlocked = percBlocked
+        self.minCost = 1
+        self.maxCost = 50
+        if mode == 'gen-hilly':
+            (self.weights, self.blocked) = MazeGenerators.generateHillyArrays(
+                self.numRows, self.numCols, percBlocked, seed, self.minCost, self.maxCost)
+        elif mode == 'gen-perfect':
+            (self.weights, self.blocked) = MazeGenerators.generatePerfectArrays(
+                self.numRows, self.numCols, seed, algorithm, self.minCost)
+        elif mode == 'gen-braided':
+            (self.weights, self.blocked) = MazeGenerators.generateBraidedArrays(
+                self.numRows, self.numCols, seed, braid, algorithm, self.minCost)
+        else:
+            (self.weights, self.blocked) = MazeGenerators.generateFlatArrays(
+                self.numRows, self.numCols, percBlocked, seed, self.minCost)
+
+
+    def _copyFrom(self, other):
+        """Fills in the arrays and other instance variables from another MazeInfo."""
+        self.numRows = other.getNumRows()
+        self.numCols = other.getNumCols()
+        self.minCost = other.getMinWeight()
+        self.maxCost = other.getMaxWeight()
+        self.startPos = other.getStartPos()
+        self.goalPos = other.getGoalPos()
+        self.percBlocked = getattr(other, 'percBlocked', 0.0)
+        otherWeights = other.getWeightArray()
+        if otherWeights is not None:
+            self.weights = array('i')
+            self.weights.frombytes(memoryview(otherWeights).cast('B'))
+            self.blocked = bytearray(other.blocked)
+        else:
+            self._moveToArrays(other.weightMatrix, other.blockedLocs)
+
+
+    def _readTextMaze(self, mapFile):
+        """Reads a maze in the text format of MazeInfo straight into the arrays, a whole row of weights
+        at a time, instead of building the dictionary first."""
+        try:
+            filObj = open(mapFile, 'r')
+        except:
+            raise FileExistsError("ERROR READING FILE, ABORTING")
+        with filObj:
+            lines = (line for line in filObj if not (line.isspace() or line[0] == '#'))
+            [hgt, wid] = [int(s) for s in next(lines).split()]
+            self.numRows = wid
+            self.numCols = hgt
+            [self.minCost, self.maxCost] = [int(s) for s in next(lines).split()]
+            self.startPos = [int(s) for s in next(lines).split()]
+            self.goalPos = [int(s) for s in next(lines).split()]
+            self.percBlocked = 0.0
+            self.blocked = bytearray(self.numRows * self.numCols)
+            for line in lines:
+                if line[0] == '[':
+                    continue
+                elif line[0] == ']':
+                    break
+                [blockRow, blockCol] = [int(s) for s in line.split()]
+                if not self.isOutOfBounds(blockRow, blockCol):
+                    self.blocked[blockRow * self.numCols + blockCol] = 1
+            self.weights = array('i')
+            for line in lines:
+                self.weights.extend(map(int, line.split()[:wid]))
+        if len(self.weights) != self.numRows * self.numCols:
+            raise ValueError("Maze file has the wrong number of weights: " + str(mapFile))
+
+
+    def _readBinaryMaze(self, mapFile):
+        """Opens a file in the binary maze format. The weights stay in the memory-mapped file, viewed as an
+        array of integers; only the blocked bitmap is unpacked."""
+        try:
+            filObj = open(mapFile, 'rb')
+        except:
+            raise FileExistsError("ERROR READING FILE, ABORTING")
+        with filObj:
+            self.mapData = mmap.mmap(filObj.fileno(), 0, access=mmap.ACCESS_COPY)
+        (magic, self.numRows, self.numCols, self.minCost, self.maxCost,
+         startRow, startCol, goalRow, goalCol) = BINARY_HEADER.unpack_from(self.mapData)
+        if magic != BINARY_MAGIC:
+            raise ValueError("Not a binary maze file: " + str(mapFile))
+        self.startPos = (startRow, startCol)
+        self.goalPos = (goalRow, goalCol)
+        self.percBlocked = 0.0
+        numCells = self.numRows * self.numCols
+        weightsStart = BINARY_HEADER.size
+        blockedStart = weightsStart + 4 * numCells
+        blockedEnd = blockedStart + (numCells + 7) // 8
+        if len(self.mapData) < blockedEnd:
+            raise ValueError("Binary maze file is truncated: " + str(mapFile))
+        weights = memoryview(self.mapData)[weightsStart:blockedStart].cast('i')
+        if sys.byteorder == 'big':
+            weights = array('i', weights)
+            weights.byteswap()
+        self.weights = weights
+        self.blocked = _unpackBits(self.mapData[blockedStart:blockedEnd], numCells)
+
+
+    def writeGridToBinaryFile(self, gridFile):
+        """Takes a filename and writes the maze to it in the binary maze format"""
+        try:
+            filObj = open(gridFile, 'wb')
+        except:
+            raise FileExistsError("ERROR OPENING FILE, ABORTING")
+        with filObj:
+            filObj.write(BINARY_HEADER.pack(BINARY_MAGIC, self.numRows, self.numCols, self.minCost, self.maxCost,
+                                            self.startPos[0], self.startPos[1], self.goalPos[0], self.goalPos[1]))
+            if sys.byteorder == 'big':
+                weights = array('i', self.weights)
+                weights.byteswap()
+                filObj.write(weights)
+            else:
+                filObj.write(memoryview(self.weights).cast('B'))
+            filObj.write(_packBits(self.blocked))
+
+
+    def getWeightArray(self):
+        """Returns the flat array of weights, indexed by row * numCols + col"""
+        return self.weights
+
+
+    def getNeighborTable(self):
+        """Returns the neighbor table (four entries per cell: the index of the N, E, S, W neighbor or -1),
+        building it the first time it is asked for. Each direction is first filled in as if nothing were
+        blocked, using ranges and slice assignments, and then only the blocked cells are patched."""
+        if self.neighborTable is None:
+            numRows = self.numRows
+            numCols = self.numCols
+            numCells = numRows * numCols
+            noRow = array('i', [self.NO_NEIGHBOR]) * numCols
+            noCol = array('i', [self.NO_NEIGHBOR]) * numRows
+            north = array('i', range(-numCols, numCells - numCols))
+            north[0:numCols] = noRow
+            east = array('i', range(1, numCells + 1))
+            east[numCols - 1::numCols] = noCol
+            south = array('i', range(numCols, numCells + numCols))
+            south[numCells - numCols:] = noRow
+            west = array('i', range(-1, numCells - 1))
+            west[0::numCols] = noCol
+            table = array('i', bytes(4 * 4 * numCells))
+            table[0::4] = north
+            table[1::4] = east
+            table[2::4] = south
+            table[3::4] = west
+            self.neighborTable = table
+            for cell in compress(range(numCells), self.blocked):
+                self._patchNeighborTable(cell // numCols, cell % numCols)
+        return self.neighborTable
+
+
+    def _patchNeighborTable(self, row, col):
+        """After (row, col) is blocked or unblocked, fixes the entries of its four neighbors that point to it."""
+        table = self.neighborTable
+        if table is None:
+            return
+        cell = row * self.numCols + col
+        target = self.NO_NEIGHBOR if self.blocked[cell] else cell
+        # (neighbor row, neighbor col, entry of that neighbor that points back at this cell)
+        for (nRow, nCol, entry) in ((row + 1, col, 0), (row, col - 1, 1), (row - 1, col, 2), (row, col + 1, 3)):
+            if not self.isOutOfBounds(nRow, nCol):
+                table[4 * (nRow * self.numCols + nCol) + entry] = target
+
+
+    def hasIntegerWeights(self):
+        """Returns True if every cell weight is a non-negative integer. The weights are stored as integers,
+        so only the sign needs checking: the negative weights are counted the first time this is asked, and
+        setWeight keeps the count up to date after that, so later searches do not scan the maze again."""
+        if self.numNegativeWeights is None:
+            self.numNegativeWeights = sum(1 for weight in self.weights if weight < 0)
+        return self.numNegativeWeights == 0
+
+
+    def isAccessible(self, row, col):
+        """Given a row and column coordinate, returns True if the given cell is neither
+        blocked nor out of bounds, and False otherwise"""
+        return 0 <= row < self.numRows and 0 <= col < self.numCols and not self.blocked[row * self.numCols + col]
+
+
+    def isBlocked(self, row, col):
+        """Returns True if the given cell is blocked (the agent cannot go there), and False otherwise."""
+        return (not self.isOutOfBounds(row, col)) and self.blocked[row * self.numCols + col] == 1
+
+
+    def getWeight(self, row, col):
+        """Given a row and column, look up the terrain value for that position."""
+        if not self.isAccessible(row, col):
+            return -1
+        else:
+            return self.weights[row * self.numCols + col]
+
+
+    def setWeight(self, row, col, newVal):
+        """Takes in the row and column and a new weight value, and it updates the weight."""
+        if self.isAccessible(row, col):
+            cell = row * self.numCols + col
+            oldVal = self.weights[cell]
+            self.weights[cell] = int(min(max(newVal, self.minCost), self.maxCost))
+            if self.weights[cell] != oldVal:
+                if self.numNegativeWeights is not None:
+                    self.numNegativeWeights += (self.weights[cell] < 0) - (oldVal < 0)
+                self._cellChanged(row, col)
+
+
+    def increaseWeight(self, row, col):
+        """Increases the weight at (row, col) by one."""
+        if self.isAccessible(row, col):
+            self.setWeight(row, col, self.weights[row * self.numCols + col] + 1)
+
+
+    def decreaseWeight(self, row, col):
+        """Decreases the weight at (row, col) by one."""
+        if self.isAccessible(row, col):
+            self.setWeight(row, col, self.weights[row * self.numCols + col] - 1)
+
+
+    def addBlocked(self, row, col):
+        """Marks (row, col) as blocked"""
+        if not self.isOutOfBounds(row, col) and not self.blocked[row * self.numCols + col]:
+            self.blocked[row * self.numCols + col] = 1
+            self._patchNeighborTable(row, col)
+            self._cellChanged(row, col)
+
+
+    def delBlocked(self, row, col):
+        """Marks (row, col) as not blocked."""
+        if not self.isOutOfBounds(row, col) and self.blocked[row * self.numCols + col]:
+            self.blocked[row * self.numCols + col] = 0
+            self._patchNeighborTable(row, col)
+            self._cellChanged(row, col)
+
+
+    def writeGridToFile(self, gridFile):
+        """Takes a filename and writes the grid to the file, in the same text format as MazeInfo."""
+        try:
+            filObj = open(gridFile, 'w')
+        except:
+            raise FileExistsError("ERROR OPENING FILE, ABORTING")
+
+        filObj.write("# Gridmap generated by GridMapGenerator\n")
+        filObj.write("# height width:\n")
+        filObj.write(str(self.numRows) + " " + str(self.numCols) + '\n')
+        filObj.write("# minCost maxCost\n")
+        filObj.write(str(self.minCost) + ' ' + str(self.maxCost) + '\n')
+        filObj.write("# starting position:\n")
+        filObj.write(str(self.startPos[0]) + ' ' + str(self.startPos[1]) + '\n')
+        filObj.write("# goal position:\n")
+        filObj.write(str(self.goalPos[0]) + ' ' + str(self.goalPos[1]) + '\n')
+        filObj.write("# Blocked cells list\n")
+        filObj.write("[\n")
+        for cell in range(len(self.blocked)):
+            if self.blocked[cell]:
+                (r, c) = divmod(cell, self.numCols)
+                filObj.write(str(r) + ' ' + str(c) + '\n')
+        filObj.write(']\n')
+        filObj.write("# Map: \n")
+        for r in range(self.numRows):
+            rowWeights = self.weights[r * self.numCols:(r + 1) * self.numCols]
+            filObj.write(" ".join(map(str, rowWeights)) + " \n")
+        filObj.close()
+
+
+    def _printMaze(self):
+        """Helper to print the grid representation, mostly for debugging."""
+        print("Size:", self.numRows, self.numCols)
+        print("Starting position:", self.startPos)
+        print("Goal position:", self.goalPos)
+        for row in range(self.numRows):
+            rowWeights = self.weights[row * self.numCols:(row + 1) * self.numCols]
+            print(" ".join(str(val).rjust(3) for val in rowWeights))
@@ -0,0 +1,277 @@
+"""  =================================================================
+File: MazeLandmarks.py
+
+This file contains ALT preprocessing (A*, Landmarks and the Triangle inequality)
+for weighted mazes, and an A* task advisor that uses it. The city-block distance
+counts every step as the lowest weight, so on hilly mazes A* with it expands nearly
+as much as UCS. Instead, a few landmark cells are chosen far apart, the cost from
+each landmark to every cell is found once with Dijkstra's algorithm, and the
+triangle inequality then turns those costs into a much tighter lower bound on the
+cost between any two cells.
+
+The landmark table of a maze file is saved next to it, with LANDMARK_EXTENSION added
+to its name, and is used again as long as the maze has not changed. From the command
+line:
+    python MazeLandmarks.py mazes/*.txt -k 8
+builds and saves the tables ahead of time.
+ ==================================================================="""
+
+import argparse
+import heapq
+import mmap
+import random
+import struct
+import sys
+import zlib
+from array import array
+
+from MazeInfo import ArrayMazeInfo
+from MazeStateAdvisors import AStarMazeAdvisor
+
+
+# The landmark file format: a header, the cells of the landmarks, then for each landmark the cost from it to
+# every cell, all as little-endian 32-bit integers. The checksum is that of the maze's weights and blocked
+# cells, so a table is not used with a maze that has been edited since it was made.
+LANDMARK_MAGIC = b'MAZELMK1'
+LANDMARK_HEADER = struct.Struct('<8s3iI')   # magic, numRows, numCols, numLandmarks, maze checksum
+LANDMARK_EXTENSION = '.landmarks'
+DEFAULT_LANDMARKS = 8
+
+# The cost stored for cells a landmark can not reach
+UNREACHED = 2 ** 31 - 1
+
+
+def mazeChecksum(maze):
+    """Returns a CRC-32 of the maze's weights and blocked cells"""
+    if not isinstance(maze, ArrayMazeInfo):
+        maze = ArrayMazeInfo('copy', maze)
+    checksum = zlib.crc32(memoryview(maze.getWeightArray()).cast('B'))
+    return zlib.crc32(maze.blocked, checksum)
+
+
+class LandmarkTable:
+    """The landmarks of one maze and, for each, an array of costs from it to every cell. A cost counts the
+    weights of all the cells on the cheapest path, both ends included; that way the cost between two cells
+    is the same in both directions, and a path's cost in the convention of MazeGUI.wrapUpSearch (the
+    weights of the cells it leaves) is this cost less the weight of the last cell."""
+
+    def __init__(self, numRows, numCols, cells, costs, checksum):
+        """Takes the maze size, the list of landmark cell indices, the list of their cost arrays (or
+        integer memoryviews), and the checksum of the maze they were made for"""
+        self.numRows = numRows
+        self.numCols = numCols
+        self.cells = cells
+        self.costs = costs
+        self.checksum = checksum
+        self.mapData = None
+
+
+    def getLandmarks(self):
+        """Returns the list of (row, col) landmarks"""
+        return [(cell // self.numCols, cell % self.numCols) for cell in self.cells]
+
+
+    def getNumLandmarks(self):
+        """Returns the number of landmarks"""
+        return len(self.cells)
+
+
+    def matches(self, maze):
+        """Returns True if the table was made for a maze with the same size, weights and blocked cells"""
+        return (maze.getNumRows(), maze.getNumCols()) == (self.numRows, self.numCols) and \
+            mazeChecksum(maze) == self.checksum
+
+
+    def costBound(self, fromCell, toCell, fromWeight, toWeight):
+        """Returns a lower bound on the cost, both ends included, of a path between two cells, given their
+        weights. For each landmark L, the triangle inequality gives cost(from, to) >= cost(L, to) -
+        cost(L, from) + weight(from), and the same with the two cells swapped; the bound is the largest of
+        these over the landmarks that reach both cells (or zero)."""
+        best = 0
+        for costs in self.costs:
+            fromCost = costs[fromCell]
+            toCost = costs[toCell]
+            if fromCost == UNREACHED or toCost == UNREACHED:
+                continue
+            if toCost - fromCost + fromWeight > best:
+                best = toCost - fromCost + fromWeight
+            if fromCost - toCost + toWeight > best:
+                best = fromCost - toCost + toWeight
+        return best
+
+
+    def save(self, fileName):
+        """Writes the table to a file in the landmark format"""
+        try:
+            filObj = open(fileName, 'wb')
+        except:
+            raise FileExistsError("ERROR OPENING FILE, ABORTING")
+        with filObj:
+            filObj.write(LANDMARK_HEADER.pack(LANDMARK_MAGIC, self.numRows, self.numCols, len(self.cells),
+                                              self.checksum))
+            for data in [array('i', self.cells)] + self.costs:
+                if sys.byteorder == 'big':
+                    data = array('i', data)
+                    data.byteswap()
+                filObj.write(memoryview(data).cast('B'))
+
+
+
+def buildLandmarks(maze, numLandmarks = DEFAULT_LANDMARKS, seed = None):
+    """Chooses up to numLandmarks landmarks by farthest-point selection and returns their LandmarkTable.
+    Starting from the maze's start cell (or a random open cell if it has none), the first landmark is the
+    cell farthest from it, and each next one is the cell whose cost to the nearest landmark chosen so far is
+    the largest. Only cells connected to that first cell are considered. Each landmark takes one Dijkstra
+    search of the whole maze, whose costs are kept as that landmark's costs."""
+    if not isinstance(maze, ArrayMazeInfo):
+        maze = ArrayMazeInfo('copy', maze)
+    numRows = maze.getNumRows()
+    numCols = maze.getNumCols()
+    weights = maze.getWeightArray()
+    table = maze.getNeighborTable()
+    cells = []
+    costs = []
+    (row, col) = maze.getStartPos()
+    if maze.isOutOfBounds(row, col) or maze.isBlocked(row, col):
+        openCells = [cell for cell in range(numRows * numCols) if not maze.blocked[cell]]
+        if not openCells:
+            return LandmarkTable(numRows, numCols, cells, costs, mazeChecksum(maze))
+        (row, col) = divmod(random.Random(seed).choice(openCells), numCols)
+    nearest = array('i', (-1 if cost == UNREACHED else cost
+                          for cost in _costsFrom(weights, table, row * numCols + col)))
+    while len(cells) < numLandmarks:
+        landmark = max(range(len(nearest)), key=nearest.__getitem__)
+        if nearest[landmark] <= 0 and cells:
+            break       # every reachable cell is a landmark already
+        landmarkCosts = _costsFrom(weights, table, landmark)
+        cells.append(landmark)
+        costs.append(landmarkCosts)
+        nearest = array('i', map(min, nearest, landmarkCosts))
+        nearest[landmark] = 0
+    return LandmarkTable(numRows, numCols, cells, costs, mazeChecksum(maze))
+
+
+def _costsFrom(weights, table, source):
+    """Runs Dijkstra's algorithm over the whole maze from the source cell, and returns an array with the
+    cost from the source to each cell, both ends included, or UNREACHED"""
+    costs = array('i', [UNREACHED]) * len(weights)
+    costs[source] = weights[source]
+    heap = [(weights[source], source)]
+    while heap:
+        (cost, cell) = heapq.heappop(heap)
+        if cost > costs[cell]:
+            continue
+        base = 4 * cell
+        for neighbor in table[base:base + 4]:
+            if neighbor >= 0:
+                newCost = cost + weights[neighbor]
+                if newCost < costs[neighbor]:
+                    costs[neighbor] = newCost
+                    heapq.heappush(heap, (newCost, neighbor))
+    return costs
+
+
+def loadLandmarks(fileName, maze = None):
+    """Opens a landmark file, memory-mapped so the costs are paged in as they are used, and returns its
+    LandmarkTable. Returns None if the file is missing or not a landmark file, or, if a maze is given, if
+    the table was not made for that maze."""
+    try:
+        filObj = open(fileName, 'rb')
+    except OSError:
+        return None
+    with filObj:
+        try:
+            mapData = mmap.mmap(filObj.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None     # an empty file
+    if len(mapData) < LANDMARK_HEADER.size:
+        return None
+    (magic, numRows, numCols, numLandmarks, checksum) = LANDMARK_HEADER.unpack_from(mapData)
+    numCells = numRows * numCols
+    if magic != LANDMARK_MAGIC or len(mapData) < LANDMARK_HEADER.size + 4 * numLandmarks * (numCells + 1):
+        return None
+    words = memoryview(mapData)[LANDMARK_HEADER.size:].cast('i')
+    if sys.byteorder == 'big':
+        words = array('i', words)
+        words.byteswap()
+    cells = list(words[:numLandmarks])
+    costs = [words[numLandmarks + i * numCells:numLandmarks + (i + 1) * numCells] for i in range(numLandmarks)]
+    landmarks = LandmarkTable(numRows, numCols, cells, costs, checksum)
+    landmarks.mapData = mapData
+    if maze is not None and not landmarks.matches(maze):
+        return None
+    return landmarks
+
+
+def landmarksForMazeFile(mazeFile, maze = None, numLandmarks = DEFAULT_LANDMARKS, seed = None):
+    """Returns the landmark table for a maze file: the one saved next to it if it is up to date and has at
+    least numLandmarks landmarks, and otherwise a new one, which is saved there for next time (unless the
+    directory can not be written). The maze is read from the file if it is not given."""
+    if maze is None:
+        maze = ArrayMazeInfo('file', mazeFile)
+    landmarks = loadLandmarks(mazeFile + LANDMARK_EXTENSION, maze)
+    if landmarks is None or landmarks.getNumLandmarks() < numLandmarks:
+        landmarks = buildLandmarks(maze, numLandmarks, seed)
+        try:
+            landmarks.save(mazeFile + LANDMARK_EXTENSION)
+        except OSError:
+            pass
+    return landmarks
+
+
+
+class ALTMazeAdvisor(AStarMazeAdvisor):
+    """This task advisor is AStarMazeAdvisor with the ALT heuristic: the larger of the city-block distance
+    and the landmark bound of LandmarkTable.costBound, which is consistent (as the largest of consistent
+    heuristics), so A* still finds the cheapest path. Searching backward, as the bidirectional solver does,
+    the bound is toward the start. It takes a LandmarkTable for the maze, which it builds if none is given;
+    building one takes numLandmarks searches of the whole maze, so share a table between searches."""
+
+    def __init__(self, mazeMap, startRow, startCol, goalRow, goalCol, landmarks = None,
+                 numLandmarks = DEFAULT_LANDMARKS):
+        """Sets up like AStarMazeAdvisor, with the given or a new LandmarkTable"""
+        if landmarks is None:
+            landmarks = buildLandmarks(mazeMap, numLandmarks)
+        self.landmarks = landmarks
+        AStarMazeAdvisor.__init__(self, mazeMap, startRow, startCol, goalRow, goalCol)
+
+
+    def getLandmarks(self):
+        """Returns the LandmarkTable, to reuse for another search of the same maze"""
+        return self.landmarks
+
+
+    def _calcDistToGoal(self, row, col):
+        """A bound on the weights of the cells entered after (row, col) on the way to the goal: the landmark
+        bound on the cost between the two cells, less the weight of (row, col) itself"""
+        numCols = self.numCols
+        weight = self._cellWeight(row, col)
+        bound = self.landmarks.costBound(row * numCols + col, self.goalRow * numCols + self.goalCol, weight,
+                                         self._cellWeight(self.goalRow, self.goalCol)) - weight
+        return max(bound, AStarMazeAdvisor._calcDistToGoal(self, row, col))
+
+
+    def _calcDistToStart(self, row, col):
+        """Searching backward, a bound on the g of a forward state at (row, col): the landmark bound on the
+        cost between the start and (row, col), both ends included"""
+        numCols = self.numCols
+        bound = self.landmarks.costBound(self.startRow * numCols + self.startCol, row * numCols + col,
+                                         self._cellWeight(self.startRow, self.startCol), self._cellWeight(row, col))
+        return max(bound, AStarMazeAdvisor._calcDistToStart(self, row, col))
+
+
+
+def main(argv=None):
+    """Reads the command line, and builds and saves the landmark table of each maze file"""
+    parser = argparse.ArgumentParser(description="Build the ALT landmark tables of maze files")
+    parser.add_argument('mazes', nargs='+', help="maze files, text or binary")
+    parser.add_argument('-k', '--landmarks', type=int, default=DEFAULT_LANDMARKS, help="landmarks per maze")
+    parser.add_argument('-s', '--seed', type=int, default=None, help="seed for mazes without a start")
+    args = parser.parse_args(argv)
+    for mazeFile in args.mazes:
+        landmarks = landmarksForMazeFile(mazeFile, None, args.landmarks, args.seed)
+        print(mazeFile + LANDMARK_EXTENSION, landmarks.getNumLandmarks(), "landmarks")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,18 +6,40 @@ GUI for this problem.  This must be run in Python 3!
  ==================================================================="""
 
 #
+import shutil
+import tempfile
+import time
 from tkinter import *
 import tkinter.filedialog as tkFileDialog
 
-from SearchSolver import BestFirstSearchSolver, NoCostSearchSolver
+from SearchSolver import BestFirstSearchSolver, NoCostSearchSolver, BidirectionalSearchSolver, IDAStarSearchSolver
 from  MazeStateAdvisors import MazeTaskAdvisor, UCSMazeAdvisor, GreedyMazeAdvisor, AStarMazeAdvisor
-from MazeInfo import MazeInfo
+from MazeInfo import ArrayMazeInfo, BINARY_EXTENSION
+from DStarLite import DStarLiteSolver
+from MazeCorridors import CorridorAStarAdvisor
+from MazeLandmarks import ALTMazeAdvisor, buildLandmarks
+import SearchTrace
 
 
 
 class MazeGUI:
-    """Set up and manage all the variables for the GUI interface."""
-    
+    """Set up and manage all the variables for the GUI interface.
+    While a search runs, cell color changes are collected (the last color for each cell wins) and drawn in
+    batches: at most redrawRate times per second, or every redrawSteps search steps if that is set. Mazes
+    with more than IMAGE_MODE_CELLS cells are drawn as a single PhotoImage, one pixel per cell scaled to
+    fit the canvas, instead of one canvas rectangle per cell.
+    Run Search does not block the Tk main loop: it runs the search in slices of at most SLICE_SECONDS,
+    scheduled with root.after, so the window stays responsive and the Stop button can end the run.
+    With Record Trace checked, a search is recorded to a trace (see SearchTrace). The last trace, or one loaded
+    from a file, can be replayed at any speed, and the slider jumps straight to any step of it."""
+
+    IMAGE_MODE_CELLS = 10000
+    SLICE_SECONDS = 0.03
+
+    # The cell color for each status in a trace
+    TRACE_COLORS = {SearchTrace.FRINGE: "light blue", SearchTrace.VISITED: "light pink",
+                    SearchTrace.CURRENT: "magenta"}
+
     def __init__(self, dimension):
         """Given the dimension of the maze, set up a new Tk object of the right size"""
         self.root = Tk()
@@ -25,6 +47,22 @@ class MazeGUI:
         self.numRows = dimension
         self.numCols = dimension
         self.blockPerc = 0.0
+        self.redrawRate = 20
+        self.redrawSteps = None
+        self.pendingColors = {}
+        self.stepsSinceRedraw = 0
+        self.lastRedraw = 0.0
+        self.imageMode = False
+        self.imageColors = {}
+        self.searchRunning = False
+        self.sliceJob = None
+        self.traceFile = None
+        self.trace = None
+        self.traceStep = 0
+        self.traceShownStep = None
+        self.traceSteps = None
+        self.traceCurrent = -1
+        self.replayJob = None
  
     def setupWidgets(self):
         """Set up all the parts of the GUI."""
@@ -45,6 +83,9 @@ class MazeGUI:
         
         # Create the legend frame
         self._initLegend()
+
+        # Create the trace replay frame
+        self._initTraceTools()
     # end setupWidgets
 
 
@@ -182,7 +223,7 @@ class MazeGUI:
         self.canvas.grid(row = 1, column = 1)
         self.canvas.bind("<Button-1>", self.leftClickCallback)
         self.canvas.bind("<B1-Motion>", self.motionCallback)
-        self.maze = MazeInfo('gen-hilly', self.numRows, self.numCols,
+        self.maze = ArrayMazeInfo('gen-hilly', self.numRows, self.numCols,
                              (0, 0), (self.numRows - 1, self.numCols - 1),
                              self.blockPerc)
 
@@ -209,10 +250,25 @@ class MazeGUI:
                                    variable = self.searchType, value = "dfs")
         aStarButton = Radiobutton(searchFrame, text = "A-Star Search",
                                   variable = self.searchType, value = "astar")
+        bidirButton = Radiobutton(searchFrame, text = "Bidirectional UCS",
+                                  variable = self.searchType, value = "bidir")
+        idaStarButton = Radiobutton(searchFrame, text = "IDA-Star Search",
+                                    variable = self.searchType, value = "idastar")
+        dStarButton = Radiobutton(searchFrame, text = "D* Lite (replans edits)",
+                                  variable = self.searchType, value = "dstar")
+        corridorButton = Radiobutton(searchFrame, text = "A-Star, Corridors Compressed",
+                                     variable = self.searchType, value = "corridor")
+        altButton = Radiobutton(searchFrame, text = "A-Star, Landmarks (ALT)",
+                                variable = self.searchType, value = "alt")
         ucButton.grid(row = 1, column = 1, sticky=W)
         greedyButton.grid(row = 2, column = 1, sticky=W)
         dfsButton.grid(row = 3, column = 1, sticky=W)
         aStarButton.grid(row = 4, column = 1, sticky=W)
+        bidirButton.grid(row = 5, column = 1, sticky=W)
+        idaStarButton.grid(row = 6, column = 1, sticky=W)
+        dStarButton.grid(row = 7, column = 1, sticky=W)
+        corridorButton.grid(row = 8, column = 1, sticky=W)
+        altButton.grid(row = 9, column = 1, sticky=W)
 
         resetSearch = Button(searchFrame, text = "Set Up Search", command = self.resetSearch)
 
@@ -222,18 +278,52 @@ class MazeGUI:
 
         self.stepSearch = Button(searchFrame, text = "Step Search", command = self.stepSearch, state = DISABLED)
         self.runSearch = Button(searchFrame, text = "Run Search", command = self.runSearch, state = DISABLED)
+        self.stopSearch = Button(searchFrame, text = "Stop Search", command = self.stopSearch, state = DISABLED)
         self.quitSearch = Button(searchFrame, text = "Quit Search", command = self.quitSearch, state = DISABLED)
         resetSearch.grid(row = 13, column = 1, pady = 5)
         stepSizeEntry.grid(row = 14, column = 1, pady = 5)
         self.stepSearch.grid(row = 15, column = 1)
         self.runSearch.grid(row = 16, column = 1)
-        self.quitSearch.grid(row = 17, column = 1)
+        self.stopSearch.grid(row = 17, column = 1)
+        self.quitSearch.grid(row = 18, column = 1)
         self.currentSearch = None
         self.currentSearcher = None
         self.currentNode = None
+        self.dStarSearcher = None
+        self.landmarks = None
+        self.recordTrace = IntVar()
+        recordButton = Checkbutton(searchFrame, text = "Record Trace", variable = self.recordTrace)
+        recordButton.grid(row = 19, column = 1, pady = 5)
     # end _initSearchTools
 
 
+    def _initTraceTools(self):
+        """Sets up the trace frame, with buttons to load, save, and replay a trace of a search, to export its
+        heatmap, a field for the replay speed in steps per second, and a slider to jump to any step"""
+        traceFrame = Frame(self.root, bd = 5, padx = 10, pady = 10, relief = "groove")
+        traceFrame.grid(row = 5, column = 2, padx = 5, pady = 5)
+        loadTrace = Button(traceFrame, text = "Load Trace", command = self.loadTrace)
+        saveTrace = Button(traceFrame, text = "Save Trace", command = self.saveTrace)
+        playTrace = Button(traceFrame, text = "Play", command = self.playTrace)
+        pauseTrace = Button(traceFrame, text = "Pause", command = self.pauseTrace)
+        heatmapButton = Button(traceFrame, text = "Heatmap", command = self.saveHeatmap)
+        self.replaySpeed = StringVar()
+        self.replaySpeed.set("200")
+        speedEntry = Entry(traceFrame, textvariable = self.replaySpeed, width = 6)
+        speedLabel = Label(traceFrame, text = "steps/sec")
+        self.traceSlider = Scale(traceFrame, from_ = 0, to = 0, orient = HORIZONTAL, length = 450,
+                                 showvalue = 1, command = self._seekTrace)
+        loadTrace.grid(row = 1, column = 1, padx = 5)
+        saveTrace.grid(row = 1, column = 2, padx = 5)
+        playTrace.grid(row = 1, column = 3, padx = 5)
+        pauseTrace.grid(row = 1, column = 4, padx = 5)
+        speedEntry.grid(row = 1, column = 5)
+        speedLabel.grid(row = 1, column = 6)
+        heatmapButton.grid(row = 1, column = 7, padx = 5)
+        self.traceSlider.grid(row = 2, column = 1, columnspan = 7)
+    # end _initTraceTools
+
+
     def _initLegend(self):
         """Sets up the legend that describes what each color means in the maze grid"""
         legendFrame = Frame(self.root, bd = 5, padx = 10, pady = 10, relief = "groove")
@@ -301,6 +391,7 @@ class MazeGUI:
         """Turn off the search operations, by setting each GUI element to DISABLED."""
         self.stepSearch.config(state=DISABLED)
         self.runSearch.config(state=DISABLED)
+        self.stopSearch.config(state=DISABLED)
         self.quitSearch.config(state=DISABLED)
 
 
@@ -314,14 +405,18 @@ class MazeGUI:
 
     def _createMazeGrid(self):
         """This sets up the display of the maze, given the MazeInfo object.
-        Re-called when dimensions changed."""
+        Re-called when dimensions changed. Large mazes are drawn as an image instead of rectangles."""
         self.idToPos = {}
         self.posToId = {}
-        startPos = self.maze.getStartPos()
-        goalPos = self.maze.getGoalPos()
+        self.pendingColors = {}
 
         numRows = self.maze.getNumRows()
         numCols = self.maze.getNumCols()
+        self.imageMode = numRows * numCols > self.IMAGE_MODE_CELLS
+        if self.imageMode:
+            self._createMazeImage(numRows, numCols)
+            self._displayMazeGrid()
+            return
         bigDim = max(numRows, numCols)
         if bigDim * 50 < self.canvasSize:
             self.cellSize = 50
@@ -337,9 +432,49 @@ class MazeGUI:
         self._displayMazeGrid()
 
 
+    def _createMazeImage(self, numRows, numCols):
+        """Sets up the image that shows a large maze: one pixel per cell, zoomed or subsampled by a whole
+        number to fit the canvas. The cellSize is the size of a cell on the canvas, which may be under a pixel."""
+        bigDim = max(numRows, numCols)
+        self.gridImage = PhotoImage(width = numCols, height = numRows)
+        if bigDim <= self.canvasSize:
+            self.imageScale = self.canvasSize // bigDim
+            self.cellSize = self.imageScale
+        else:
+            self.imageScale = -(-bigDim // self.canvasSize)
+            self.cellSize = 1 / self.imageScale
+        self.shownImage = None
+        self.imageId = self.canvas.create_image(5, 5, anchor = NW)
+
+
+    def _refreshImage(self):
+        """In image mode, rescales the maze image onto the canvas, after cells in it have been painted"""
+        if self.imageMode:
+            if self.cellSize >= 1:
+                self.shownImage = self.gridImage.zoom(self.imageScale)
+            else:
+                self.shownImage = self.gridImage.subsample(self.imageScale)
+            self.canvas.itemconfig(self.imageId, image = self.shownImage)
+
+
     def _displayMazeGrid(self):
         numRows = self.maze.getNumRows()
         numCols = self.maze.getNumCols()
+        self.pendingColors = {}
+        if self.imageMode:
+            # one put of the whole image; start and goal are painted in their outline colors
+            rows = []
+            for row in range(numRows):
+                rowColors = []
+                for col in range(numCols):
+                    (outlineColor, cellColor) = self._determineColor((row, col))
+                    if outlineColor in {'green', 'red'}:
+                        cellColor = outlineColor
+                    rowColors.append(self._imageColor(cellColor))
+                rows.append("{" + " ".join(rowColors) + "}")
+            self.gridImage.put(" ".join(rows), to = (0, 0))
+            self._refreshImage()
+            return
         for row in range(numRows):
             for col in range(numCols):
                 currId = self._posToId(row, col)
@@ -385,6 +520,10 @@ class MazeGUI:
         square that was clicked on, and changes its color.  Exactly how the color changes depends
         on a helper, and what color the grid square already was."""
         if self.editEnabled:
+            if self.imageMode:
+                (row, col) = self._coordToPos(event.x, event.y)
+                self._changeSquare(row, col, self._posToId(row, col))
+                return
             items = self.canvas.find_withtag("current")
             if items == ():
                 return
@@ -435,6 +574,7 @@ class MazeGUI:
         (outCol, cellCol) = self._determineColor((row, col))
         self._setCellColor(item, cellCol)
         self._setOutlineColor(item, outCol)
+        self._refreshImage()
                 
         
 
@@ -464,7 +604,8 @@ class MazeGUI:
         -- Select one of the implemented search algorithms with the radio buttons
         -- Set Up Search activates the search frame, and initializes the selected search
         -- Step Search will perform N steps of the search, where N appears in the text box above it
-        -- Run Search will perform the whole search process
+        -- Run Search will perform the whole search process, showing its progress as it goes
+        -- Stop Search stops a running search; Step Search or Run Search carry on from there
         -- Quit Search disables the search frame, and enables the edit frame
 
         Messages appear in the box above the maze grid.
@@ -518,7 +659,7 @@ class MazeGUI:
             return
         if self.blockPerc > 1.0:
             self.blockPerc = self.blockPerc / 100.0
-        self.maze = MazeInfo(mode, self.numRows, self.numCols,
+        self.maze = ArrayMazeInfo(mode, self.numRows, self.numCols,
                              (0, 0), (self.numRows - 1, self.numCols - 1),
                              self.blockPerc)
         self._createMazeGrid()
@@ -528,6 +669,12 @@ class MazeGUI:
     def _removeMazeCells(self):
         """A helper that removes all the grid cell objects from the maze, prior to creating new
         ones when the "Change Dimension" button is clicked"""
+        if self.imageMode:
+            self.canvas.delete(self.imageId)
+            self.imageMode = False
+            self.posToId = {}
+            self.idToPos = {}
+            return
         for row in range(self.numRows):
             for col in range(self.numCols):
                 currId = self.posToId[row, col]
@@ -540,14 +687,14 @@ class MazeGUI:
     def loadMaze(self):
         """Callback for loading a maze. It uses a utility to ask the user to
         load a file. Then it clears the maze and resets it using the
-        information from the file. The file contains text, first the
+        information from the file. A binary maze file is memory-mapped; otherwise the file contains text, first the
         numRows of the maze, and then that many lines. Each line contains
         words separated by spaces that describe the color for the
         corresponding cell. Thus there are numRows number of words per
         line."""
         fileName = tkFileDialog.askopenfilename(title = "Select the file to load")
         if fileName != None:
-            self.maze = MazeInfo('file', fileName)
+            self.maze = ArrayMazeInfo('file', fileName)
             self._removeMazeCells()
             self.numRows = self.maze.getNumRows()
             self.numCols = self.maze.getNumCols()
@@ -560,10 +707,14 @@ class MazeGUI:
  
     def saveMaze(self):
         """This pops up a dialog box to save a maze to a file.  Note it won't save a maze with no
-        start or goal.  It asks the MazeInfo object to write itself to this file."""
+        start or goal.  It asks the MazeInfo object to write itself to this file, in the binary format if
+        the file name ends in .bmaze, and in the text format otherwise."""
         fileName = tkFileDialog.asksaveasfilename(title = "Select the file to which to save the current maze",
                                                   initialfile = "maze.txt")
-        self.maze.writeGridToFile(fileName)
+        if fileName.endswith(BINARY_EXTENSION):
+            self.maze.writeGridToBinaryFile(fileName)
+        else:
+            self.maze.writeGridToFile(fileName)
 
 
     # ----------------------------------------------------------------
@@ -576,6 +727,10 @@ class MazeGUI:
         the mazes are otherwise edit-able, until we are searching there is not point in having
         and updating a MazeInfo object). It then creates the right kind of MazeSolver object, and
         initializes the search.  It turns off the edit mode, and turns on the search mode"""
+        if self.searchRunning:
+            self._endRun()
+        self._endTrace()
+        self.pauseTrace()
         self._clearMessage()
 
         self._displayMazeGrid()
@@ -595,20 +750,110 @@ class MazeGUI:
         elif self.currentSearch == 'astar':
             taskAdvisor = AStarMazeAdvisor(self.maze, sRow, sCol, gRow, gCol)
             self.currentSearcher = BestFirstSearchSolver(taskAdvisor)
+        elif self.currentSearch == 'bidir':
+            taskAdvisor = UCSMazeAdvisor(self.maze, sRow, sCol, gRow, gCol)
+            self.currentSearcher = BidirectionalSearchSolver(taskAdvisor)
+        elif self.currentSearch == 'idastar':
+            taskAdvisor = AStarMazeAdvisor(self.maze, sRow, sCol, gRow, gCol)
+            self.currentSearcher = IDAStarSearchSolver(taskAdvisor)
+        elif self.currentSearch == 'dstar':
+            self.currentSearcher = self._getDStarSearcher(sRow, sCol, gRow, gCol)
+        elif self.currentSearch == 'corridor':
+            # only the junctions are searched; the cells of each corridor are colored with the path
+            taskAdvisor = CorridorAStarAdvisor(self.maze, sRow, sCol, gRow, gCol)
+            self.currentSearcher = BestFirstSearchSolver(taskAdvisor)
+        elif self.currentSearch == 'alt':
+            taskAdvisor = ALTMazeAdvisor(self.maze, sRow, sCol, gRow, gCol, self._getLandmarks())
+            self.currentSearcher = BestFirstSearchSolver(taskAdvisor)
+        self._startTrace()
         self.currentSearcher.initSearch()
         self.disableEdit()
         self.enableSearch()
 
         
         
+    def _getDStarSearcher(self, sRow, sCol, gRow, gCol):
+        """Returns the D* Lite solver for the current maze. It is kept from one search to the next, so after
+        edits, or after the start is moved, it repairs its last solution rather than searching again. A new
+        one is made for a new maze or goal."""
+        searcher = self.dStarSearcher
+        if searcher is not None:
+            advisor = searcher.taskAdvisor
+            if searcher.maze is self.maze and (advisor.goalRow, advisor.goalCol) == (gRow, gCol):
+                searcher.moveStart(sRow, sCol)
+                return searcher
+            searcher.detach()
+        self.dStarSearcher = DStarLiteSolver(MazeTaskAdvisor(self.maze, sRow, sCol, gRow, gCol))
+        return self.dStarSearcher
+
+
+    def _getLandmarks(self):
+        """Returns the landmark table for the current maze, kept from one search to the next and only built
+        again when the maze has been edited or replaced"""
+        if self.landmarks is None or not self.landmarks.matches(self.maze):
+            self.landmarks = buildLandmarks(self.maze)
+        return self.landmarks
+
+
     def runSearch(self):
-        """This callback for the Run Search button keeps running steps of the search until the search is done
-        or a problem crops up.  """
-        keepLooping = True
-        while keepLooping:
-            keepLooping = self._handleOneStep()
-        # end while
+        """This callback for the Run Search button starts running steps of the search until the search is done,
+        a problem crops up, or the user clicks Stop Search. The steps run in slices scheduled on the Tk main
+        loop, so this returns right away."""
+        if self.searchRunning or self._problemWithSearch():
+            return
+        self.searchRunning = True
+        self.runStartTime = time.perf_counter()
+        self.runStartVisited = self.currentSearcher.getNodesVisited()
+        self.stepSearch.config(state=DISABLED)
+        self.runSearch.config(state=DISABLED)
+        self.stopSearch.config(state=NORMAL)
+        self.sliceJob = self.root.after_idle(self._runSlice)
     # end runSearch
+
+
+    def _runSlice(self):
+        """Runs search steps for up to SLICE_SECONDS, then shows the progress and schedules the next slice,
+        unless the search has ended or been stopped."""
+        self.sliceJob = None
+        if not self.searchRunning:
+            return
+        sliceEnd = time.perf_counter() + self.SLICE_SECONDS
+        while time.perf_counter() < sliceEnd:
+            if not self._handleOneStep():
+                self._endRun()
+                return
+        self._postMessage(self._progressText("Searching"))
+        self.sliceJob = self.root.after(1, self._runSlice)
+
+
+    def stopSearch(self):
+        """This callback for the Stop Search button stops a running search after the current slice. The
+        search is kept, so Step Search or Run Search carry on from where it stopped."""
+        if not self.searchRunning:
+            return
+        self._endRun()
+        self._redrawCells()
+        self._postMessage(self._progressText("Stopped"))
+        self.stepSearch.config(state=NORMAL)
+        self.runSearch.config(state=NORMAL)
+
+
+    def _endRun(self):
+        """Marks the running search as no longer running, and cancels its next slice"""
+        self.searchRunning = False
+        if self.sliceJob is not None:
+            self.root.after_cancel(self.sliceJob)
+            self.sliceJob = None
+        self.stopSearch.config(state=DISABLED)
+
+
+    def _progressText(self, label):
+        """Makes a message about the running search: nodes visited so far, and nodes visited per second
+        since Run Search was clicked"""
+        visited = self.currentSearcher.getNodesVisited()
+        seconds = max(time.perf_counter() - self.runStartTime, 1e-9)
+        rate = (visited - self.runStartVisited) / seconds
+        return "%s...  Nodes visited = %d      Nodes/sec = %d" % (label, visited, rate)
     
 
     def stepSearch(self):
@@ -619,6 +864,7 @@ class MazeGUI:
         while keepLooping and stepCount > 0:
             keepLooping = self._handleOneStep()
             stepCount -= 1
+        self._redrawCells()
  
 
     def _handleOneStep(self):
@@ -634,8 +880,11 @@ class MazeGUI:
 
         if status == "Fail":
             self._postMessage("No path possible")
+            self._redrawCells()
+            self._endTrace()
             return False
         elif status == "Done":
+            self._endTrace()
             self._postMessage("All done")
             self.markCells(nextState, newFringe)
             self.wrapUpSearch(nextState, newFringe)
@@ -655,7 +904,7 @@ class MazeGUI:
             totalCost += self.maze.getWeight(currRow, currCol)
             (nextRow, nextCol) = self._makeMove(currRow, currCol, move)
             nextId = self._posToId(nextRow, nextCol)
-            self._setCellColor(nextId, "yellow")
+            self._queueCellColor(nextId, "yellow")
             currRow = nextRow
             currCol = nextCol
 
@@ -664,6 +913,7 @@ class MazeGUI:
         printStr += "Nodes created = %d      " % self.currentSearcher.getNodesCreated()
         printStr += "Nodes visited = %d" % self.currentSearcher.getNodesVisited()
         self._postMessage(printStr)
+        self._redrawCells()
         self.currentSearch = None
         self.currentNode = None        
  
@@ -671,6 +921,9 @@ class MazeGUI:
 
     def quitSearch(self):
         """A callback for clearing away the search and returning to edit mode"""
+        if self.searchRunning:
+            self._endRun()
+        self._endTrace()
         self._displayMazeGrid()
         self.disableSearch()
         self.enableEdit()
@@ -680,24 +933,212 @@ class MazeGUI:
 
         
 
+    # ----------------------------------------------------------------
+    # Recording and replaying traces
+
+    def _startTrace(self):
+        """If Record Trace is checked, gives the new searcher a recorder writing to a temporary file"""
+        if self.recordTrace.get():
+            self.traceFile = tempfile.TemporaryFile()
+            numCells = self.maze.getNumRows() * self.maze.getNumCols()
+            self.currentSearcher.setTraceRecorder(SearchTrace.TraceRecorder(self.traceFile, numCells))
+        else:
+            self.currentSearcher.setTraceRecorder(None)
+
+
+    def _endTrace(self):
+        """If the current search is being recorded, finishes the trace (the searcher has already finished it if
+        the search ended) and makes it the trace to replay"""
+        if self.currentSearcher is None or self.currentSearcher.traceRecorder is None:
+            return
+        recorder = self.currentSearcher.traceRecorder
+        if not recorder.isFinished():
+            recorder.finish()
+        self.currentSearcher.setTraceRecorder(None)
+        self.traceFile.seek(0)
+        self._setTrace(SearchTrace.SearchTrace(self.traceFile))
+
+
+    def _setTrace(self, trace):
+        """Makes a trace the one to replay, if it was recorded on a maze the size of the current one"""
+        numCells = self.maze.getNumRows() * self.maze.getNumCols()
+        if trace.getNumIds() != numCells:
+            self._postMessage("The trace is for a maze with %d cells, not %d" % (trace.getNumIds(), numCells))
+            return
+        self.pauseTrace()
+        self.trace = trace
+        self.traceShownStep = None
+        self.traceSlider.config(to = trace.getNumSteps())
+        self.traceSlider.set(trace.getNumSteps())
+        self._seekTrace(trace.getNumSteps())
+
+
+    def loadTrace(self):
+        """Callback for the Load Trace button: reads a trace file to replay on the current maze"""
+        fileName = tkFileDialog.askopenfilename(title = "Select the trace to load")
+        if fileName:
+            try:
+                self._setTrace(SearchTrace.SearchTrace(fileName))
+            except ValueError as error:
+                self._postMessage(str(error))
+
+
+    def saveTrace(self):
+        """Callback for the Save Trace button: copies the last recorded trace to a file"""
+        if self.traceFile is None or self.trace is None:
+            self._postMessage("No recorded trace, check Record Trace and run a search")
+            return
+        fileName = tkFileDialog.asksaveasfilename(title = "Select the file to which to save the trace",
+                                                  initialfile = "search" + SearchTrace.TRACE_EXTENSION)
+        if fileName:
+            self.traceFile.seek(0)
+            with open(fileName, 'wb') as filObj:
+                shutil.copyfileobj(self.traceFile, filObj)
+
+
+    def saveHeatmap(self):
+        """Callback for the Heatmap button: writes the expansion counts of the trace as a PGM image"""
+        if self.trace is None:
+            self._postMessage("No trace to make a heatmap from")
+            return
+        fileName = tkFileDialog.asksaveasfilename(title = "Select the file to which to save the heatmap",
+                                                  initialfile = "heatmap.pgm")
+        if fileName:
+            self.trace.writeHeatmap(fileName, self.maze.getNumRows(), self.maze.getNumCols())
+
+
+    def _seekTrace(self, value):
+        """Callback for the slider: shows the search as it was after the chosen step, drawn from the
+        keyframe before that step rather than by replaying from the start"""
+        if not self._canReplay():
+            return
+        step = int(value)
+        if step == self.traceShownStep:
+            return
+        self.pauseTrace()
+        self.traceStep = step
+        self.traceShownStep = step
+        self._displayMazeGrid()
+        status = self.trace.statusAt(step)
+        numCols = self.maze.getNumCols()
+        colors = self.TRACE_COLORS
+        for cell in range(len(status)):
+            if status[cell]:
+                self._queueCellColor(self._posToId(cell // numCols, cell % numCols), colors[status[cell]])
+        self.traceCurrent = status.find(SearchTrace.CURRENT)
+        if step == self.trace.getNumSteps() and self.trace.getResult() == "Done":
+            self._showTracePath()
+        self._redrawCells()
+
+
+    def _canReplay(self):
+        """Returns True if there is a trace that fits the current maze, and no search is running"""
+        numCells = self.maze.getNumRows() * self.maze.getNumCols()
+        return self.trace is not None and self.trace.getNumIds() == numCells and not self.searchRunning
+
+
+    def _showTracePath(self):
+        """Colors the path the traced search found"""
+        (row, col) = self.maze.getStartPos()
+        for move in self.trace.getPath():
+            (row, col) = self._makeMove(row, col, move)
+            self._queueCellColor(self._posToId(row, col), "yellow")
+
+
+    def playTrace(self):
+        """Callback for the Play button: replays the trace from the slider's step at the chosen speed"""
+        if not self._canReplay() or self.replayJob is not None:
+            return
+        if self.traceStep >= self.trace.getNumSteps():
+            self.traceSlider.set(0)
+            self._seekTrace(0)
+        self.traceSteps = self.trace.steps(self.traceStep)
+        self.replayTime = time.perf_counter()
+        self.replayJob = self.root.after(1, self._replaySlice)
+
+
+    def pauseTrace(self):
+        """Callback for the Pause button: stops the replay at the current step"""
+        if self.replayJob is not None:
+            self.root.after_cancel(self.replayJob)
+            self.replayJob = None
+
+
+    def _replaySlice(self):
+        """Draws as many steps of the trace as the replay speed allows for the time since the last slice"""
+        self.replayJob = None
+        try:
+            speed = max(float(self.replaySpeed.get()), 1.0)
+        except ValueError:
+            speed = 200.0
+        now = time.perf_counter()
+        count = max(int((now - self.replayTime) * speed), 1)
+        self.replayTime = now
+        numCols = self.maze.getNumCols()
+        numSteps = self.trace.getNumSteps()
+        for (expandedId, fringeIds) in self.traceSteps:
+            if self.traceCurrent >= 0:
+                self._queueCellColor(self._posToId(self.traceCurrent // numCols, self.traceCurrent % numCols),
+                                     "light pink")
+            if expandedId >= 0:
+                self._queueCellColor(self._posToId(expandedId // numCols, expandedId % numCols), "magenta")
+            self.traceCurrent = expandedId
+            for fringeId in fringeIds:
+                if fringeId >= 0:
+                    self._queueCellColor(self._posToId(fringeId // numCols, fringeId % numCols), "light blue")
+            self.traceStep += 1
+            count -= 1
+            if count == 0:
+                break
+        if self.traceStep >= numSteps and self.trace.getResult() == "Done":
+            self._showTracePath()
+        self._redrawCells()
+        self.traceShownStep = self.traceStep
+        self.traceSlider.set(self.traceStep)
+        if self.traceStep < numSteps:
+            self.replayJob = self.root.after(int(1000 * self.SLICE_SECONDS), self._replaySlice)
+
+
     def markCells(self, nextState, newFringe):
         """This function changes the color of grid cells being searched to reflect the search. It
         keeps track of the old node, and changes its color, and changes all fringe nodes to light
-        blue.  Visited nodes become light pink."""
+        blue.  Visited nodes become light pink. The changes are queued, and drawn when a redraw is due."""
         if self.currentNode != None:
             (oldR, oldC) = self.currentNode.getLocation()
             oldId = self._posToId(oldR, oldC)
-            self._setCellColor(oldId, "light pink")
+            self._queueCellColor(oldId, "light pink")
         self.currentNode = nextState
         (r, c) = nextState.getLocation()
         nextId = self._posToId(r,c)
-        self._setCellColor(nextId, "magenta")
+        self._queueCellColor(nextId, "magenta")
             
         for f in newFringe:
             (fr, fc) = f.getLocation()
             fId = self._posToId(fr, fc)
-            self._setCellColor(fId, "light blue")
-        self.canvas.update()
+            self._queueCellColor(fId, "light blue")
+        self.stepsSinceRedraw += 1
+        if self.redrawSteps is not None:
+            if self.stepsSinceRedraw >= self.redrawSteps:
+                self._redrawCells()
+        elif time.perf_counter() - self.lastRedraw >= 1.0 / self.redrawRate:
+            self._redrawCells()
+
+
+    def _queueCellColor(self, cellId, color):
+        """Records a new fill color for a cell, to be drawn at the next redraw. Only the last color
+        queued for a cell is drawn."""
+        self.pendingColors[cellId] = color
+
+
+    def _redrawCells(self):
+        """Draws all the queued cell colors and updates the canvas"""
+        for (cellId, color) in self.pendingColors.items():
+            self._setCellColor(cellId, color)
+        self.pendingColors = {}
+        self._refreshImage()
+        self.canvas.update_idletasks()
+        self.stepsSinceRedraw = 0
+        self.lastRedraw = time.perf_counter()
 
         
 
@@ -732,14 +1173,38 @@ class MazeGUI:
     def _setCellColor(self, cellId, color):
         """Sets the grid cell with cellId, and at row and column position, to have the
         right color.  Note that in addition to the visible color, there is also a colors 
-        matrix that mirrors the displayed colors"""
-        self.canvas.itemconfig(cellId, fill = color)
+        matrix that mirrors the displayed colors. In image mode the cell's pixel is painted, except for
+        the start and goal cells, which keep their own colors."""
+        if self.imageMode:
+            (row, col) = self._idToPos(cellId)
+            if (row, col) != tuple(self.maze.getStartPos()) and (row, col) != tuple(self.maze.getGoalPos()):
+                self.gridImage.put(self._imageColor(color), to = (col, row))
+        else:
+            self.canvas.itemconfig(cellId, fill = color)
 
 
     def _setOutlineColor(self, cellId, color):
         """Sets the outline of the grid cell with cellID, and at row and column position, to
-        have the right color."""
-        self.canvas.itemconfig(cellId, outline=color)
+        have the right color. Image mode has no outlines, so the start and goal cells are painted in
+        their outline colors, and any other cell in its fill color."""
+        if self.imageMode:
+            (row, col) = self._idToPos(cellId)
+            if color not in {'green', 'red'}:
+                color = self._determineColor((row, col))[1]
+            self.gridImage.put(self._imageColor(color), to = (col, row))
+        else:
+            self.canvas.itemconfig(cellId, outline=color)
+
+
+    def _imageColor(self, color):
+        """Converts a Tk color name, like "light pink", to the #rrggbb form that PhotoImage.put needs
+        (a name with a space in it would be read as two pixels)"""
+        if color[0] == '#':
+            return color
+        if color not in self.imageColors:
+            (red, green, blue) = self.root.winfo_rgb(color)
+            self.imageColors[color] = "#%02x%02x%02x" % (red // 256, green // 256, blue // 256)
+        return self.imageColors[color]
 
 
     def _makeMove(self, row, col, move):
@@ -758,11 +1223,16 @@ class MazeGUI:
 
 
     def _posToId(self, row, col):
-        """Given row and column indices, it looks up and returns the GUI id of the cell at that location"""
+        """Given row and column indices, it looks up and returns the GUI id of the cell at that location.
+        In image mode, the id is the cell's index, row * numCols + col."""
+        if self.imageMode:
+            return row * self.numCols + col
         return self.posToId[row, col]
 
     def _idToPos(self, currId):
         """Given the id of a cell, it looks up and returns the row and column position of that cell"""
+        if self.imageMode:
+            return divmod(currId, self.numCols)
         return self.idToPos[currId]
 
     
@@ -785,8 +1255,8 @@ class MazeGUI:
 
         if col < 0:
             col = 0
-        elif col >= self.numRows:
-            col = self.numRows - 1
+        elif col >= self.numCols:
+            col = self.numCols - 1
             
         return (int(row), int(col))
 # End of MazeGUI class
@@ -0,0 +1,236 @@
+"""  =================================================================
+File: MazeService.py
+
+This file contains a long-running local service that answers path queries for
+other tools, so they need not each load maze files and build advisors. It listens
+on a Unix socket (or a localhost TCP port) with asyncio, and the solves run on a
+pool of worker processes. Each worker keeps the mazes it has loaded, and their
+landmark tables, in memory, and loads a file again only when it changes on disk.
+When a query arrives that is the same as one still being solved, it waits for that
+solve instead of starting another.
+
+The protocol is one JSON object per line each way. A query looks like
+    {"id": 1, "maze": "mazes/bigmaze1.txt", "algorithm": "astar", "start": [0, 0], "goal": [9, 9]}
+where start and goal default to those in the maze file, the algorithm to "astar" (any name from
+MazeBatch.ALGORITHMS), and "stats": true adds the SearchStats measurements. The answer has the same id, the
+path as a string of N, E, S, W moves, its cost and length, the node counts and solve time, or an "error".
+{"op": "status"} returns the service's counters. Answers come back as their solves finish, so one connection
+may have many queries in flight.
+
+From the command line:
+    python MazeService.py --socket /tmp/maze.sock -w 4
+runs the service, and queryService is a small blocking client for it.
+ ==================================================================="""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from MazeInfo import ArrayMazeInfo
+from MazeBatch import ALGORITHMS, solveMaze
+from MazeLandmarks import landmarksForMazeFile
+
+DEFAULT_ALGORITHM = 'astar'
+MAX_CACHED_MAZES = 16
+
+# The mazes loaded by a worker process: file name -> (file stamp, maze, landmark table or None), oldest first
+_mazeCache = OrderedDict()
+
+
+def fileStamp(fileName):
+    """Returns the (modification time, size) of a file, which changes when the file is rewritten"""
+    info = os.stat(fileName)
+    return (info.st_mtime_ns, info.st_size)
+
+
+def solveQuery(fileName, stamp, algorithm, startPos, goalPos, measureStats):
+    """The job each worker runs: solves one query with MazeBatch.solveMaze on the cached maze, and returns
+    the result dictionary, with the path as a string of moves"""
+    (maze, landmarks) = _getMaze(fileName, stamp, algorithm == 'alt')
+    if startPos is None:
+        startPos = tuple(maze.getStartPos())
+    if goalPos is None:
+        goalPos = tuple(maze.getGoalPos())
+    for (row, col) in (startPos, goalPos):
+        if maze.isOutOfBounds(row, col) or maze.isBlocked(row, col):
+            raise ValueError("(%d, %d) is not an open cell of %s" % (row, col, fileName))
+    result = solveMaze(maze, algorithm, startPos, goalPos, measureMemory=False, measureStats=measureStats,
+                       landmarks=landmarks, withPath=True)
+    result['path'] = None if result['path'] is None else ''.join(result['path'])
+    del result['peakBytes']
+    result['start'] = list(startPos)
+    result['goal'] = list(goalPos)
+    return result
+
+
+def _getMaze(fileName, stamp, withLandmarks):
+    """Returns the worker's (maze, landmarks) for a file, loading it if it is not cached or its stamp has
+    changed, and building or loading its landmark table the first time it is wanted. The least recently
+    used maze is dropped when more than MAX_CACHED_MAZES are cached."""
+    entry = _mazeCache.get(fileName)
+    if entry is None or entry[0] != stamp:
+        entry = (stamp, ArrayMazeInfo('file', fileName), None)
+    if withLandmarks and entry[2] is None:
+        entry = (stamp, entry[1], landmarksForMazeFile(fileName, entry[1]))
+    _mazeCache[fileName] = entry
+    _mazeCache.move_to_end(fileName)
+    while len(_mazeCache) > MAX_CACHED_MAZES:
+        _mazeCache.popitem(last=False)
+    return (entry[1], entry[2])
+
+
+
+class MazeService:
+    """The asyncio front end. It reads queries from each connection, checks them, and hands them to the
+    process pool; identical queries in flight at the same time (same maze file and version, algorithm, start,
+    goal and stats flag) share one solve."""
+
+    def __init__(self, workers = None):
+        """Takes the number of worker processes (None for one per CPU). The workers are spawned rather than
+        forked, since the service has threads running by the time the pool starts them."""
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.inFlight = {}
+        self.counts = {'queries': 0, 'solves': 0, 'coalesced': 0, 'errors': 0}
+        self.server = None
+
+
+    async def start(self, socketPath = None, host = '127.0.0.1', port = 0):
+        """Starts listening on the Unix socket path if one is given, and otherwise on the TCP host and port
+        (port 0 picks a free one). Returns the asyncio server."""
+        if socketPath is not None:
+            if os.path.exists(socketPath):
+                os.unlink(socketPath)
+            self.server = await asyncio.start_unix_server(self._handleConnection, path=socketPath)
+        else:
+            self.server = await asyncio.start_server(self._handleConnection, host=host, port=port)
+        return self.server
+
+
+    async def close(self):
+        """Stops listening and shuts the process pool down"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.pool.shutdown()
+
+
+    async def _handleConnection(self, reader, writer):
+        """Answers each line read from a connection in its own task, so that a slow query does not hold up
+        the ones after it, and waits for them all before closing"""
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(self._answer(line, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+
+    async def _answer(self, line, writer):
+        """Answers one query line, and writes the answer line"""
+        queryId = None
+        try:
+            query = json.loads(line)
+            queryId = query.get('id')
+            if query.get('op', 'solve') == 'status':
+                answer = dict(self.counts, inFlight=len(self.inFlight))
+            else:
+                answer = dict(await self.solve(query))
+        except Exception as error:
+            self.counts['errors'] += 1
+            answer = {'error': str(error)}
+        answer['id'] = queryId
+        writer.write((json.dumps(answer) + '\n').encode())
+        await writer.drain()
+
+
+    async def solve(self, query):
+        """Checks a query and returns its result dictionary, from a new solve in the pool or from the solve
+        of an identical query already in flight"""
+        self.counts['queries'] += 1
+        if 'maze' not in query:
+            raise ValueError("A query needs the maze file name")
+        fileName = os.path.abspath(query['maze'])
+        algorithm = query.get('algorithm', DEFAULT_ALGORITHM)
+        if algorithm not in ALGORITHMS:
+            raise ValueError("Unknown algorithm: " + str(algorithm) + ", expected one of " + ", ".join(ALGORITHMS))
+        startPos = None if query.get('start') is None else tuple(query['start'])
+        goalPos = None if query.get('goal') is None else tuple(query['goal'])
+        measureStats = bool(query.get('stats', False))
+        stamp = fileStamp(fileName)
+        key = (fileName, stamp, algorithm, startPos, goalPos, measureStats)
+        future = self.inFlight.get(key)
+        if future is not None:
+            self.counts['coalesced'] += 1
+            return await asyncio.shield(future)
+        self.counts['solves'] += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, solveQuery, fileName, stamp, algorithm, startPos, goalPos,
+                                      measureStats)
+        self.inFlight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self.inFlight.get(key) is future:
+                del self.inFlight[key]
+
+
+
+def queryService(queries, socketPath = None, host = '127.0.0.1', port = None):
+    """A blocking client: sends a list of query dictionaries over one connection, to the Unix socket path or
+    else the TCP host and port, and returns the answers in the order of the queries (which are numbered
+    with their position, replacing any id they had)"""
+    if socketPath is not None:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(socketPath)
+    else:
+        connection = socket.create_connection((host, port))
+    with connection:
+        lines = [json.dumps(dict(query, id=index)) + '\n' for (index, query) in enumerate(queries)]
+        connection.sendall(''.join(lines).encode())
+        connection.shutdown(socket.SHUT_WR)
+        answers = [None] * len(queries)
+        with connection.makefile('r') as replies:
+            for line in replies:
+                answer = json.loads(line)
+                answers[answer['id']] = answer
+    return answers
+
+
+def main(argv=None):
+    """Reads the command line and runs the service until it is interrupted"""
+    parser = argparse.ArgumentParser(description="Serve maze path queries over a local socket")
+    parser.add_argument('-s', '--socket', help="Unix socket path to listen on")
+    parser.add_argument('-p', '--port', type=int, default=8765, help="localhost TCP port, if there is no --socket")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        service = MazeService(args.workers)
+        server = await service.start(args.socket, port=args.port)
+        print("Serving maze queries on", args.socket or server.sockets[0].getsockname())
+        try:
+            await server.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
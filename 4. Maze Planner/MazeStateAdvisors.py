@@ -10,19 +10,25 @@ Uniform-Cost Search, and a State and a Solver class for A-star search
 import math
 from SearchSolver import SearchState, AbstractTaskAdvisor
 
+# The move that undoes each move, used to turn the path of a backward search around
+OPPOSITE_MOVES = {'N': 'S', 'S': 'N', 'E': 'W', 'W': 'E'}
+
 # ==========================================================================================
 
 class MazeState(SearchState):
     """This represents the state of a search in a maze.  It does not
     represent the maze, just the current location in the maze, and the
     series of cells that have been traversed to get to this location.  That
-    is represented in the pathToMe instance variable inherited from the parent
-    class.  The cost is determined externally, """
+    is represented by the parent state and move inherited from the parent
+    class.  The cost is determined externally. The task advisors intern maze states
+    with stateId = row * numCols + col."""
+
+    __slots__ = ('row', 'col')
 
-    def __init__(self, row, col, path=None, cost=None):
+    def __init__(self, row, col, path=None, cost=None, parent=None, move=None, stateId=None):
         """Given the row and column location of the current state, and optional path
-        and cost, initializes the state for the search"""
-        SearchState.__init__(self, path, cost)
+        (or parent state and move), cost and interned id, initializes the state for the search"""
+        SearchState.__init__(self, path, cost, parent, move, stateId)
         self.row = row
         self.col = col
 
@@ -40,14 +46,17 @@ class MazeState(SearchState):
 
     def __hash__(self):
         """Makes the state hashable by hashing a tuple of its row and column, so that it can be stored in
-        a set or dictionary. Note that states that are == will produce the same hash value."""
+        a set or dictionary. Note that states that are == will produce the same hash value. An interned
+        state just uses its id, which is unique to its row and column."""
+        if self.stateId is not None:
+            return self.stateId
         return hash( (self.row, self.col) )
 
     def __str__(self):
         """To print this object, print the row and column in brackets, followed by the
-        path and cost"""
+        move that reached it and its cost"""
         strng = "[" + str(self.row) + ", " + str(self.col) + "]"
-        strng += "  " + str(self.pathToMe) + " " + str(self.myCost)
+        strng += "  " + str(self.move) + " " + str(self.myCost)
         return strng
 
 
@@ -65,15 +74,28 @@ class MazeTaskAdvisor(AbstractTaskAdvisor):
         that hold details of the problem"""
         AbstractTaskAdvisor.__init__(self)
         self.maze = mazeMap
+        self.numCols = mazeMap.getNumCols()
+        # Array-backed mazes (ArrayMazeInfo) let the advisor read cells directly, both are None otherwise
+        self.weights = mazeMap.getWeightArray()
+        self.neighborTable = mazeMap.getNeighborTable()
+        self.startRow = startRow
+        self.startCol = startCol
         self.goalRow = goalRow
         self.goalCol = goalCol
         self.startState = self._setupInitialState(startRow, startCol)
 
 
+    def setStart(self, startRow, startCol):
+        """Moves the start to a new location, as when an agent advances along its path"""
+        self.startRow = startRow
+        self.startCol = startCol
+        self.startState = self._setupInitialState(startRow, startCol)
+
+
     def _setupInitialState(self, startRow, startCol):
         """This creates and returns a proper start state for this particular
         class."""
-        return MazeState(startRow, startCol, [])
+        return MazeState(startRow, startCol, [], None, None, None, startRow * self.numCols + startCol)
 
     def isGoal(self, state):
         """Given a state, check if it is a goal state.  It must have the same row and column
@@ -88,31 +110,128 @@ class MazeTaskAdvisor(AbstractTaskAdvisor):
         """Given a state, determine all legal neighbor states.  This assumes that movements are
         restricted to north, south, east, and west.  It asks the maze map to determine which moves
         are legal for this given map, and it generates the resulting state for each legal move.
-        It returns a list of neighbors."""
+        It returns a list of neighbors. For array-backed mazes, the legal moves come straight from
+        the maze's neighbor table."""
+        return self._generateAdjacent(state, self._buildNeighbor)
+
+
+    def generatePredecessors(self, state):
+        """Given a state of a backward search (see getGoalState), determine the states it can be reached
+        from. Moves are reversible, so these are in the same cells as the neighbors, but they are built by
+        _buildPredecessor, which counts costs back toward the start. The move stored in each one is the
+        direction from the given state to it."""
+        return self._generateAdjacent(state, self._buildPredecessor)
+
+
+    def _generateAdjacent(self, state, buildState):
+        """Builds a state with buildState for each legal move from the given state, and returns the list"""
+        if self.neighborTable is not None:
+            return self._generateAdjacentFromTable(state, buildState)
         (row, col) = state.getLocation()
         neighs = []
         # Move north, if it can
         if self.maze.isAccessible(row - 1, col):
-            neighs.append(self._buildNeighbor(state, 'N', row - 1, col))
+            neighs.append(buildState(state, 'N', row - 1, col))
         # Move east, if it can
         if self.maze.isAccessible(row, col + 1):
-            neighs.append(self._buildNeighbor(state, 'E', row, col + 1))
+            neighs.append(buildState(state, 'E', row, col + 1))
         # Move south, if it can
         if self.maze.isAccessible(row + 1, col):
-            neighs.append(self._buildNeighbor(state, 'S', row + 1, col))
+            neighs.append(buildState(state, 'S', row + 1, col))
         # Move west, if it can
         if self.maze.isAccessible(row, col - 1):
-            neighs.append(self._buildNeighbor(state, 'W', row, col - 1))
+            neighs.append(buildState(state, 'W', row, col - 1))
         return neighs
 
 
+    def _generateAdjacentFromTable(self, state, buildState):
+        """The fast path of _generateAdjacent: the state id is the cell index, so its four table entries
+        give the neighbor cells (or -1) in N, E, S, W order."""
+        table = self.neighborTable
+        numCols = self.numCols
+        base = 4 * state.stateId
+        neighs = []
+        for (entry, direction) in ((0, 'N'), (1, 'E'), (2, 'S'), (3, 'W')):
+            cell = table[base + entry]
+            if cell >= 0:
+                neighs.append(buildState(state, direction, cell // numCols, cell % numCols))
+        return neighs
+
+
+    def getGoalState(self):
+        """Returns the start state of a backward search, a state at the goal, in the proper form for this
+        class. Its cost and the costs of its predecessors count the weights of the cells after them on the
+        way to the goal, but not their own, so a forward and a backward state in the same cell add up to
+        the cost of the whole path."""
+        return self._setupBackwardState(self.goalRow, self.goalCol)
+
+
+    def _setupBackwardState(self, goalRow, goalCol):
+        """This creates and returns the start state of a backward search for this particular class."""
+        return MazeState(goalRow, goalCol, [], None, None, None, goalRow * self.numCols + goalCol)
+
+
+    def _buildPredecessor(self, currState, direction, predRow, predCol):
+        """Given a state of a backward search and the location of a cell it can be reached from, this
+        builds the state for that cell, computing the cost as appropriate for the class.
+        This will be overridden by the subclasses that have costs!"""
+        return MazeState(predRow, predCol, None, None, currState, direction, predRow * self.numCols + predCol)
+
+
+    def getPathCost(self, state):
+        """Returns the cost of the path to (or, backward, from) a state, the g value, or None if the states
+        of this class do not keep it. Subclasses that keep it override this."""
+        return None
+
+
+    def getPotential(self, state):
+        """Returns the potential a bidirectional search adds to the path cost of a forward state (and
+        subtracts from that of a backward state) to order its fringes. Zero here, so it is bidirectional
+        Dijkstra; A* overrides it."""
+        return 0
+
+
+    def joinStates(self, forwardState, backwardState):
+        """Given a state of the forward search and a state of the backward search in the same cell,
+        builds a state at the goal whose path is the whole path through that cell, and whose cost is
+        the cost of that path (or None if the states have no path costs)."""
+        backMoves = [OPPOSITE_MOVES[move] for move in reversed(backwardState.getPath())]
+        forwardCost = self.getPathCost(forwardState)
+        backwardCost = self.getPathCost(backwardState)
+        cost = None
+        if forwardCost is not None and backwardCost is not None:
+            cost = forwardCost + backwardCost
+        return MazeState(self.goalRow, self.goalCol, forwardState.getPath() + backMoves, cost, None, None,
+                         self.goalRow * self.numCols + self.goalCol)
+
+
+    def _cellWeight(self, row, col):
+        """Returns the weight of a cell, from the weight array when the maze has one"""
+        if self.weights is not None:
+            return self.weights[row * self.numCols + col]
+        return self.maze.getWeight(row, col)
+
+
+    def _calcDistToStart(self, row, col):
+        """Compute the distance to the start using the city block metric, the heuristic of a backward search"""
+        return abs(row - self.startRow) + abs(col - self.startCol)
+
+
+    def getNumStateIds(self):
+        """Maze states are interned as row * numCols + col, so there is one id per cell."""
+        return self.maze.getNumRows() * self.numCols
+
+    def hasIntegerCosts(self):
+        """Costs are sums of maze weights and city-block distances, so they are integers whenever the
+        maze weights are."""
+        return self.maze.hasIntegerWeights()
+
+
     def _buildNeighbor(self, currState, direction, neighRow, neighCol):
         """Given the current state and the location of the neighbor, this builds
         a new state, computing the cost as appropriate for the class.
         This will be overridden by most subclasses!"""
-        newPath = currState.getPath()[:]
-        newPath.append(direction)
-        return MazeState(neighRow, neighCol, newPath)
+        return MazeState(neighRow, neighCol, None, None, currState, direction, neighRow * self.numCols + neighCol)
 
 
 
@@ -128,18 +247,39 @@ class UCSMazeAdvisor(MazeTaskAdvisor):
         """This creates and returns a proper start state for this particular
         class. In this case cost is the distance travelled so far, and that
         starts at whatever the starting position has in it."""
-        return MazeState(startRow, startCol, [], self.maze.getWeight(startRow, startCol))
+        return MazeState(startRow, startCol, [], self.maze.getWeight(startRow, startCol), None, None,
+                         startRow * self.numCols + startCol)
 
 
     def _buildNeighbor(self, currState, direction, neighRow, neighCol):
         """Given the current state and the location of the neighbor, this builds
         a new state, computing the cost as appropriate for the class.
         In this case, the cost is the cost in currState plus the cost in the neighbor."""
-        newPath = currState.getPath()[:]
-        newPath.append(direction)
         oldCost = currState.getCost()
-        newCost = self.maze.getWeight(neighRow, neighCol)
-        return MazeState(neighRow, neighCol, newPath, oldCost + newCost)
+        if self.weights is not None:
+            newCost = self.weights[neighRow * self.numCols + neighCol]
+        else:
+            newCost = self.maze.getWeight(neighRow, neighCol)
+        return MazeState(neighRow, neighCol, None, oldCost + newCost, currState, direction,
+                         neighRow * self.numCols + neighCol)
+
+
+    def _setupBackwardState(self, goalRow, goalCol):
+        """The backward search starts at the goal with nothing after it, so its cost is zero."""
+        return MazeState(goalRow, goalCol, [], 0, None, None, goalRow * self.numCols + goalCol)
+
+
+    def _buildPredecessor(self, currState, direction, predRow, predCol):
+        """The cost of a predecessor is the cost of currState plus the weight of currState's own cell,
+        which a path through the predecessor must enter."""
+        (row, col) = currState.getLocation()
+        return MazeState(predRow, predCol, None, currState.getCost() + self._cellWeight(row, col), currState,
+                         direction, predRow * self.numCols + predCol)
+
+
+    def getPathCost(self, state):
+        """For UCS, the cost of a state is its path cost"""
+        return state.getCost()
 
 
 
@@ -157,17 +297,28 @@ class GreedyMazeAdvisor(MazeTaskAdvisor):
         class. In this case, it computes the distance to the goal and uses
         that as the cost."""
         distToGoal = self._calcDistToGoal(startRow, startCol)
-        return MazeState(startRow, startCol, [], distToGoal)
+        return MazeState(startRow, startCol, [], distToGoal, None, None, startRow * self.numCols + startCol)
 
 
     def _buildNeighbor(self, currState, direction, neighRow, neighCol):
         """Given the current state and the location of the neighbor, this builds
         a new state, computing the cost as appropriate for the class.
         In this case, the cost is the distance to the goal."""
-        newPath = currState.getPath()[:]
-        newPath.append(direction)
         distToGoal = self._calcDistToGoal(neighRow, neighCol)
-        return MazeState(neighRow, neighCol, newPath, distToGoal)
+        return MazeState(neighRow, neighCol, None, distToGoal, currState, direction,
+                         neighRow * self.numCols + neighCol)
+
+
+    def _setupBackwardState(self, goalRow, goalCol):
+        """Searching backward, the cost is the distance to the start."""
+        return MazeState(goalRow, goalCol, [], self._calcDistToStart(goalRow, goalCol), None, None,
+                         goalRow * self.numCols + goalCol)
+
+
+    def _buildPredecessor(self, currState, direction, predRow, predCol):
+        """Searching backward, the cost is the distance to the start."""
+        return MazeState(predRow, predCol, None, self._calcDistToStart(predRow, predCol), currState, direction,
+                         predRow * self.numCols + predCol)
 
 
     def _calcDistToGoal(self, row, col):
@@ -184,14 +335,17 @@ class AStarMazeState(MazeState):
     """This represents the state of a search in a maze.  It does not
 represent the maze, just the current location in the maze, and the
 series of cells that have been traversed to get to this location.  That
-is represented in the pathToMe instance variable inherited from the parent
+is represented by the parent state and move inherited from the parent
 class.  The cost is determined externally."""
 
-    def __init__(self, row, col, path = None, costToHere = None, costToGoal = None):
-        """Given the row and column, the current path, and the two costs (cost so far and heuristic 
-        cost to come, this creates a state/node for the search"""
+    __slots__ = ('costToHere', 'costToGoal')
 
-        MazeState.__init__(self, row, col, path, costToHere + costToGoal)
+    def __init__(self, row, col, path = None, costToHere = None, costToGoal = None, parent = None, move = None,
+                 stateId = None):
+        """Given the row and column, the current path (or parent state and move), and the two costs (cost so
+        far and heuristic cost to come, this creates a state/node for the search"""
+
+        MazeState.__init__(self, row, col, path, costToHere + costToGoal, parent, move, stateId)
         self.costToHere = costToHere
         self.costToGoal = costToGoal
         self.myCost = self.costToHere + self.costToGoal
@@ -205,9 +359,9 @@ class.  The cost is determined externally."""
         return self.costToGoal
 
     def __str__(self):
-        """Create a string for printing that contains the row, col plus path and costs"""
+        """Create a string for printing that contains the row, col plus last move and costs"""
         strng = "[" + str(self.row) + ", " + str(self.col) + "]"
-        strng += "  " + str(self.pathToMe) + " (" + str(self.costToHere)
+        strng += "  " + str(self.move) + " (" + str(self.costToHere)
         strng += " + " + str(self.costToGoal) + ") = " + str(self.myCost)
         return strng
 
@@ -228,7 +382,8 @@ class AStarMazeAdvisor(MazeTaskAdvisor):
         """
         costToHere = self.maze.getWeight(startRow, startCol) # g
         costToGoal = self._calcDistToGoal(startRow, startCol) # h
-        return AStarMazeState(startRow, startCol, [], costToHere, costToGoal)
+        return AStarMazeState(startRow, startCol, [], costToHere, costToGoal, None, None,
+                              startRow * self.numCols + startCol)
 
     def _buildNeighbor(self, currState, direction, neighRow, neighCol):
         """Given the current state and the location of the neighbor, this builds
@@ -236,13 +391,43 @@ class AStarMazeAdvisor(MazeTaskAdvisor):
         In this case, we need to update both g and h costs for the new state:
         new g = old g + new cell's weight,
         new h = distance to goal of new cell"""
-        newPath = currState.getPath()[:]
-        newPath.append(direction)
         oldCost = currState.getCostToHere()
-        newCost = self.maze.getWeight(neighRow, neighCol)
+        if self.weights is not None:
+            newCost = self.weights[neighRow * self.numCols + neighCol]
+        else:
+            newCost = self.maze.getWeight(neighRow, neighCol)
         costToHere = oldCost + newCost
         costToGoal = self._calcDistToGoal(neighRow, neighCol)
-        return AStarMazeState(neighRow, neighCol, newPath, costToHere, costToGoal)
+        return AStarMazeState(neighRow, neighCol, None, costToHere, costToGoal, currState, direction,
+                              neighRow * self.numCols + neighCol)
+
+
+    def _setupBackwardState(self, goalRow, goalCol):
+        """The backward search starts at the goal with g = 0, and its heuristic is the distance to the start."""
+        return AStarMazeState(goalRow, goalCol, [], 0, self._calcDistToStart(goalRow, goalCol), None, None,
+                              goalRow * self.numCols + goalCol)
+
+
+    def _buildPredecessor(self, currState, direction, predRow, predCol):
+        """Searching backward, g grows by the weight of currState's cell, which a path through the predecessor
+        must enter, and h is the distance to the start."""
+        (row, col) = currState.getLocation()
+        costToHere = currState.getCostToHere() + self._cellWeight(row, col)
+        return AStarMazeState(predRow, predCol, None, costToHere, self._calcDistToStart(predRow, predCol),
+                              currState, direction, predRow * self.numCols + predCol)
+
+
+    def getPathCost(self, state):
+        """For A*, the path cost is g"""
+        return state.getCostToHere()
+
+
+    def getPotential(self, state):
+        """The difference of the forward heuristic (distance to the goal) and the backward one (distance to
+        the start). Half of it is the average of the two heuristics, which is consistent in both directions,
+        so a bidirectional search can stop as soon as its two fringes meet in the middle."""
+        (row, col) = state.getLocation()
+        return self._calcDistToGoal(row, col) - self._calcDistToStart(row, col)
 
 
     def _calcDistToGoal(self, row, col):
@@ -0,0 +1,59 @@
+"""####################################################
+A MembershipIndex class, shared by Queue and Stack
+"""
+
+from collections import deque
+
+
+class MembershipIndex:
+    """Keeps track of which values are in a linear collection, so that contains is a hash lookup
+    instead of a scan. For each value (by == and hash) it keeps the copies that are currently in the
+    collection, oldest first, so a lookup returns the same copy a scan of the collection would: the
+    oldest one for a queue, the newest one for a stack. The values must be hashable."""
+
+    def __init__(self, vals=()):
+        """Makes an index of the values in vals, given oldest first."""
+        self.copies = {}
+        for val in vals:
+            self.add(val)
+
+    def add(self, val):
+        """Records one more copy of val, as the newest one."""
+        entry = self.copies.get(val)
+        if entry is None:
+            self.copies[val] = deque([val])
+        else:
+            entry.append(val)
+
+    def dropOldest(self, val):
+        """Forgets the oldest copy of val, which is the one a queue removes."""
+        self._drop(val, True)
+
+    def dropNewest(self, val):
+        """Forgets the newest copy of val, which is the one a stack removes."""
+        self._drop(val, False)
+
+    def _drop(self, val, oldest):
+        """Private: forgets one copy of val, from the old or new end."""
+        entry = self.copies[val]
+        if len(entry) == 1:
+            del self.copies[val]
+        elif oldest:
+            entry.popleft()
+        else:
+            entry.pop()
+
+    def findOldest(self, value):
+        """Returns the oldest copy of a value matching the input, or False if there is none."""
+        entry = self.copies.get(value)
+        if entry is None:
+            return False
+        return entry[0]
+
+    def findNewest(self, value):
+        """Returns the newest copy of a value matching the input, or False if there is none."""
+        entry = self.copies.get(value)
+        if entry is None:
+            return False
+        return entry[-1]
+# end class MembershipIndex
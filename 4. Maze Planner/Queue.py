@@ -2,20 +2,28 @@
 A Queue class
 """
 
+from collections import deque
+from MembershipIndex import MembershipIndex
+
 
 class Queue:
     """A queue is a linear collection used to hold qData that is waiting
     for some purpose.  The first to enter the queue is the first to
-    leave it."""
+    leave it. It is stored in a deque, so inserting and deleting take constant time.
+    If made with indexed=True, it also keeps a MembershipIndex of its values, so that
+    contains is a hash lookup instead of a scan (the values must then be hashable)."""
 
-    def __init__(self, valList=None):
+    def __init__(self, valList=None, indexed=False):
         """When creating a new queue, you can give a list of values to
-        insert in the queue at the start."""
+        insert in the queue at the start, and ask for a membership index."""
         if valList is None:
-            self.qData = []
+            self.qData = deque()
         else:
-            self.qData = valList[:]
+            self.qData = deque(valList)
         self.size = len(self.qData)
+        self.members = None
+        if indexed:
+            self.members = MembershipIndex(self.qData)
 
     def getSize(self):
         """Return the size of the queue."""
@@ -41,6 +49,8 @@ class Queue:
         """Inserts a new value at the end of the queue."""
         self.qData.append(val)
         self.size = self.size + 1
+        if self.members is not None:
+            self.members.add(val)
 
     def enqueue(self, val):
         """Another name for inserting."""
@@ -51,8 +61,10 @@ class Queue:
         if self.isEmpty():
             return None
         else:
-            firstData = self.qData.pop(0)
+            firstData = self.qData.popleft()
             self.size = self.size - 1
+            if self.members is not None:
+                self.members.dropOldest(firstData)
             return firstData
 
     def dequeue(self):
@@ -61,7 +73,9 @@ class Queue:
 
     def contains(self, value):
         """Takes in a value and returns true if the item is in the queue. Assumes the item implements
-        the __eq__ operation."""
+        the __eq__ operation (and __hash__, if the queue is indexed)."""
+        if self.members is not None:
+            return self.members.findOldest(value)
         for item in self.qData:
             if value == item:
                 return item
@@ -86,7 +100,9 @@ class Queue:
 
 class PriorityQueue(Queue):
     """A priority queue puts lowest-cost elements first.
-    Implemented with a MinHeap, which is internal to the class"""
+    Implemented with a MinHeap, which is internal to the class. Alongside the heap it keeps a dictionary
+    from each value to its position in the heap, so finding a value is a hash lookup rather than a scan.
+    For that index to be right, each value (by == and hash) may be in the queue only once."""
 
     def __init__(self, valList=None):
         """Has two optional inputs. The first is a list to populate the queue with, which must
@@ -96,6 +112,7 @@ class PriorityQueue(Queue):
         """
         Queue.__init__(self)
         self.qData = []
+        self.positions = {}
         self.size = 0
         if valList is not None:
             for (val, prior) in valList:
@@ -105,6 +122,7 @@ class PriorityQueue(Queue):
     def insert(self, value, priority):
         """Inserts a new value at the end of the queue."""
         self.qData.append((value, priority))
+        self.positions[value] = self.size
         self.size = self.size + 1
         self._walkUp(self.size - 1)
 
@@ -116,17 +134,19 @@ class PriorityQueue(Queue):
         """Walk a value up the heap until it is larger than its parent
         This is really a *private* method, no one outside should call it.
         Thus the underscore leading the name."""
-        inPlace = False
-        while not(index == 0) and not inPlace:
-            parentIndex = self._parent(index)
-            curr = self.qData[index]
-            par = self.qData[parentIndex]
+        qData = self.qData
+        positions = self.positions
+        curr = qData[index]
+        while index > 0:
+            parentIndex = (index - 1) // 2
+            par = qData[parentIndex]
             if curr[1] >= par[1]:
-                inPlace = True
-            else:
-                self.qData[index] = par
-                self.qData[parentIndex] = curr
-                index = parentIndex
+                break
+            qData[index] = par
+            positions[par[0]] = index
+            index = parentIndex
+        qData[index] = curr
+        positions[curr[0]] = index
 
     def delete(self):
         """Removes the first element from the queue, returning it as its value, or returning None if
@@ -137,9 +157,11 @@ class PriorityQueue(Queue):
             poppedElement = self.qData[0]
             self.size = self.size - 1
             self.qData = []
+            self.positions.clear()
             return poppedElement
         else:
             poppedElement = self.qData[0]
+            del self.positions[poppedElement[0]]
             self.size = self.size - 1
             lastItem = self.qData.pop(self.size)
             self.qData[0] = lastItem
@@ -152,48 +174,52 @@ class PriorityQueue(Queue):
 
     def _walkDown(self, index):
         """A private method, walks a value down the tree until it is smaller than both its children."""
-        inPlace = False
-        leftInd = self._leftChild(index)
-        rightInd = self._rightChild(index)
-        while not(leftInd >= self.size) and not inPlace:
-            curr = self.qData[index]
-
-            if (rightInd >= self.size):
-                minInd = leftInd
-            else:
-                leftVal = self.qData[leftInd]
-                rightVal = self.qData[rightInd]
-                if leftVal[1] <= rightVal[1]:
-                    minInd = leftInd
-                else:
-                    minInd = rightInd
-
-            minVal = self.qData[minInd]
+        qData = self.qData
+        positions = self.positions
+        size = self.size
+        curr = qData[index]
+        leftInd = 2 * index + 1
+        while leftInd < size:
+            rightInd = leftInd + 1
+            minInd = leftInd
+            if rightInd < size and qData[rightInd][1] < qData[leftInd][1]:
+                minInd = rightInd
+            minVal = qData[minInd]
             if curr[1] <= minVal[1]:
-                inPlace = True
-            else:
-                self.qData[minInd] = curr
-                self.qData[index] = minVal
-                index = minInd
-                leftInd = self._leftChild(index)
-                rightInd = self._rightChild(index)
+                break
+            qData[index] = minVal
+            positions[minVal[0]] = index
+            index = minInd
+            leftInd = 2 * index + 1
+        qData[index] = curr
+        positions[curr[0]] = index
 
 
     def update(self, value, newP):
         """Update finds the given value in the queue, changes its priority value, and then moves it 
         up or down the tree as appropriate."""
         pos = self._findValue(value)
-        [oldP, v] = self.qData[pos]
-        self.qData[pos] = [newP, value]
+        (oldValue, oldP) = self.qData[pos]
+        self.qData[pos] = (oldValue, newP)
         if oldP > newP:
             self._walkUp(pos)
         else:
             self._walkDown(pos)
 
 
+    def decreaseKey(self, value, newValue, newP):
+        """Replaces the given value, which must be in the queue, with newValue (an == value, such as the same
+        search state reached by a cheaper path) at the lower priority newP, and moves it up the heap.
+        This is the decrease-key operation: one O(log n) walk instead of a remove and a re-insert."""
+        pos = self.positions.pop(value)
+        self.qData[pos] = (newValue, newP)
+        self.positions[newValue] = pos
+        self._walkUp(pos)
+
+
     def contains(self, value):
-        """Takes in a value and searches for it in the priority queue. If it is there, it returns True, 
-        otherwise False."""
+        """Takes in a value and searches for it in the priority queue. If it is there, it returns
+        the matching value stored in the queue, otherwise False."""
         pos = self._findValue(value)
         if pos < 0:
             # value not found
@@ -212,25 +238,24 @@ class PriorityQueue(Queue):
             # If only one value left, make heap empty
             self.size = self.size - 1
             self.qData = []
+            self.positions.clear()
         elif pos == (self.size - 1):
             # if removed value is last one, just remove it
             self.size = self.size - 1
-            self.qData.pop(self.size)
+            del self.positions[self.qData.pop(self.size)[0]]
         else:
+            del self.positions[self.qData[pos][0]]
             self.size = self.size - 1
             lastItem = self.qData.pop(self.size)
             self.qData[pos] = lastItem
-            self._walkDown(pos)
+            # the moved item may belong above or below its new spot
+            self._walkUp(pos)
+            self._walkDown(self.positions[lastItem[0]])
 
 
     def _findValue(self, value):
-        """Find the position of a value in the priority queue."""
-        i = 0
-        for [val, prior] in self.qData:
-            if val == value:
-                return i
-            i = i + 1
-        return -1
+        """Find the position of a value in the priority queue, or -1 if it is not there."""
+        return self.positions.get(value, -1)
 
 
 
@@ -256,8 +281,127 @@ class PriorityQueue(Queue):
         if self.isEmpty():
             val += "<empty>"
         else:
-            p, v = self.firstElement()
+            v, p = self.firstElement()
             val = val + "priority: " + str(p) + ", value: " + str(v)
         return val
 
 
+
+
+
+class BucketQueue(Queue):
+    """A priority queue for small non-negative integer priorities, such as maze path costs. It keeps
+    one bucket (a deque) per priority value and a pointer to the lowest non-empty bucket, so inserting is O(1)
+    and deleting only walks past empty buckets (at most the largest step between costs, the maze's maxCost).
+    This is Dial's bucket queue, except the pointer may also move back, so priorities need not be monotone
+    (greedy search). It offers the same methods as PriorityQueue and can be used in its place.
+    Within a bucket, values leave in the order they arrived, as the heap in PriorityQueue mostly does, so
+    ties (common in greedy search) are broken the same way whichever queue a solver uses.
+    Each value may be in the queue only once; its entry is found through a dictionary, so contains and
+    removeValue take constant time. Removed entries are left in their bucket and skipped later."""
+
+    def __init__(self, valList=None):
+        """Has one optional input, a list of (value, priority) tuples to populate the queue with."""
+        Queue.__init__(self)
+        self.buckets = {}
+        self.entries = {}
+        self.minBucket = 0
+        self.size = 0
+        if valList is not None:
+            for (val, prior) in valList:
+                self.insert(val, prior)
+
+
+    def insert(self, value, priority):
+        """Inserts a new value with the given integer priority. A value already in the queue is replaced."""
+        if type(priority) is not int or priority < 0:
+            raise ValueError("BucketQueue priorities must be non-negative integers, not " + repr(priority))
+        if value in self.entries:
+            self.removeValue(value)
+        entry = [value, priority]
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            self.buckets[priority] = deque([entry])
+        else:
+            bucket.append(entry)
+        self.entries[value] = entry
+        if priority < self.minBucket or self.size == 0:
+            self.minBucket = priority
+        self.size = self.size + 1
+
+    def enqueue(self, val, priority):
+        """Another name for inserting"""
+        self.insert(val, priority)
+
+    def _lowestEntry(self):
+        """Private: moves the pointer up to the lowest bucket with a live entry, dropping removed entries
+        and empty buckets on the way, and returns that entry. The queue must not be empty."""
+        while True:
+            bucket = self.buckets.get(self.minBucket)
+            if bucket is not None:
+                while bucket and bucket[0][1] is None:
+                    bucket.popleft()
+                if bucket:
+                    return bucket[0]
+                del self.buckets[self.minBucket]
+            self.minBucket = self.minBucket + 1
+
+    def firstElement(self):
+        """Returns the (value, priority) with the lowest priority, without removing it."""
+        if self.size == 0:
+            return None
+        [value, priority] = self._lowestEntry()
+        return (value, priority)
+
+    def delete(self):
+        """Removes the lowest-priority element from the queue, returning it as a (value, priority) tuple,
+        or returning None if the queue is already empty."""
+        if self.size == 0:
+            return None
+        entry = self._lowestEntry()
+        self.buckets[self.minBucket].popleft()
+        del self.entries[entry[0]]
+        self.size = self.size - 1
+        return (entry[0], entry[1])
+
+    def dequeue(self):
+        """Another name for deleting, removes the first element from the queue, returning it as its value"""
+        return self.delete()
+
+    def update(self, value, newP):
+        """Changes the priority of the given value, which must already be in the queue."""
+        oldValue = self.entries[value][0]
+        self.removeValue(value)
+        self.insert(oldValue, newP)
+
+    def decreaseKey(self, value, newValue, newP):
+        """Replaces the given value, which must be in the queue, with newValue at priority newP."""
+        self.removeValue(value)
+        self.insert(newValue, newP)
+
+    def contains(self, value):
+        """Takes in a value and returns the matching value stored in the queue, or False if there is none."""
+        entry = self.entries.get(value)
+        if entry is None:
+            return False
+        else:
+            return entry[0]
+
+    def removeValue(self, value):
+        """Takes in a value and removes it from the queue, wherever it is."""
+        entry = self.entries.pop(value, None)
+        if entry is None:
+            print("Value not found:", value)
+        else:
+            entry[1] = None
+            self.size = self.size - 1
+
+    def __str__(self):
+        """Provides a string with just the first element."""
+        val = "BucketQueue: "
+        if self.isEmpty():
+            val += "<empty>"
+        else:
+            v, p = self.firstElement()
+            val = val + "priority: " + str(p) + ", value: " + str(v)
+        return val
@@ -7,8 +7,10 @@ solvers for a specific problem.
  ==================================================================="""
 
 
-from Queue import Queue, PriorityQueue
+import time
+from Queue import Queue, PriorityQueue, BucketQueue
 from Stack import Stack
+from SearchStats import QUEUE_METHODS
 
 # Change this to true to see information about the search as it goes.
 verbose = False
@@ -16,32 +18,63 @@ verbose = False
 
 class SearchState(object):
     """
-    This is, essentially an abstract class for a search state.  It contains only a path, the sequence of moves in
+    This is, essentially an abstract class for a search state.  It contains a path, the sequence of moves in
     the state space from the starting point to this state, and the cost of the state.  The meaning of the cost and
     its value are meant to be computed external to this state.  This is just a container for qData.
+    The path need not be stored: a state can instead be given its parent state and the move that led from the
+    parent to it, and the path is then rebuilt from those links only when getPath is called (normally once, for
+    the goal). That way making a neighbor costs the same no matter how long the path is.
     Note that this asks the subclasses to implement the comparison operators. This is important, as the search
     algorithms use == and possibly <, <=, etc. to compare the qData when searching for an item in a stack, queue, or
     priority queue. These should compare the qData associated with a state, and not the cost/priority!
     Also, the state must implement the __hash__ method, so that states can be stored in sets or dictionaries, in such
     a way that states that are == always produce the same hash value.
+    A task advisor may also intern its states: give every distinct state a small integer stateId in
+    range(getNumStateIds()). The solvers then keep their bookkeeping in arrays indexed by stateId and never
+    hash or compare the state objects. States are __slots__ records to keep them small.
     """
 
-    def __init__(self, path=None, cost=None):
-        """Initialize the two basic instance variables to some value"""
-        if path is None:
+    __slots__ = ('pathToMe', 'myCost', 'parent', 'move', 'stateId')
+
+    def __init__(self, path=None, cost=None, parent=None, move=None, stateId=None):
+        """Initialize the basic instance variables. Give either a path, or a parent state and the move from
+        it to this state; with neither, the path is empty. stateId is the interned id, if any"""
+        self.parent = parent
+        self.move = move
+        self.stateId = stateId
+        if path is not None:
+            self.pathToMe = path
+        elif parent is None:
             self.pathToMe = []
         else:
-            self.pathToMe = path
+            self.pathToMe = None
         self.myCost = cost
 
     def getPath(self):
-        """Access the value of the pathToMe instance variable"""
+        """Access the path to this state. If it was not given, it is rebuilt by following the parent
+        links back to an ancestor that has a path, and then kept"""
+        if self.pathToMe is None:
+            moves = []
+            state = self
+            while state.pathToMe is None:
+                moves.append(state.move)
+                state = state.parent
+            moves.reverse()
+            self.pathToMe = state.pathToMe + moves
         return self.pathToMe
 
+    def getParent(self):
+        """Access the state this one was generated from, or None"""
+        return self.parent
+
     def getCost(self):
         """Access the value of the myCost instance variable"""
         return self.myCost
 
+    def getStateId(self):
+        """Access the interned integer id of this state, or None if it has none"""
+        return self.stateId
+
     # The comparison operators are defined by these methods. Note that if not specified, __neq__ returns the opposite
     # of what __eq__ returns
 
@@ -81,8 +114,9 @@ class SearchState(object):
         return hash(False)
 
     def __str__(self):
-        """Make a string representation of this state, for printing"""
-        return str(self.pathToMe) + '  ' + str(self.myCost)
+        """Make a string representation of this state, for printing. Shows the last move rather than
+        the whole path, so printing does not build and cache a path on every state"""
+        return 'move ' + str(self.move) + '  ' + str(self.myCost)
 
 
 
@@ -113,8 +147,52 @@ class AbstractTaskAdvisor(object):
         print("AbstractTaskAdvisor: Subclass should implement generateNeighbors")
         return []
 
+    def getGoalState(self):
+        """Returns the start state of a backward search, from the goal. Only needed for bidirectional search."""
+        print("AbstractTaskAdvisor: Subclass should implement getGoalState to be searched backward")
+        return None
 
+    def generatePredecessors(self, state):
+        """Takes in a state of a backward search and builds a list of the states it can be reached from. Only
+        needed for bidirectional search."""
+        print("AbstractTaskAdvisor: Subclass should implement generatePredecessors to be searched backward")
+        return []
 
+    def getPathCost(self, state):
+        """Returns the cost of the path to a state (or, for a backward state, from it to the goal), or None if
+        the states do not keep one. The two costs of a forward and a backward state that meet should add up to
+        the cost of the whole path."""
+        return None
+
+    def getPotential(self, state):
+        """Returns a potential for ordering a bidirectional search: the forward heuristic minus the backward
+        one at this state, or 0 to order by path cost alone."""
+        return 0
+
+    def joinStates(self, forwardState, backwardState):
+        """Takes a forward and a backward state that are the same state, and returns a goal state whose path
+        runs through them. Only needed for bidirectional search."""
+        print("AbstractTaskAdvisor: Subclass should implement joinStates to be searched backward")
+        return None
+
+    def getNumStateIds(self):
+        """If this advisor interns its states, returns the number of distinct ids (every state's stateId is in
+        range of this number), otherwise None. Subclasses that can number their states densely should override."""
+        return None
+
+    def hasIntegerCosts(self):
+        """Returns True if every state cost this advisor produces is a non-negative integer, which lets
+        the solvers use a bucket queue instead of a binary heap. Subclasses that know this should override."""
+        return False
+
+
+
+
+
+def _traceId(state):
+    """The id a trace records for a state: its interned stateId, or -1 if it has none"""
+    stateId = state.stateId
+    return -1 if stateId is None else stateId
 
 
 class AbstractSearchSolver(object):
@@ -144,6 +222,10 @@ class AbstractSearchSolver(object):
         self._initializeCounts()
         self.fringe = None
         self.visited = None
+        self.fringeStates = None
+        self.traceRecorder = None
+        self.stats = None
+        self.measuredMethods = []
 
     def _initializeCounts(self):
         """A private helper to initialize the counts, since they need to be initialized anew each time the
@@ -167,11 +249,65 @@ class AbstractSearchSolver(object):
         startState = self.taskAdvisor.getStartState()
         if self.taskAdvisor.isGoal(startState):
             return startState.getPath()
-        self.visited = set()
+        self._setupBookkeeping()
         self._setupFringe(startState)
         self.nodesCreated += 1
 
 
+    def _setupBookkeeping(self):
+        """Sets up the visited registry and, for interned states, the array of states on the fringe. Without
+        state ids, visited is a dictionary from each visited state to itself and the fringe holds the states.
+        With them, visited is a bytearray of flags indexed by stateId, the fringe holds stateIds, and
+        fringeStates maps each stateId on the fringe to its state."""
+        numIds = self.taskAdvisor.getNumStateIds()
+        if numIds is None:
+            self.visited = {}
+            self.fringeStates = None
+        else:
+            self.visited = bytearray(numIds)
+            self.fringeStates = [None] * numIds
+
+
+    def _addToFringe(self, state, priority=None):
+        """Puts the state on the fringe, with the priority if the fringe is a priority queue."""
+        if self.fringeStates is None:
+            key = state
+        else:
+            key = state.stateId
+            self.fringeStates[key] = state
+        if priority is None:
+            self.fringe.insert(key)
+        else:
+            self.fringe.insert(key, priority)
+
+
+    def _fringeToState(self, key):
+        """Takes what was just removed from the fringe and returns the state it stands for."""
+        if self.fringeStates is None:
+            return key
+        state = self.fringeStates[key]
+        self.fringeStates[key] = None
+        return state
+
+
+    def _replaceInFringe(self, oldState, newState, priority):
+        """Replaces a state on the fringe with an equal one reached more cheaply, lowering its priority."""
+        if self.fringeStates is None:
+            self.fringe.decreaseKey(oldState, newState, priority)
+        else:
+            key = newState.stateId
+            self.fringeStates[key] = newState
+            self.fringe.decreaseKey(key, key, priority)
+
+
+    def _markVisited(self, state):
+        """Records the state in the visited registry."""
+        if self.fringeStates is None:
+            self.visited[state] = state
+        else:
+            self.visited[state.stateId] = 1
+
+
     def _setupFringe(self, startState):
         """This method sets up the proper kind of fringe set for this particular search.
         This method should be overridden by the subclass!"""
@@ -184,7 +320,7 @@ class AbstractSearchSolver(object):
         the search fails and False is returned, or the search completes"""
         while True:
             (nextState, neighbors, isDone) = self.searchStep()
-            if nextState == "Fail":
+            if isDone == "Fail":
                 return False
             elif isDone == "Done":
                 # is search is done then nextState actually holds the result
@@ -201,20 +337,137 @@ class AbstractSearchSolver(object):
         return (False, False, "Fail")
 
 
+    def setTraceRecorder(self, recorder):
+        """Starts recording each step of the search with a SearchTrace.TraceRecorder, or stops when given None.
+        The recorder is finished when the search is done or fails."""
+        self.traceRecorder = recorder
+        self._installStepWrapper()
+
+
+    def setStats(self, stats):
+        """Starts measuring the search with a SearchStats, or stops when given None. Set it before initSearch:
+        initSearch is then wrapped too, so that once the fringe exists its operations, the duplicate checks,
+        and the advisor's neighbor generation are timed, through wrappers set on the objects themselves."""
+        self._removeMeasuredMethods()
+        self.stats = stats
+        if stats is not None:
+            self.initSearch = self._measuredInitSearch
+        elif 'initSearch' in self.__dict__:
+            del self.initSearch
+        self._installStepWrapper()
+
+
+    def getStats(self):
+        """Returns the SearchStats measuring this solver, or None"""
+        return self.stats
+
+
+    def getFringeSize(self):
+        """Returns the number of states on the fringe"""
+        if self.fringe is None:
+            return 0
+        return self.fringe.getSize()
+
+
+    def getVisitedSize(self):
+        """Returns the number of states in the visited registry. Each state is marked visited once, when it
+        is expanded, so this is the number of nodes visited."""
+        return self.nodesVisited
+
+
+    def _installStepWrapper(self):
+        """While a trace is recorded or stats are kept, searchStep is replaced on this object by
+        _instrumentedSearchStep, so a solver doing neither does no extra work at all."""
+        if self.traceRecorder is not None or self.stats is not None:
+            self.searchStep = self._instrumentedSearchStep
+        elif 'searchStep' in self.__dict__:
+            del self.searchStep
+
+
+    def _instrumentedSearchStep(self):
+        """Runs the subclass's searchStep, timing it for the stats and recording the state it expanded and
+        its new fringe states in the trace"""
+        stats = self.stats
+        if stats is not None:
+            start = time.perf_counter()
+        result = type(self).searchStep(self)
+        (nextState, newFringe, status) = result
+        if stats is not None:
+            stats.stepTaken(self, time.perf_counter() - start, status)
+        recorder = self.traceRecorder
+        if recorder is not None:
+            if nextState:
+                recorder.record(_traceId(nextState), [_traceId(state) for state in newFringe])
+            if status == "Done":
+                recorder.finish(status, nextState.getPath())
+            elif status == "Fail":
+                recorder.finish(status)
+        return result
+
+
+    def _measuredInitSearch(self):
+        """Runs the subclass's initSearch under the stats, then puts timed wrappers on the methods that
+        _measuredMethods lists"""
+        stats = self.stats
+        stats.startSearch()
+        start = time.perf_counter()
+        result = type(self).initSearch(self)
+        stats.searchSeconds += time.perf_counter() - start
+        self._removeMeasuredMethods()
+        for (owner, name, category) in self._measuredMethods():
+            if callable(getattr(owner, name, None)):
+                setattr(owner, name, stats.timed(getattr(owner, name), category, name == 'decreaseKey'))
+                self.measuredMethods.append((owner, name))
+        if result is not None:
+            stats.finishSearch(self, "Done")
+        return result
+
+
+    def _measuredMethods(self):
+        """Lists the (object, method name, category) of each method to time: the advisor's neighbor
+        generation, the duplicate checks, and the fringe operations. Solvers with other helpers add them."""
+        methods = [(self.taskAdvisor, 'generateNeighbors', 'neighbors'),
+                   (self.taskAdvisor, 'generatePredecessors', 'neighbors'),
+                   (self, '_hasBeenVisited', 'duplicates'), (self, '_hasBeenFringed', 'duplicates'),
+                   (self, '_addToFringe', 'queue'), (self, '_replaceInFringe', 'queue'),
+                   (self, '_fringeToState', 'queue')]
+        for fringe in self._fringes():
+            methods.append((fringe, 'contains', 'duplicates'))
+            methods.extend((fringe, name, 'queue') for name in QUEUE_METHODS)
+        return methods
+
+
+    def _fringes(self):
+        """Returns the fringe objects whose methods can be timed"""
+        if isinstance(self.fringe, (Queue, Stack)):
+            return [self.fringe]
+        return []
+
+
+    def _removeMeasuredMethods(self):
+        """Takes the timed wrappers off again"""
+        for (owner, name) in self.measuredMethods:
+            if name in owner.__dict__:
+                delattr(owner, name)
+        self.measuredMethods = []
+
+
     def _hasBeenVisited(self, state):
-        """Given a state, it looks through the visited set and seeks a node
-        that is "equal" to the input state. It is up to the subclass to
-        define what it means for them to be equal. It returns the matching
-        state, if any, or False if none"""
-        for s in self.visited:
-            if s == state:
-                return s
-        return False
+        """Given a state, it looks up the visited registry for a node that is "equal" to the input state.
+        The registry is a dictionary mapping each visited state to itself, so this is one hash lookup;
+        states must implement __hash__ and __eq__ consistently. With interned states it is a flag in an
+        array instead. It returns the matching state (or True), if any, or False if none"""
+        if self.fringeStates is None:
+            return self.visited.get(state, False)
+        return self.visited[state.stateId] == 1
 
     def _hasBeenFringed(self, state):
-        """Given a state, it looks through the fringe set and seeks a node that is "equal" to the
-        input state.  It is up to the objects to define what it means for them to be equal.  It
-        returns the matching state, if any, or False if none"""
+        """Given a state, it asks the fringe for a node that is "equal" to the input state.  The priority
+        queues index their contents by state, so this is a hash lookup that also knows where the state sits
+        in the heap; with interned states it is an array lookup.  It returns the matching state, if any,
+        or False if none"""
+        if self.fringeStates is not None:
+            return self.fringeStates[state.stateId] or False
         foundInfo = self.fringe.contains(state)
         if foundInfo:
             return foundInfo
@@ -238,9 +491,13 @@ class BestFirstSearchSolver(AbstractSearchSolver):
 
     def _setupFringe(self, startState):
         """This method sets up the proper kind of fringe set for this particular search.
-        In this case, it creates a priority queue and adds the start state to it."""
-        self.fringe = PriorityQueue()
-        self.fringe.insert(startState, startState.getCost())
+        In this case, it creates a priority queue and adds the start state to it. When the task advisor
+        promises integer costs, the priority queue is a BucketQueue, otherwise a binary-heap PriorityQueue."""
+        if self.taskAdvisor.hasIntegerCosts():
+            self.fringe = BucketQueue()
+        else:
+            self.fringe = PriorityQueue()
+        self._addToFringe(startState, startState.getCost())
 
 
     def searchStep(self):
@@ -251,7 +508,8 @@ class BestFirstSearchSolver(AbstractSearchSolver):
         newNeighbors = []
         if self.fringe.isEmpty(): 
             return (False, False, "Fail")
-        nextState, cost = self.fringe.dequeue()
+        key, cost = self.fringe.dequeue()
+        nextState = self._fringeToState(key)
         if self.taskAdvisor.isGoal(nextState):
             return (nextState, [], "Done")  # when hit goal, neighbors are irrelevant
 
@@ -260,18 +518,18 @@ class BestFirstSearchSolver(AbstractSearchSolver):
             print("----------------------")
             print("Current state:", nextState)
         neighbors = self.taskAdvisor.generateNeighbors(nextState)
-        self.visited.add(nextState)
+        self._markVisited(nextState)
         self.nodesVisited += 1
 
         for n in neighbors:
             visitedMatch = self._hasBeenVisited(n)
-            fringeMatch = self._hasBeenFringed(n)
+            fringeMatch = (not visitedMatch) and self._hasBeenFringed(n)
 
             if (not visitedMatch) and (not fringeMatch):
                 if verbose:
                     print("    Neighbor never seen before", n)
                 # this node has not been generated before, add it to the fringe
-                self.fringe.enqueue(n, n.getCost())
+                self._addToFringe(n, n.getCost())
                 newNeighbors.append(n)
                 self.nodesCreated += 1
             elif visitedMatch:
@@ -281,8 +539,7 @@ class BestFirstSearchSolver(AbstractSearchSolver):
                 if fringeMatch.getCost() > n.getCost():
                     if verbose:
                         print("    Neighbor has lower priority, ", n)
-                    self.fringe.removeValue(fringeMatch)
-                    self.fringe.enqueue(n, n.getCost())
+                    self._replaceInFringe(fringeMatch, n, n.getCost())
                     newNeighbors.append(n)
                     self.nodesCreated += 1
                 else:
@@ -318,12 +575,13 @@ class NoCostSearchSolver(AbstractSearchSolver):
     def _setupFringe(self, startState):
         """This method sets up the proper kind of fringe set for this particular search.
         In this case, it creates either a Queue or a Stack, depending on whether we are doing
-        BFS or DFS, and it inserts the start state into it."""
+        BFS or DFS, and it inserts the start state into it. The fringe is indexed, so checking whether
+        a neighbor is already on it takes constant time."""
         if self.mode == "BFS":
-            self.fringe = Queue()
+            self.fringe = Queue(indexed=True)
         else:
-            self.fringe = Stack()
-        self.fringe.insert(startState)
+            self.fringe = Stack(indexed=True)
+        self._addToFringe(startState)
 
 
     def searchStep(self):
@@ -334,7 +592,7 @@ class NoCostSearchSolver(AbstractSearchSolver):
         newNeighbors = []
         if self.fringe.isEmpty():
             return (False, False, "Fail")
-        nextState = self.fringe.delete()
+        nextState = self._fringeToState(self.fringe.delete())
         if self.taskAdvisor.isGoal(nextState):
             return (nextState, [], "Done")  # when hit goal, neighbors are irrelevant
 
@@ -343,18 +601,18 @@ class NoCostSearchSolver(AbstractSearchSolver):
             print("----------------------")
             print("Current state:", nextState)
         neighbors = self.taskAdvisor.generateNeighbors(nextState)
-        self.visited.add(nextState)
+        self._markVisited(nextState)
         self.nodesVisited += 1
 
         for n in neighbors:
             visitedMatch = self._hasBeenVisited(n)
-            fringeMatch = self._hasBeenFringed(n)
+            fringeMatch = (not visitedMatch) and self._hasBeenFringed(n)
 
             if (not visitedMatch) and (not fringeMatch):
                 if verbose:
                     print("    Neighbor never seen before", n)
                 # this node has not been generated before, add it to the fringe
-                self.fringe.insert(n)
+                self._addToFringe(n)
                 newNeighbors.append(n)
                 self.nodesCreated += 1
             elif visitedMatch:
@@ -368,3 +626,281 @@ class NoCostSearchSolver(AbstractSearchSolver):
 
 
 
+class BidirectionalSearchSolver(AbstractSearchSolver):
+    """This class runs a best-first search forward from the start and another backward from the goal, using
+    the task advisor's generatePredecessors, getGoalState, getPathCost and joinStates. Each step expands one
+    state from whichever side's fringe has the lower priority, so searchStep works as in the other solvers,
+    and the expanded state and its new neighbors can come from either side.
+    Whenever a state is reached from one side that the other side has also reached, the path through it is a
+    candidate, and the cheapest candidate is kept. Both fringes are ordered by 2 * path cost plus (forward)
+    or minus (backward) the advisor's potential, the difference of the two heuristics; this is bidirectional
+    Dijkstra on costs reduced by the average of the heuristics. With it the search can stop as soon as the two
+    lowest priorities add up to twice the best candidate's cost. For UCS the potential is zero. When the
+    states keep no path costs (greedy search), the fringes are ordered by the states' costs and the search
+    stops at the first meeting."""
+
+    def __init__(self, taskAdvisor):
+        """Creates a bidirectional search solver, with the given task advisor."""
+        AbstractSearchSolver.__init__(self, taskAdvisor)
+        self.backFringe = None
+        self.backVisited = None
+        self.bestCost = None
+        self.meeting = None
+
+
+    def initSearch(self):
+        """Sets up the fringe and visited registry of both searches, with the start and goal states."""
+        self._initializeCounts()
+        startState = self.taskAdvisor.getStartState()
+        if self.taskAdvisor.isGoal(startState):
+            return startState.getPath()
+        goalState = self.taskAdvisor.getGoalState()
+        self.usePathCosts = self.taskAdvisor.getPathCost(startState) is not None
+        self.visited = {}
+        self.backVisited = {}
+        self.fringe = self._makeFringe()
+        self.backFringe = self._makeFringe()
+        self.fringe.insert(startState, self._priority(startState, True))
+        self.backFringe.insert(goalState, self._priority(goalState, False))
+        self.bestCost = None
+        self.meeting = None
+        self.nodesCreated += 2
+
+
+    def _makeFringe(self):
+        """Makes a priority queue for one side of the search, a BucketQueue when the costs are integers."""
+        if self.taskAdvisor.hasIntegerCosts():
+            return BucketQueue()
+        return PriorityQueue()
+
+
+    def _priority(self, state, forward):
+        """Computes the fringe priority of a state on the forward or backward side"""
+        if not self.usePathCosts:
+            return state.getCost()
+        potential = self.taskAdvisor.getPotential(state)
+        if forward:
+            return 2 * self.taskAdvisor.getPathCost(state) + potential
+        return 2 * self.taskAdvisor.getPathCost(state) - potential
+
+
+    def searchStep(self):
+        """This method performs one step of the search, expanding one state on one side. It returns the
+        current state, its new neighbors, and a status message, "Done", "Fail", or "Not Done". When done, the
+        state returned is the goal state built by the advisor's joinStates, whose path is the whole path."""
+        if self.fringe.isEmpty() or self.backFringe.isEmpty():
+            return self._finishSearch()
+        forwardPriority = self.fringe.firstElement()[1]
+        backwardPriority = self.backFringe.firstElement()[1]
+        if self.meeting is not None and \
+                (not self.usePathCosts or forwardPriority + backwardPriority >= 2 * self.bestCost):
+            return self._finishSearch()
+
+        forward = forwardPriority <= backwardPriority
+        if forward:
+            (fringe, visited) = (self.fringe, self.visited)
+        else:
+            (fringe, visited) = (self.backFringe, self.backVisited)
+        (nextState, priority) = fringe.dequeue()
+        if verbose:
+            print("----------------------")
+            print("Current state:", nextState, "forward" if forward else "backward")
+        visited[nextState] = nextState
+        self.nodesVisited += 1
+        if forward:
+            neighbors = self.taskAdvisor.generateNeighbors(nextState)
+        else:
+            neighbors = self.taskAdvisor.generatePredecessors(nextState)
+
+        newNeighbors = []
+        for n in neighbors:
+            if n in visited:
+                continue
+            nPriority = self._priority(n, forward)
+            fringeMatch = fringe.contains(n)
+            if fringeMatch:
+                if self._priority(fringeMatch, forward) <= nPriority:
+                    continue
+                fringe.decreaseKey(fringeMatch, n, nPriority)
+            else:
+                fringe.insert(n, nPriority)
+            newNeighbors.append(n)
+            self.nodesCreated += 1
+            self._checkMeeting(n, forward)
+        return nextState, newNeighbors, "Not Done"
+
+
+    def getFringeSize(self):
+        """Returns the number of states on both fringes"""
+        if self.fringe is None:
+            return 0
+        return self.fringe.getSize() + self.backFringe.getSize()
+
+    def getVisitedSize(self):
+        """Returns the number of states visited on both sides"""
+        if self.visited is None:
+            return 0
+        return len(self.visited) + len(self.backVisited)
+
+    def _fringes(self):
+        """Both fringes are timed"""
+        return [self.fringe, self.backFringe]
+
+
+    def _checkMeeting(self, state, forward):
+        """If the other side has also reached this state, records the path through it if it is the best so far."""
+        if forward:
+            other = self.backVisited.get(state) or self.backFringe.contains(state)
+            pair = (state, other)
+        else:
+            other = self.visited.get(state) or self.fringe.contains(state)
+            pair = (other, state)
+        if not other:
+            return
+        if not self.usePathCosts:
+            if self.meeting is None:
+                self.meeting = pair
+            return
+        cost = self.taskAdvisor.getPathCost(pair[0]) + self.taskAdvisor.getPathCost(pair[1])
+        if self.bestCost is None or cost < self.bestCost:
+            self.bestCost = cost
+            self.meeting = pair
+
+
+    def _finishSearch(self):
+        """Ends the search, returning the joined goal state if the two sides met, or a failure otherwise."""
+        if self.meeting is None:
+            return (False, False, "Fail")
+        (forwardState, backwardState) = self.meeting
+        return (self.taskAdvisor.joinStates(forwardState, backwardState), [], "Done")
+
+
+
+class IDAStarSearchSolver(AbstractSearchSolver):
+    """This class implements Iterative-Deepening A*: a series of depth-first searches, each cut off at states
+    whose cost (f = g + h, as made by AStarMazeAdvisor) is above a bound. The first bound is the start
+    state's cost, and each later one is the lowest cost that was cut off by the one before, so the first
+    goal found is optimal when the heuristic is admissible. Only the current path is kept, as a stack of
+    (state, neighbors not yet tried) frames, so memory is linear in the depth of the path.
+    Because grids have many paths to each cell, a small transposition table (at most tableSize entries,
+    cleared each iteration) remembers the lowest cost at which each state was reached in this iteration,
+    and states reached again at no lower cost are skipped. States on the current path are always skipped.
+    Beyond the usual counts, it reports the number of iterations, the expansions in each, and the
+    re-expansion overhead: all expansions over the expansions of the last iteration."""
+
+    def __init__(self, taskAdvisor, tableSize = 65536):
+        """Creates an IDA* solver with the given task advisor and transposition table size (0 for none)."""
+        AbstractSearchSolver.__init__(self, taskAdvisor)
+        self.tableSize = tableSize
+        self.bound = None
+        self.nextBound = None
+        self.iterationExpansions = []
+        self.tableSkips = 0
+
+
+    def initSearch(self):
+        """Sets the first bound to the start state's cost, and starts the first iteration."""
+        self._initializeCounts()
+        startState = self.taskAdvisor.getStartState()
+        if self.taskAdvisor.isGoal(startState):
+            return startState.getPath()
+        self.bound = startState.getCost()
+        self.iterationExpansions = []
+        self.tableSkips = 0
+        self.nodesCreated += 1
+        self._startIteration()
+
+
+    def _startIteration(self):
+        """Starts a depth-first pass from the start state under the current bound."""
+        startState = self.taskAdvisor.getStartState()
+        self.nextBound = None
+        self.table = {startState: startState.getCost()}
+        self.onPath = {startState}
+        self.fringe = [(startState, self._expand(startState))]
+        self.iterationExpansions.append(1)
+
+
+    def _expand(self, state):
+        """Generates the neighbors of a state and counts the expansion; returns them in the order to try,
+        cheapest first, as a list that is popped from the end."""
+        neighbors = self.taskAdvisor.generateNeighbors(state)
+        self.nodesVisited += 1
+        self.nodesCreated += len(neighbors)
+        neighbors.sort(key = lambda n: n.getCost(), reverse = True)
+        return neighbors
+
+
+    def searchStep(self):
+        """This method performs one step of IDA*: it runs the depth-first pass until it expands one state,
+        and returns that state, its neighbors, and "Not Done". When a pass ends without finding the goal, the
+        next one starts with a higher bound; when no state was cut off, the search fails."""
+        while True:
+            if not self.fringe:
+                if self.nextBound is None:
+                    return (False, False, "Fail")
+                self.bound = self.nextBound
+                self._startIteration()
+                start = self.fringe[-1][0]
+                return (start, list(self.fringe[-1][1]), "Not Done")
+            (state, untried) = self.fringe[-1]
+            if not untried:
+                self.fringe.pop()
+                self.onPath.discard(state)
+                continue
+            child = untried.pop()
+            cost = child.getCost()
+            if cost > self.bound:
+                if self.nextBound is None or cost < self.nextBound:
+                    self.nextBound = cost
+                continue
+            if child in self.onPath:
+                continue
+            seenCost = self.table.get(child)
+            if seenCost is not None and seenCost <= cost:
+                self.tableSkips += 1
+                continue
+            if seenCost is not None or len(self.table) < self.tableSize:
+                self.table[child] = cost
+            if self.taskAdvisor.isGoal(child):
+                return (child, [], "Done")
+            if verbose:
+                print("----------------------")
+                print("Current state:", child, "bound", self.bound)
+            neighbors = self._expand(child)
+            self.iterationExpansions[-1] += 1
+            self.onPath.add(child)
+            self.fringe.append((child, neighbors))
+            return (child, list(neighbors), "Not Done")
+
+
+    def getFringeSize(self):
+        """Returns the depth of the current path, the number of frames on the stack"""
+        if self.fringe is None:
+            return 0
+        return len(self.fringe)
+
+    def getVisitedSize(self):
+        """Returns the number of states in this pass's transposition table"""
+        if self.fringe is None:
+            return 0
+        return len(self.table)
+
+    def getIterations(self):
+        """Returns the number of depth-first passes run so far"""
+        return len(self.iterationExpansions)
+
+    def getIterationExpansions(self):
+        """Returns a list of the number of states expanded in each pass"""
+        return list(self.iterationExpansions)
+
+    def getReExpansionRatio(self):
+        """Returns all expansions divided by the expansions of the latest pass: how much work the earlier
+        passes (and repeated visits within a pass) added to a single bounded search"""
+        if not self.iterationExpansions:
+            return None
+        return self.nodesVisited / self.iterationExpansions[-1]
+
+    def getTableSkips(self):
+        """Returns the number of states skipped because the transposition table had a cheaper visit"""
+        return self.tableSkips
@@ -0,0 +1,172 @@
+"""  =================================================================
+File: SearchStats.py
+
+This file contains a class that gathers detailed measurements of one search,
+and sinks that write them out as JSON lines or CSV. A solver is measured when
+it is given a SearchStats with AbstractSearchSolver.setStats; a solver without
+one does no extra work.
+ ==================================================================="""
+
+import csv
+import json
+import time
+import tracemalloc
+
+
+# The measurements, in the order they are written to CSV
+STATS_FIELDS = ('label', 'result', 'nodesCreated', 'nodesVisited', 'steps', 'searchSeconds', 'neighborSeconds',
+                'duplicateSeconds', 'queueSeconds', 'peakFringe', 'peakVisited', 'decreasedKeys', 'peakBytes')
+
+# The methods of a fringe (Queue, Stack, PriorityQueue or BucketQueue) that are timed as queue operations
+QUEUE_METHODS = ('insert', 'enqueue', 'push', 'delete', 'dequeue', 'pop', 'update', 'decreaseKey', 'removeValue')
+
+
+class SearchStats:
+    """Measures one search: the time spent in the whole search and, within it, in generating neighbors, in
+    checking for duplicates (the visited registry and fringe lookups) and in fringe operations; the peak
+    sizes of the fringe and the visited registry; the number of decrease-keys, each giving a state already
+    on the fringe a lower cost; and, if traceMemory is True, the peak memory allocated during the search,
+    found with tracemalloc (which slows the search down a good deal).
+    The solver calls the timed wrappers made by timed, and stepTaken after every step. When the search ends,
+    the stats are written to the sink, if one was given."""
+
+    def __init__(self, label = None, sink = None, traceMemory = False):
+        """Takes an optional label to tell this search apart in the output, a sink with a write method that
+        takes the dictionary from asDict, and whether to measure peak memory"""
+        self.label = label
+        self.sink = sink
+        self.traceMemory = traceMemory
+        self.result = None
+        self.nodesCreated = 0
+        self.nodesVisited = 0
+        self.steps = 0
+        self.searchSeconds = 0.0
+        self.seconds = {'neighbors': 0.0, 'duplicates': 0.0, 'queue': 0.0}
+        self.peakFringe = 0
+        self.peakVisited = 0
+        self.decreasedKeys = 0
+        self.peakBytes = None
+        self.timing = False
+        self.startedTracing = False
+
+
+    def startSearch(self):
+        """Called by the solver when the search starts; starts tracemalloc if memory is measured"""
+        if self.traceMemory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                self.startedTracing = True
+
+
+    def timed(self, function, category, countDecreasedKeys = False):
+        """Returns a wrapper around function that adds the time it takes to the given category. A call made
+        while another timed call is running (such as a fringe insert inside _addToFringe) is not timed
+        again, so no time is counted twice. If countDecreasedKeys is True, each call
+        is counted in decreasedKeys."""
+        seconds = self.seconds
+        clock = time.perf_counter
+
+        def wrapper(*args):
+            if countDecreasedKeys:
+                self.decreasedKeys += 1
+            if self.timing:
+                return function(*args)
+            self.timing = True
+            start = clock()
+            try:
+                return function(*args)
+            finally:
+                seconds[category] += clock() - start
+                self.timing = False
+        return wrapper
+
+
+    def stepTaken(self, solver, seconds, status):
+        """Called by the solver after each step, with the time the step took and its status"""
+        self.steps += 1
+        self.searchSeconds += seconds
+        fringeSize = solver.getFringeSize()
+        if fringeSize > self.peakFringe:
+            self.peakFringe = fringeSize
+        visitedSize = solver.getVisitedSize()
+        if visitedSize > self.peakVisited:
+            self.peakVisited = visitedSize
+        if status == "Done" or status == "Fail":
+            self.finishSearch(solver, status)
+
+
+    def finishSearch(self, solver, result = None):
+        """Records the result and the node counts, stops measuring memory, and writes to the sink"""
+        self.result = result
+        self.nodesCreated = solver.getNodesCreated()
+        self.nodesVisited = solver.getNodesVisited()
+        if self.traceMemory and tracemalloc.is_tracing():
+            self.peakBytes = tracemalloc.get_traced_memory()[1]
+            if self.startedTracing:
+                tracemalloc.stop()
+                self.startedTracing = False
+        if self.sink is not None:
+            self.sink.write(self.asDict())
+
+
+    def asDict(self):
+        """Returns the measurements as a dictionary with the keys in STATS_FIELDS"""
+        return {'label': self.label, 'result': self.result, 'nodesCreated': self.nodesCreated,
+                'nodesVisited': self.nodesVisited, 'steps': self.steps,
+                'searchSeconds': round(self.searchSeconds, 6),
+                'neighborSeconds': round(self.seconds['neighbors'], 6),
+                'duplicateSeconds': round(self.seconds['duplicates'], 6),
+                'queueSeconds': round(self.seconds['queue'], 6),
+                'peakFringe': self.peakFringe, 'peakVisited': self.peakVisited,
+                'decreasedKeys': self.decreasedKeys, 'peakBytes': self.peakBytes}
+
+
+
+class JsonLinesSink:
+    """Writes each search's stats as one line of JSON, to a file name (appended to) or an open text file"""
+
+    def __init__(self, outFile):
+        """Takes a file name or an open text file"""
+        if isinstance(outFile, str):
+            self.outFile = open(outFile, 'a')
+            self.ownsFile = True
+        else:
+            self.outFile = outFile
+            self.ownsFile = False
+
+    def write(self, record):
+        """Writes one dictionary of stats"""
+        self.outFile.write(json.dumps(record) + '\n')
+
+    def close(self):
+        """Closes the file, if the sink opened it"""
+        if self.ownsFile:
+            self.outFile.close()
+
+
+
+class CsvSink:
+    """Writes each search's stats as a CSV row, with a header row before the first, to a file name or an
+    open text file"""
+
+    def __init__(self, outFile):
+        """Takes a file name or an open text file"""
+        if isinstance(outFile, str):
+            self.outFile = open(outFile, 'w', newline='')
+            self.ownsFile = True
+        else:
+            self.outFile = outFile
+            self.ownsFile = False
+        self.writer = csv.DictWriter(self.outFile, fieldnames=STATS_FIELDS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, record):
+        """Writes one dictionary of stats"""
+        self.writer.writerow(record)
+
+    def close(self):
+        """Closes the file, if the sink opened it"""
+        if self.ownsFile:
+            self.outFile.close()
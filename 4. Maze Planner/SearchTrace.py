@@ -0,0 +1,257 @@
+"""  =================================================================
+File: SearchTrace.py
+
+This file contains a recorder that logs each step of a search to a compact
+binary trace, and a reader that replays a trace, jumps to any step, and
+counts expansions for a heatmap, all without running the solver again.
+A solver records a trace when it is given a recorder with
+AbstractSearchSolver.setTraceRecorder.
+ ==================================================================="""
+
+import struct
+import sys
+import zlib
+from array import array
+
+
+# The trace format: a header, then one record of 32-bit little-endian integers per step: the id of the
+# expanded state, the number of new fringe states, and their ids. After the steps comes a trailer with the
+# keyframes and the final path. A keyframe is the step number, the file offset of the next step, and the
+# zlib-compressed status of every state after that step, so a reader can jump to any step by starting at the
+# keyframe before it. States are identified by their interned stateId (-1 for a state without one).
+TRACE_MAGIC = b'MAZETRC1'
+TRACE_HEADER = struct.Struct('<8s4iq')    # magic, numIds, keyframe interval, numSteps, result, trailer offset
+KEYFRAME_HEADER = struct.Struct('<iqi')   # step, offset of the next step, length of the compressed status
+TRACE_EXTENSION = '.mtrace'
+
+# The status of a state in the replay, matching the colors MazeGUI.markCells uses
+UNSEEN = 0
+FRINGE = 1
+VISITED = 2
+CURRENT = 3
+
+RESULTS = {None: 0, "Done": 1, "Fail": 2}
+
+
+class TraceRecorder:
+    """Writes a trace as a search runs. The steps are gathered in an integer array and written out in
+    large blocks, so recording a step is a few appends. It also keeps the status of every state, as the GUI
+    shows it, to write a keyframe every keyframeInterval steps. A keyframe compresses the status of every
+    state, so on big mazes the keyframes are spread further apart: at least numIds // IDS_PER_KEYFRAME_STEP
+    steps, which keeps the time and space they take a small share of that of the steps between them."""
+
+    BUFFER_WORDS = 1 << 16
+    IDS_PER_KEYFRAME_STEP = 16
+
+    def __init__(self, traceFile, numIds, keyframeInterval = 1000):
+        """Takes a file name or a binary file object to write to, the number of state ids (such as the
+        number of cells of a maze), and the fewest steps apart the keyframes are"""
+        if isinstance(traceFile, str):
+            self.traceFile = open(traceFile, 'wb')
+            self.ownsFile = True
+        else:
+            self.traceFile = traceFile
+            self.ownsFile = False
+        self.numIds = numIds
+        self.keyframeInterval = max(keyframeInterval, numIds // self.IDS_PER_KEYFRAME_STEP, 1)
+        self.numSteps = 0
+        self.buffer = array('i')
+        self.status = bytearray(numIds)
+        self.current = -1
+        self.finished = False
+        self.start = self.traceFile.tell()
+        self.offset = TRACE_HEADER.size
+        self.keyframes = [(0, self.offset, zlib.compress(bytes(numIds)))]
+        self.traceFile.write(bytes(TRACE_HEADER.size))
+
+
+    def record(self, expandedId, fringeIds):
+        """Records one step: the id of the state expanded, and the ids of the states it put on the fringe"""
+        buffer = self.buffer
+        buffer.append(expandedId)
+        buffer.append(len(fringeIds))
+        buffer.extend(fringeIds)
+        status = self.status
+        if self.current >= 0:
+            status[self.current] = VISITED
+        if expandedId >= 0:
+            status[expandedId] = CURRENT
+        self.current = expandedId
+        for fringeId in fringeIds:
+            if fringeId >= 0:
+                status[fringeId] = FRINGE
+        self.numSteps += 1
+        if self.numSteps % self.keyframeInterval == 0:
+            self._flush()
+            self.keyframes.append((self.numSteps, self.offset, zlib.compress(status)))
+        elif len(buffer) >= self.BUFFER_WORDS:
+            self._flush()
+
+
+    def finish(self, result = None, path = None):
+        """Ends the trace with the result of the search ("Done", "Fail" or None if it was stopped) and the
+        moves of the path found, if any; writes the keyframes and the header, and closes the file if the
+        recorder opened it"""
+        self._flush()
+        self.finished = True
+        trailerOffset = self.offset
+        traceFile = self.traceFile
+        traceFile.write(struct.pack('<i', len(self.keyframes)))
+        for (step, offset, packedStatus) in self.keyframes:
+            traceFile.write(KEYFRAME_HEADER.pack(step, offset, len(packedStatus)))
+            traceFile.write(packedStatus)
+        moves = ''.join(path or []).encode('ascii')
+        traceFile.write(struct.pack('<i', len(moves)))
+        traceFile.write(moves)
+        endPos = traceFile.tell()
+        traceFile.seek(self.start)
+        traceFile.write(TRACE_HEADER.pack(TRACE_MAGIC, self.numIds, self.keyframeInterval, self.numSteps,
+                                          RESULTS[result], trailerOffset))
+        traceFile.seek(endPos)
+        if self.ownsFile:
+            traceFile.close()
+        else:
+            traceFile.flush()
+
+
+    def isFinished(self):
+        """Returns True once finish has been called"""
+        return self.finished
+
+
+    def _flush(self):
+        """Writes the buffered steps to the file"""
+        buffer = self.buffer
+        if sys.byteorder == 'big':
+            buffer.byteswap()
+        self.traceFile.write(buffer)
+        self.offset += 4 * len(buffer)
+        self.buffer = array('i')
+
+
+
+class SearchTrace:
+    """Reads a trace written by TraceRecorder. The whole trace is read into memory; the steps are read
+    straight out of it as an integer array."""
+
+    def __init__(self, traceFile):
+        """Takes a file name or a binary file object positioned at the start of a trace"""
+        if isinstance(traceFile, str):
+            with open(traceFile, 'rb') as filObj:
+                data = filObj.read()
+        else:
+            data = traceFile.read()
+        (magic, self.numIds, self.keyframeInterval, self.numSteps, result,
+         trailerOffset) = TRACE_HEADER.unpack_from(data, 0)
+        if magic != TRACE_MAGIC:
+            raise ValueError("Not a search trace file")
+        self.result = {code: name for (name, code) in RESULTS.items()}[result]
+        self.words = array('i')
+        self.words.frombytes(data[TRACE_HEADER.size:trailerOffset])
+        if sys.byteorder == 'big':
+            self.words.byteswap()
+
+        pos = trailerOffset
+        (numKeyframes,) = struct.unpack_from('<i', data, pos)
+        pos += 4
+        self.keyframes = []
+        for i in range(numKeyframes):
+            (step, offset, length) = KEYFRAME_HEADER.unpack_from(data, pos)
+            pos += KEYFRAME_HEADER.size
+            self.keyframes.append((step, (offset - TRACE_HEADER.size) // 4, data[pos:pos + length]))
+            pos += length
+        (pathLength,) = struct.unpack_from('<i', data, pos)
+        pos += 4
+        self.path = list(data[pos:pos + pathLength].decode('ascii'))
+
+
+    def getNumSteps(self):
+        """Returns the number of steps in the trace"""
+        return self.numSteps
+
+    def getNumIds(self):
+        """Returns the number of state ids the trace was recorded for"""
+        return self.numIds
+
+    def getResult(self):
+        """Returns "Done" or "Fail" for a search that ended, or None if it was stopped"""
+        return self.result
+
+    def getPath(self):
+        """Returns the list of moves of the path found, empty if there was none"""
+        return self.path
+
+
+    def _keyframeBefore(self, step):
+        """Returns the last keyframe at or before the given step"""
+        index = min(step // self.keyframeInterval, len(self.keyframes) - 1)
+        return self.keyframes[index]
+
+
+    def _skipSteps(self, position, count):
+        """Returns the word position of the step count steps after the one at position"""
+        words = self.words
+        for i in range(count):
+            position += 2 + words[position + 1]
+        return position
+
+
+    def steps(self, firstStep = 0):
+        """Generates (expandedId, fringeIds) for each step from firstStep (counting from 0) to the end"""
+        (step, position, packedStatus) = self._keyframeBefore(firstStep)
+        position = self._skipSteps(position, firstStep - step)
+        words = self.words
+        end = len(words)
+        while position < end:
+            count = words[position + 1]
+            yield (words[position], words[position + 2:position + 2 + count])
+            position += 2 + count
+
+
+    def statusAt(self, step):
+        """Returns a bytearray with the status (UNSEEN, FRINGE, VISITED or CURRENT) of every state after the
+        given number of steps. It starts from the keyframe before that step and replays the rest."""
+        step = max(0, min(step, self.numSteps))
+        (keyStep, position, packedStatus) = self._keyframeBefore(step)
+        status = bytearray(zlib.decompress(packedStatus))
+        current = status.find(CURRENT)
+        words = self.words
+        for i in range(step - keyStep):
+            expandedId = words[position]
+            count = words[position + 1]
+            if current >= 0:
+                status[current] = VISITED
+            if expandedId >= 0:
+                status[expandedId] = CURRENT
+            current = expandedId
+            for fringeId in words[position + 2:position + 2 + count]:
+                if fringeId >= 0:
+                    status[fringeId] = FRINGE
+            position += 2 + count
+        return status
+
+
+    def expansionCounts(self):
+        """Returns an array with the number of times each state was expanded"""
+        counts = array('i', bytes(4 * self.numIds))
+        words = self.words
+        position = 0
+        end = len(words)
+        while position < end:
+            expandedId = words[position]
+            if expandedId >= 0:
+                counts[expandedId] += 1
+            position += 2 + words[position + 1]
+        return counts
+
+
+    def writeHeatmap(self, imageFile, numRows, numCols):
+        """Writes the expansion counts as a grayscale PGM image, one pixel per cell (the state id of a maze
+        cell is row * numCols + col); black is never expanded and white the most expanded cell. States
+        that are expanded more than once, as in IDA* or a D* Lite repair, stand out."""
+        counts = self.expansionCounts()
+        highest = max(max(counts, default = 0), 1)
+        pixels = bytes(255 * count // highest for count in counts[:numRows * numCols])
+        with open(imageFile, 'wb') as filObj:
+            filObj.write(b'P5\n%d %d\n255\n' % (numCols, numRows))
+            filObj.write(pixels)
@@ -2,17 +2,29 @@
 A Stack class
 """
 
+from collections import deque
+from MembershipIndex import MembershipIndex
+
 class Stack:
     """A stack is a linear collection used to hold qData that is waiting
     for some purpose.  Values are added at one end and removed from the
-    same end, like a stack of plates"""
+    same end, like a stack of plates. It is stored in a deque whose front is
+    the top, so pushing and popping take constant time. If made with
+    indexed=True, it also keeps a MembershipIndex of its values, so that
+    contains is a hash lookup instead of a scan (the values must then be hashable)."""
 
-    def __init__(self, vallist=[]):
+    def __init__(self, vallist=None, indexed=False):
         """When creating a new stack, you can give a list of values to
         insert in the stack at the start.  The front of the list becomes
-        the top of the stack."""
-        self.data = vallist[:]
+        the top of the stack. You can also ask for a membership index."""
+        if vallist is None:
+            self.data = deque()
+        else:
+            self.data = deque(vallist)
         self.size = len(self.data)
+        self.members = None
+        if indexed:
+            self.members = MembershipIndex(reversed(self.data))
 
     def getSize(self):
         """Returns the size of the stack"""
@@ -42,8 +54,10 @@ class Stack:
 
     def insert(self, val):
         """Inserts a new value at the end of the stack."""
-        self.data.insert(0,val)
-        self.size = self.size + 1 
+        self.data.appendleft(val)
+        self.size = self.size + 1
+        if self.members is not None:
+            self.members.add(val)
 
     def push(self, val):
         """Another name for inserting"""
@@ -52,9 +66,10 @@ class Stack:
 
     def delete(self):
         """Removes the first element from the stack, returning its value."""
-        first = self.data[0]
-        self.data.pop(0)
+        first = self.data.popleft()
         self.size = self.size - 1
+        if self.members is not None:
+            self.members.dropNewest(first)
         return first
 
     def pop(self):
@@ -64,6 +79,8 @@ class Stack:
 
     def contains(self, value):
         """Given a value, it searches the stack for a matching value, returning it if found, or returning False if not found"""
+        if self.members is not None:
+            return self.members.findNewest(value)
         for item in self.data:
             if item == value:
                 return item
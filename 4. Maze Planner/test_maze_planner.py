@@ -0,0 +1,243 @@
+# Checks of the Maze Planner solvers and their supporting structures, mostly against uniform-cost search
+# run with: python -m pytest test_maze_planner.py
+
+import csv
+import glob
+import io
+import json
+import os
+import random
+
+import pytest
+
+import SearchSolver
+from Queue import PriorityQueue, BucketQueue
+from MazeInfo import ArrayMazeInfo
+from MazeBatch import makeSolver, pathCost, solveMaze, _runSearch
+from MazeDistances import distanceMatrix, randomOpenCells
+from MazeStateAdvisors import MazeTaskAdvisor
+from DStarLite import DStarLiteSolver
+from MazeLandmarks import landmarksForMazeFile, loadLandmarks, LANDMARK_EXTENSION
+from SearchStats import SearchStats, JsonLinesSink, CsvSink, STATS_FIELDS
+from SearchTrace import TraceRecorder, SearchTrace, CURRENT, FRINGE, VISITED
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_MAZES = sorted(glob.glob(os.path.join(HERE, 'mazes', '*.txt')))
+
+
+def hilly_maze(size, seed, percBlocked=0.2):
+    """A seeded hilly maze with its top row and right column opened, so (0, 0) always reaches the far corner"""
+    maze = ArrayMazeInfo('gen-hilly', size, percBlocked=percBlocked, seed=seed)
+    for i in range(size):
+        maze.delBlocked(0, i)
+        maze.delBlocked(i, size - 1)
+    return maze
+
+
+def check_costs_match_ucs(algorithm, mazes, numPairs=3):
+    """Solves random pairs of open cells of each maze with the algorithm and with UCS, and checks that the
+    costs agree and that the path found has the cost reported"""
+    for (seed, maze) in enumerate(mazes):
+        points = randomOpenCells(maze, 2 * numPairs, seed)
+        pairs = list(zip(points[::2], points[1::2]))
+        corners = ((0, 0), (maze.getNumRows() - 1, maze.getNumCols() - 1))
+        if not (maze.isBlocked(*corners[0]) or maze.isBlocked(*corners[1])):
+            pairs.append(corners)
+        for (startPos, goalPos) in pairs:
+            expected = solveMaze(maze, 'ucs', startPos, goalPos, measureMemory=False)['cost']
+            result = solveMaze(maze, algorithm, startPos, goalPos, measureMemory=False, withPath=True)
+            assert result['cost'] == expected, (algorithm, seed, startPos, goalPos)
+            if expected is not None:
+                assert pathCost(maze, startPos, result['path']) == expected
+
+
+def solve_with_heap(maze, algorithm, monkeypatch, startPos=None, goalPos=None):
+    """Solves with the binary-heap PriorityQueue in place of the BucketQueue"""
+    with monkeypatch.context() as patch:
+        patch.setattr(SearchSolver, 'BucketQueue', PriorityQueue)
+        return solveMaze(maze, algorithm, startPos, goalPos, measureMemory=False)
+
+
+def test_bucket_queue_orders_by_priority_then_arrival():
+    queue = BucketQueue()
+    for (value, priority) in [('a', 3), ('b', 1), ('c', 3), ('d', 1), ('e', 2)]:
+        queue.insert(value, priority)
+    queue.removeValue('d')
+    queue.update('e', 3)
+    order = []
+    while not queue.isEmpty():
+        order.append(queue.delete())
+    assert order == [('b', 1), ('a', 3), ('c', 3), ('e', 3)]
+
+
+def test_bucket_queue_rejects_non_integer_priorities():
+    with pytest.raises(ValueError):
+        BucketQueue().insert('a', 1.5)
+
+
+@pytest.mark.parametrize('mazeFile', SAMPLE_MAZES, ids=os.path.basename)
+def test_bucket_queue_matches_heap_on_sample_mazes(mazeFile, monkeypatch):
+    maze = ArrayMazeInfo('file', mazeFile)
+    for algorithm in ('greedy', 'ucs', 'astar'):
+        heapResult = solve_with_heap(maze, algorithm, monkeypatch)
+        bucketResult = solveMaze(maze, algorithm, measureMemory=False)
+        assert bucketResult['cost'] == heapResult['cost'], algorithm
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_bucket_queue_matches_heap_costs_on_generated_mazes(seed, monkeypatch):
+    maze = hilly_maze(25, seed)
+    for algorithm in ('ucs', 'astar'):
+        heapResult = solve_with_heap(maze, algorithm, monkeypatch, (0, 0), (24, 24))
+        bucketResult = solveMaze(maze, algorithm, (0, 0), (24, 24), measureMemory=False)
+        assert bucketResult['cost'] == heapResult['cost'], algorithm
+
+
+def test_integer_weight_flag_follows_weight_edits():
+    maze = ArrayMazeInfo('gen-hilly', 8, percBlocked=0.0, seed=3)
+    assert maze.hasIntegerWeights()
+    maze.minCost = -5
+    maze.setWeight(2, 3, -4)
+    assert not maze.hasIntegerWeights()
+    maze.setWeight(2, 3, 7)
+    assert maze.hasIntegerWeights()
+
+
+def test_trace_replays_the_search_it_recorded():
+    maze = hilly_maze(20, 5)
+    solver = makeSolver('astar', maze, (0, 0), (19, 19))
+    traceFile = io.BytesIO()
+    solver.setTraceRecorder(TraceRecorder(traceFile, 400, keyframeInterval=7))
+    goalState = _runSearch(solver)
+    traceFile.seek(0)
+    trace = SearchTrace(traceFile)
+    assert trace.getResult() == "Done"
+    assert trace.getPath() == goalState.getPath()
+    status = bytearray(400)
+    current = -1
+    for (step, (expandedId, fringeIds)) in enumerate(trace.steps(), 1):
+        if current >= 0:
+            status[current] = VISITED
+        status[expandedId] = CURRENT
+        current = expandedId
+        for fringeId in fringeIds:
+            status[fringeId] = FRINGE
+        assert trace.statusAt(step) == status
+    assert step == trace.getNumSteps() > 7
+
+
+def test_trace_keyframes_thin_out_on_big_mazes():
+    assert TraceRecorder(io.BytesIO(), 400).keyframeInterval == 1000
+    bigRecorder = TraceRecorder(io.BytesIO(), 4000000)
+    assert bigRecorder.keyframeInterval == 4000000 // TraceRecorder.IDS_PER_KEYFRAME_STEP
+
+
+def test_stats_round_trip_through_both_sinks():
+    maze = hilly_maze(20, 2)
+    jsonFile = io.StringIO()
+    csvFile = io.StringIO()
+    records = []
+    for sink in (JsonLinesSink(jsonFile), CsvSink(csvFile)):
+        solver = makeSolver('astar', maze, (0, 0), (19, 19))
+        stats = SearchStats('astar', sink)
+        solver.setStats(stats)
+        _runSearch(solver)
+        records.append(stats.asDict())
+        assert stats.nodesVisited == solver.getNodesVisited()
+        assert stats.decreasedKeys > 0
+    fromJson = json.loads(jsonFile.getvalue())
+    assert tuple(fromJson) == STATS_FIELDS
+    assert fromJson == records[0]
+    fromCsv = next(csv.DictReader(io.StringIO(csvFile.getvalue())))
+    assert tuple(fromCsv) == STATS_FIELDS
+    assert {key: str(value) for (key, value) in records[1].items() if value is not None} == \
+        {key: value for (key, value) in fromCsv.items() if value != ''}
+
+
+def test_distance_matrix_matches_ucs_and_rejects_closed_cells():
+    maze = hilly_maze(15, 4)
+    points = randomOpenCells(maze, 4, seed=1)
+    (costs, paths) = distanceMatrix(maze, points, workers=1, withPaths=True)
+    for (i, source) in enumerate(points):
+        for (j, target) in enumerate(points):
+            expected = solveMaze(maze, 'ucs', source, target, measureMemory=False)['cost']
+            assert costs[i][j] == expected
+            if source != target:
+                assert pathCost(maze, source, paths[i][j]) == expected
+    blocked = next((row, col) for row in range(15) for col in range(15) if maze.isBlocked(row, col))
+    for badPoint in (blocked, (15, 0), (-1, 3)):
+        with pytest.raises(ValueError):
+            distanceMatrix(maze, points, [badPoint], workers=1)
+
+
+def test_landmark_table_is_saved_and_reused(tmp_path):
+    mazeFile = str(tmp_path / 'maze.txt')
+    hilly_maze(15, 6).writeGridToFile(mazeFile)
+    built = landmarksForMazeFile(mazeFile, numLandmarks=4, seed=1)
+    loaded = loadLandmarks(mazeFile + LANDMARK_EXTENSION, ArrayMazeInfo('file', mazeFile))
+    assert loaded.getLandmarks() == built.getLandmarks()
+    assert [list(costs) for costs in loaded.costs] == [list(costs) for costs in built.costs]
+
+
+def test_a_star_costs_match_ucs():
+    check_costs_match_ucs('astar', [hilly_maze(25, seed) for seed in range(8)] +
+                          [ArrayMazeInfo('gen-braided', 25, seed=seed) for seed in range(2)])
+
+
+@pytest.mark.parametrize('algorithm', ['biucs', 'biastar'])
+def test_bidirectional_costs_match_ucs(algorithm):
+    check_costs_match_ucs(algorithm, [hilly_maze(25, seed) for seed in range(8)])
+
+
+def test_ida_star_costs_match_ucs_on_small_mazes():
+    check_costs_match_ucs('idastar', [hilly_maze(9, seed) for seed in range(6)], numPairs=2)
+
+
+def test_d_star_lite_costs_match_ucs():
+    check_costs_match_ucs('dstar', [hilly_maze(25, seed) for seed in range(8)])
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_d_star_lite_repairs_match_ucs_after_edits(seed):
+    rng = random.Random(seed)
+    maze = hilly_maze(20, seed)
+    goalPos = (19, 19)
+    solver = DStarLiteSolver(MazeTaskAdvisor(maze, 0, 0, 19, 19))
+    try:
+        for repair in range(8):
+            advisor = solver.taskAdvisor
+            startPos = (advisor.startRow, advisor.startCol)
+            goalState = _runSearch(solver)
+            expected = solveMaze(maze, 'ucs', startPos, goalPos, measureMemory=False)['cost']
+            if expected is None:
+                assert goalState is None
+            else:
+                assert pathCost(maze, startPos, goalState.getPath()) == expected, repair
+            for edit in range(5):
+                (row, col) = (rng.randrange(20), rng.randrange(20))
+                if (row, col) in (startPos, goalPos):
+                    continue
+                choice = rng.random()
+                if choice < 0.5:
+                    maze.setWeight(row, col, rng.randint(1, 50))
+                elif choice < 0.75:
+                    maze.addBlocked(row, col)
+                else:
+                    maze.delBlocked(row, col)
+            if expected is not None:
+                for step in range(3):
+                    solver.advance()
+    finally:
+        solver.detach()
+
+
+def test_corridor_costs_match_ucs():
+    mazes = [ArrayMazeInfo('gen-braided', 25, seed=seed, braid=0.3) for seed in range(4)] + \
+        [ArrayMazeInfo('gen-perfect', 25, seed=seed) for seed in range(2)] + \
+        [hilly_maze(25, seed) for seed in range(4)]
+    check_costs_match_ucs('corridor', mazes)
+
+
+def test_alt_costs_match_ucs():
+    check_costs_match_ucs('alt', [hilly_maze(25, seed) for seed in range(6)] +
+                          [ArrayMazeInfo('gen-braided', 25, seed=seed) for seed in range(2)])